@@ -0,0 +1,85 @@
+"""Offline reverse geocoding: nearest-place lookups against the gazetteer index.
+
+Builds an index of random places over India (or of a real gazetteer with
+--source) in a temporary directory, checks a sample of lookups against a
+brute-force scan and times single lookups. Run from the Backend directory:
+
+    python benchmarks/gazetteer.py [--places 400000] [--lookups 20000] [--source IN.txt]
+"""
+import os
+import sys
+import math
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module.gazetteer import Gazetteer, build_index, read_places
+
+# Roughly India's bounding box
+LAT_RANGE = (8.0, 35.0)
+LON_RANGE = (68.0, 97.0)
+
+
+def random_point(rng):
+    return rng.uniform(*LAT_RANGE), rng.uniform(*LON_RANGE)
+
+
+def brute_force(gazetteer, lat, lon):
+    """Label of the nearest place by scanning every place"""
+    cos_lat = math.cos(math.radians(lat))
+    best = None
+    for j in range(len(gazetteer)):
+        dy = gazetteer._lats[j] - lat
+        dx = (gazetteer._lons[j] - lon) * cos_lat
+        d2 = dy * dy + dx * dx
+        if best is None or d2 < best[0]:
+            best = (d2, j)
+    return gazetteer.label(best[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--places", type=int, default=400000, help="random places when no --source is given")
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--check", type=int, default=20, help="lookups verified by brute force")
+    parser.add_argument("--source", help="GeoNames dump or CSV to index instead of random places")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    index_path = os.path.join(tempfile.mkdtemp(prefix="gazetteer-bench-"), "places.gzt")
+    if args.source:
+        places = read_places(args.source)
+    else:
+        places = ((f"Place {i}", *random_point(rng)) for i in range(args.places))
+
+    started = time.perf_counter()
+    count = build_index(places, index_path)
+    build_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    gazetteer = Gazetteer(index_path)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    for _ in range(args.check):
+        lat, lon = random_point(rng)
+        found = gazetteer.nearest(lat, lon, max_km=1e6)
+        expected = brute_force(gazetteer, lat, lon)
+        assert found["name"] == expected, (lat, lon, found, expected)
+
+    points = [random_point(rng) for _ in range(args.lookups)]
+    started = time.perf_counter()
+    for lat, lon in points:
+        gazetteer.nearest(lat, lon)
+    per_lookup_us = (time.perf_counter() - started) / len(points) * 1e6
+
+    print(f"Gazetteer: {count} places, {os.path.getsize(index_path) / 1e6:.1f} MB index "
+          f"built in {build_s:.1f}s, opened in {open_ms:.2f} ms")
+    print(f"  {args.check} lookups match a brute-force scan")
+    print(f"  nearest place: {per_lookup_us:.1f} us per lookup over {len(points)} lookups")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Local risk scoring: single assessments, batch throughput and route comparison.
+
+Checks how travel times are read, then builds a RiskEngine from synthetic
+incidents (hot spots over a uniform background around Kolkata and Delhi,
+busier at night) or from a real file with --incidents, and times
+single-point assessments, one batched call over many points, the same
+points scored one at a time, and a comparison of candidate routes across
+the city in one call. Run from the Backend directory:
+
+    python benchmarks/risk.py [--incidents-count 200000] [--points 5000] [--routes 5] [--incidents FILE]
+"""
+import os
+import sys
+import time
+import datetime
+import argparse
+import statistics
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module.risk import RiskEngine, LABELS, parse_hour_of_week
+from module.routes import score_routes
+
+CITIES = [(22.57, 88.36), (28.61, 77.21)]
+CATEGORIES = ["theft", "harassment", "robbery", "snatching", "assault", "molestation"]
+
+# Travel times and the hour of the week they mean, asked on a Wednesday at 20:00
+TIME_CASES = {
+    "raat 12 baje": 2 * 24, "12 raat": 2 * 24, "raat 1 baje": 2 * 24 + 1, "2 baje raat": 2 * 24 + 2,
+    "raat 10 baje": 2 * 24 + 22, "10 pm": 2 * 24 + 22, "22:30": 2 * 24 + 22, "12 am": 2 * 24,
+    "12 pm": 2 * 24 + 12, "midnight": 2 * 24, "shaam 7 baje": 2 * 24 + 19, "subah 6 baje": 2 * 24 + 6,
+    "friday 9pm": 4 * 24 + 21, "kal subah 6 baje": 3 * 24 + 6, "now": 2 * 24 + 20,
+}
+
+
+def check_time_parsing():
+    now = datetime.datetime(2026, 10, 14, 20)
+    for text, expected in TIME_CASES.items():
+        got = parse_hour_of_week(text, now)
+        assert got == expected, f"{text!r}: hour of week {got}, expected {expected}"
+
+
+def synthetic_incidents(count, rng):
+    """Half the incidents in 40 night-time hot spots, half spread over each city"""
+    lats, lons, hours = [], [], []
+    per_city = count // len(CITIES)
+    for lat, lon in CITIES:
+        spots = rng.normal([lat, lon], 0.08, size=(20, 2))
+        spot = spots[rng.integers(0, len(spots), per_city // 2)]
+        lats += [spot[:, 0] + rng.normal(0, 0.004, len(spot)), rng.uniform(lat - 0.2, lat + 0.2, per_city // 2)]
+        lons += [spot[:, 1] + rng.normal(0, 0.004, len(spot)), rng.uniform(lon - 0.2, lon + 0.2, per_city // 2)]
+        hours += [rng.integers(0, 7, len(spot)) * 24 + rng.choice([20, 21, 22, 23, 0, 1], len(spot)),
+                  rng.integers(0, 168, per_city // 2)]
+    lats, lons, hours = np.concatenate(lats), np.concatenate(lons), np.concatenate(hours)
+    categories = list(rng.choice(CATEGORIES, len(lats)))
+    return lats, lons, hours, np.ones(len(lats), dtype=np.float32), None, categories
+
+
+def random_points(count, rng):
+    city = np.array(CITIES)[rng.integers(0, len(CITIES), count)]
+    return (city[:, 0] + rng.uniform(-0.2, 0.2, count), city[:, 1] + rng.uniform(-0.2, 0.2, count),
+            rng.integers(0, 168, count))
+
+
+def random_routes(count, rng, waypoints=12):
+    """Candidate routes across Kolkata between the same two ends, wandering differently"""
+    start, end = np.array([22.45, 88.30]), np.array([22.65, 88.42])
+    routes = []
+    for _ in range(count):
+        steps = np.linspace(0, 1, waypoints)[:, None]
+        wander = rng.normal(0, 0.02, (waypoints, 2)) * np.sin(np.pi * steps)
+        routes.append((start + (end - start) * steps + wander).tolist())
+    return routes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--incidents-count", type=int, default=200000, help="synthetic incidents")
+    parser.add_argument("--incidents", help="CSV/Parquet incident file instead of synthetic data")
+    parser.add_argument("--points", type=int, default=5000, help="points per batch")
+    parser.add_argument("--single", type=int, default=200, help="single-point assessments timed")
+    parser.add_argument("--routes", type=int, default=5, help="candidate routes compared")
+    args = parser.parse_args()
+
+    check_time_parsing()
+    rng = np.random.default_rng(7)
+    started = time.perf_counter()
+    if args.incidents:
+        engine = RiskEngine.from_file(args.incidents)
+    else:
+        engine = RiskEngine(*synthetic_incidents(args.incidents_count, rng))
+    build_s = time.perf_counter() - started
+
+    lats, lons, hours = random_points(args.points, rng)
+
+    single = []
+    for i in range(min(args.single, args.points)):
+        started = time.perf_counter()
+        engine.assess(lats[i], lons[i], hours[i])
+        single.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    batch = engine.score_many(lats, lons, hours)
+    batch_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    for i in range(args.points):
+        engine.score_many(lats[i:i + 1], lons[i:i + 1], hours[i:i + 1])
+    looped_ms = (time.perf_counter() - started) * 1000
+
+    routes = random_routes(args.routes, rng)
+    started = time.perf_counter()
+    compared = score_routes(routes, 4 * 24 + 22, engine=engine)
+    routes_ms = (time.perf_counter() - started) * 1000
+    samples = sum(len(route["segments"]) for route in compared["routes"])
+    safest = compared["routes"][compared["safest"]]
+
+    labels = np.bincount(batch["label"], minlength=len(LABELS))
+    print(f"Travel times: {len(TIME_CASES)} readings checked")
+    print(f"Risk engine: {engine.incidents} incidents in {len(engine.keys)} cells, built in {build_s:.2f}s")
+    print(f"  single assessment: median {statistics.median(single):.2f} ms")
+    print(f"  {args.points} points batched: {batch_ms:.1f} ms ({args.points / batch_ms * 1000:,.0f} points/s)")
+    print(f"  {args.points} points one by one: {looped_ms:.1f} ms")
+    print("  labels: " + ", ".join(f"{name} {count}" for name, count in zip(LABELS, labels)))
+    print(f"  {args.routes} routes compared in {routes_ms:.1f} ms ({samples} segments); safest is "
+          f"#{compared['safest']} ({safest['length_km']:.1f} km, {safest['label']}, exposure {safest['exposure']})")
+
+
+if __name__ == "__main__":
+    main()
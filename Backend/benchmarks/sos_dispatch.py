@@ -0,0 +1,109 @@
+"""Time to first SOS notification: geocode-then-send vs two-phase dispatch.
+
+Runs a local stand-in for Nominatim that answers after a fixed delay and a
+stand-in mailer shaped like one SMTP_SSL login plus a send per message, then
+times send_sos_alert_from_mobile() from the call until the first email is
+delivered, with and without two-phase dispatch. The outbox and caches live
+in a temporary directory. Run from the Backend directory:
+
+    python benchmarks/sos_dispatch.py [--runs 5] [--geocode-ms 1200] [--smtp-ms 150]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TMP_DIR = tempfile.mkdtemp(prefix="sos-bench-")
+os.environ["SOS_OUTBOX_DB"] = os.path.join(TMP_DIR, "outbox.db")
+
+import module.geocode as geocode
+from module.cache import PersistentCache
+from module.notification import NotificationSystem
+
+
+def make_handler(delay):
+    class StandInNominatim(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(delay)
+            payload = json.dumps({"display_name": "Park Street, Kolkata, West Bengal, India"}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return StandInNominatim
+
+
+class StandInMailer:
+    """SMTPBatchSender-shaped: one login per batch, then a short send per message"""
+
+    def __init__(self, login_delay, send_delay=0.01):
+        self.login_delay = login_delay
+        self.send_delay = send_delay
+
+    def send_batch(self, messages):
+        time.sleep(self.login_delay + self.send_delay * len(messages))
+        return [(True, None)] * len(messages)
+
+    def stats(self):
+        return {}
+
+
+def first_notification(system, two_phase):
+    system.two_phase = two_phase
+    system.last_sent_time = 0
+    # A new spot every run so the address is never cached yet
+    lat = 22.5 + random.random() / 10
+    lon = 88.3 + random.random() / 10
+    result = system.send_sos_alert_from_mobile(lat, lon)
+    return result["time_to_first_notification"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--geocode-ms", type=float, default=1200.0, help="stand-in Nominatim response time")
+    parser.add_argument("--smtp-ms", type=float, default=150.0, help="stand-in SMTP connect and login time")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.geocode_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    geocode.NOMINATIM_URL = f"http://127.0.0.1:{server.server_port}/reverse"
+    geocode._geocoder = geocode.ReverseGeocoder(
+        timeout=max(geocode.GEOCODE_TIMEOUT, 2 * args.geocode_ms / 1000),
+        cache=PersistentCache("geocode", db_path=os.path.join(TMP_DIR, "cache.db"))
+    )
+
+    system = NotificationSystem()
+    system.sender_email = system.sender_email or "bench@example.com"
+    system.sender_password = system.sender_password or "bench"
+    system.mailer = StandInMailer(args.smtp_ms / 1000)
+
+    single = [first_notification(system, two_phase=False) for _ in range(args.runs)]
+    two_phase = [first_notification(system, two_phase=True) for _ in range(args.runs)]
+    # Let the last follow-ups go out before the stand-ins stop
+    time.sleep(args.geocode_ms / 1000 + 0.5)
+    server.shutdown()
+
+    stats = system.outbox.stats()
+    print(f"Time to first notification over {args.runs} runs "
+          f"(geocode {args.geocode_ms:.0f} ms, SMTP login {args.smtp_ms:.0f} ms):")
+    print(f"  geocode first: median {statistics.median(single):.3f}s")
+    print(f"  two-phase:     median {statistics.median(two_phase):.3f}s")
+    print(f"  follow-ups sent: {stats['sent'] - 2 * len(system.emergency_contacts) * args.runs}")
+
+
+if __name__ == "__main__":
+    main()
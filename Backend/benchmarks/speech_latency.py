@@ -0,0 +1,61 @@
+"""Recognition-to-return latency: DOM polling vs push delivery in SpeechRecognitionEngine.
+
+Needs Chrome/chromedriver. A result is injected into the generated Voice.html
+after a random delay (through the same handler recognition.onresult uses) and
+the time until wait_for_result() returns in Python is measured against the
+page's own timestamp. Run from the Backend directory:
+
+    python benchmarks/speech_latency.py [--runs 20]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module.speech import SpeechRecognitionEngine
+
+INJECT_JS = """
+const text = arguments[0];
+setTimeout(function() {
+    window.benchRecognizedAt = performance.timeOrigin + performance.now();
+    handleRecognized(text);
+}, arguments[1]);
+"""
+
+
+def measure(engine, mode, runs):
+    latencies = []
+    for _ in range(runs):
+        engine.driver.execute_script("window.resetResult(); window.benchRecognizedAt = null;")
+        engine.driver.execute_script(INJECT_JS, "safe route home", random.randint(200, 1500))
+        engine.is_listening = True
+        text = engine.wait_for_result(10, mode=mode)
+        returned_at = time.time() * 1000
+        engine.is_listening = False
+        recognized_at = engine.driver.execute_script("return window.benchRecognizedAt;")
+        if text and recognized_at:
+            latencies.append(returned_at - recognized_at)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = SpeechRecognitionEngine()
+    try:
+        for mode in ("poll", "push"):
+            latencies = measure(engine, mode, args.runs)
+            print(f"{mode:>5}: median {statistics.median(latencies):6.1f} ms, "
+                  f"max {max(latencies):6.1f} ms over {len(latencies)} results")
+    finally:
+        engine.cleanup()
+
+
+if __name__ == "__main__":
+    main()
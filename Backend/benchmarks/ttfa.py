@@ -0,0 +1,125 @@
+"""Time-to-first-audio: buffered LLM -> TTS path vs the streaming pipeline.
+
+Runs a local stand-in for the Together chat completions endpoint that emits
+tokens at a fixed rate, and a stand-in synthesizer whose latency grows with
+text length. Run from the Backend directory:
+
+    python benchmarks/ttfa.py [--runs 5] [--token-ms 20] [--edge-tts]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from module.httpclient import get_http_client
+from module.streaming import StreamingSpeaker, iter_sse_text
+
+SAMPLE_RESPONSE = (
+    "**High Risk:** Kidderpore, Kolkata raat 10 baje travel karna safe nahi hai, especially agar aap akeli ho. "
+    "Reports ke hisaab se yahaan chori aur ched-chad jaise cases report hue hain. "
+    "**Precautions:** Akeli mat nikliye, trusted vehicle ka use kariye, aur well-lit areas mein hi rahiyega. "
+    "**Suggestion:** Alipore ya Park Street jaise jagah better hain, wahan security aur camera coverage zyada hai. "
+    "Raat ko late travel karna ho toh apni live location family ke saath share karein."
+)
+
+
+def make_handler(token_delay):
+    tokens = [word + " " for word in SAMPLE_RESPONSE.split(" ")]
+
+    class StandInCompletions(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if body.get("stream"):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for token in tokens:
+                    time.sleep(token_delay)
+                    chunk = {"choices": [{"delta": {"content": token}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+            else:
+                time.sleep(token_delay * len(tokens))
+                payload = json.dumps({"choices": [{"message": {"content": "".join(tokens)}}]}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+    return StandInCompletions
+
+
+def stand_in_synthesizer(text):
+    """Roughly edge_tts-shaped: a fixed round trip plus time per character"""
+    time.sleep(0.25 + 0.004 * len(text))
+    return text
+
+
+class TimingPlayer:
+    def __init__(self):
+        self.first_play = None
+
+    def play(self, clip):
+        if self.first_play is None:
+            self.first_play = time.perf_counter()
+
+    def wait(self, func=None):
+        pass
+
+
+def buffered_ttfa(url, synthesize):
+    started = time.perf_counter()
+    response = get_http_client().post(url, json={"prompt": "x"}, timeout=30)
+    text = response.json()["choices"][0]["message"]["content"]
+    player = TimingPlayer()
+    player.play(synthesize(text))
+    return player.first_play - started
+
+
+def streaming_ttfa(url, synthesize):
+    started = time.perf_counter()
+    response = get_http_client().post(url, json={"prompt": "x", "stream": True}, stream=True, timeout=30)
+    speaker = StreamingSpeaker(synthesize=synthesize, player=TimingPlayer())
+    speaker.speak(iter_sse_text(response), started=started)
+    return speaker.metrics["time_to_first_audio"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--token-ms", type=float, default=20.0, help="stand-in LLM delay per token")
+    parser.add_argument("--edge-tts", action="store_true", help="synthesize with edge_tts instead of the stand-in")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.token_ms / 1000))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/v1/chat/completions"
+
+    if args.edge_tts:
+        from module.streaming import edge_tts_synthesizer
+        synthesize = edge_tts_synthesizer()
+    else:
+        synthesize = stand_in_synthesizer
+
+    buffered = [buffered_ttfa(url, synthesize) for _ in range(args.runs)]
+    streaming = [streaming_ttfa(url, synthesize) for _ in range(args.runs)]
+    server.shutdown()
+
+    print(f"Time to first audio over {args.runs} runs ({args.token_ms:.0f} ms/token):")
+    print(f"  buffered:  median {statistics.median(buffered):.3f}s")
+    print(f"  streaming: median {statistics.median(streaming):.3f}s")
+
+
+if __name__ == "__main__":
+    main()
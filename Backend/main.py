@@ -2,30 +2,59 @@
 import time
 import os
 import threading
+import argparse
 from dotenv import load_dotenv
-import pygame
 
 # Import all modules
-from safety import get_safety_status, show_welcome_message, recognize_speech
+from safety import (get_safety_status, stream_safety_status, clean_response_for_tts,
+                    show_welcome_message, recognize_speech, get_cache_stats,
+                    get_local_risk, describe_local_risk)
 from module.sos import get_sos_system, activate_sos, start_voice_activation, deactivate_sos
-from module.text import TTS
+from module.text import (TTS, SpeakInBackground, get_tts_cache_stats,
+                         SOSActivatedPhrase, SOSCancelledPhrase, SOSLocationPhrase, VoiceSOSPhrase)
+from module.audio import get_audio_service, shutdown_audio_service
 from module.notification import get_sos_system as get_notification_system
+from module.httpclient import get_http_client
+from module.streaming import StreamingSpeaker
+from module.prewarm import start_prewarm
+from module.hotword import load_trigger_phrases
+from module.outbox import get_outbox_stats
+from module.speech import prewarm_speech_engine, cleanup_speech_engine, get_speech_pool_stats
+from module.risk import get_risk_stats
 
 # Load environment variables
 load_dotenv()
 
+# Speak safety reports sentence by sentence while the LLM is still generating
+STREAM_TTS = os.getenv("STREAM_TTS", "0") == "1"
+# Launch the speech recognition browser at startup instead of on the first voice query
+SPEECH_PREWARM = os.getenv("SPEECH_PREWARM", "1") == "1"
+
 class SafetyApp:
     def __init__(self):
         self.running = True
         self.sos_system = get_sos_system()
         self.notification_system = get_notification_system()
         
-        # Initialize pygame for audio
-        pygame.mixer.init()
+        # One shared audio runtime (mixer, playback thread, synthesis loop)
+        self.audio = get_audio_service()
+        
+        # Warm emergency/UI phrases in the background so they play instantly
+        self.prewarmer = start_prewarm(on_done=self._report_prewarm)
+        print(f"🔥 Warming up {self.prewarmer.status()['total']} voice phrases in background...")
+        
+        # Start Chrome for speech input now so the first "press Enter to speak" is instant
+        if SPEECH_PREWARM:
+            prewarm_speech_engine()
         
         print("🚺 Girls Safety App Initialized")
         print("=" * 50)
     
+    def _report_prewarm(self, status):
+        """Called from the warm-up thread once every phrase is ready"""
+        print(f"\n✅ Voice phrases ready: {status['warmed']}/{status['total']} "
+              f"in {status['elapsed']:.1f}s")
+    
     def show_main_menu(self):
         """Display the main menu options"""
         print("\n" + "=" * 50)
@@ -60,7 +89,18 @@ class SafetyApp:
                 print("❌ No time detected. Returning to menu.")
                 return
 
+        # Instant estimate from local incident data while the full report is generated
+        started = time.perf_counter()
+        risk = get_local_risk(location, time_of_travel)
+        if risk:
+            print(f"\n⚡ Local risk estimate: {describe_local_risk(risk)} "
+                  f"[{(time.perf_counter() - started) * 1000:.0f} ms]")
+        
         print("\n🔍 Checking safety status...")
+        if STREAM_TTS:
+            self.stream_location_safety(location, time_of_travel)
+            return
+
         safety_response = get_safety_status(location, time_of_travel)
 
         if safety_response:
@@ -75,6 +115,22 @@ class SafetyApp:
         else:
             print("❌ Could not determine safety status. Please try again.")
     
+    def stream_location_safety(self, location, time_of_travel):
+        """Speak the safety report sentence by sentence while it streams in"""
+        print(f"\n✅ Safety Report:")
+        print("-" * 40)
+        speaker = StreamingSpeaker(clean=clean_response_for_tts, on_sentence=print)
+        try:
+            speaker.speak(stream_safety_status(location, time_of_travel))
+        except Exception as e:
+            print(f"❌ Could not determine safety status: {e}")
+            return
+        print("-" * 40)
+        
+        first_audio = speaker.metrics.get("time_to_first_audio")
+        if first_audio is not None:
+            print(f"⏱️ First audio after {first_audio:.2f}s")
+    
     def activate_sos_emergency(self):
         """Option 2: Activate SOS emergency"""
         print("\n🚨 SOS EMERGENCY ACTIVATION")
@@ -88,21 +144,24 @@ class SafetyApp:
         confirm = input("\nAre you sure you want to activate SOS? (yes/no): ").strip().lower()
         if confirm in ['yes', 'y']:
             print("🆘 ACTIVATING SOS EMERGENCY SYSTEM...")
-            activate_sos()
+            # Spoken before the alert sound, which would otherwise pause it
+            activate_sos(announce=lambda: TTS(SOSActivatedPhrase))
         else:
             print("❌ SOS activation cancelled.")
+            SpeakInBackground(SOSCancelledPhrase)
     
     def start_voice_sos(self):
         """Option 3: Start voice-activated SOS in background"""
         print("\n🎤 VOICE-ACTIVATED SOS")
         print("-" * 30)
         print("Voice activation started in background...")
-        print("Say 'help me', 'emergency', or 'SOS' to activate")
+        print(f"Say {', '.join(repr(p) for p in load_trigger_phrases())} to activate")
         print("This will run until you stop it from main menu")
         
         try:
             voice_thread = start_voice_activation()
             print("✅ Voice listener started in background")
+            SpeakInBackground(VoiceSOSPhrase)
             input("Press Enter to return to menu (voice listening continues)...")
         except Exception as e:
             print(f"❌ Error starting voice activation: {e}")
@@ -119,6 +178,7 @@ class SafetyApp:
             extra_info = input("Additional info (optional): ").strip()
             
             print("\n📡 Sending SOS alert with location...")
+            SpeakInBackground(SOSLocationPhrase)
             result = self.notification_system.send_sos_alert_from_mobile(lat, lon, extra_info)
             
             if result.get("success"):
@@ -160,17 +220,53 @@ class SafetyApp:
                     print(f"Error reading {log_file}: {e}")
             else:
                 print(f"📄 {log_file}: File not found")
+        
+        stats = get_cache_stats()
+        print(f"\n💾 Safety cache: {stats['hits']} hits, {stats['misses']} misses, "
+              f"{stats['evictions']} evictions (hit rate {stats['hit_rate']:.0%})")
+        warm = self.prewarmer.status()
+        print(f"🔥 Voice warm-up: {warm['warmed']}/{warm['total']} phrases in {warm['elapsed']:.1f}s"
+              f"{'' if warm['done'] else ' (still running)'}")
+        tts_stats = get_tts_cache_stats()
+        print(f"🔊 Speech cache: {tts_stats['entries']} clips, {tts_stats['bytes_stored'] // 1024} KB "
+              f"(hit rate {tts_stats['hit_rate']:.0%})")
+        voice = self.sos_system.get_voice_stats()
+        print(f"🎙️ Voice SOS gate: {voice['frames_captured']} frames, {voice['segments_forwarded']}/"
+              f"{voice['segments_seen']} segments forwarded, {voice['recognizer_calls_avoided']} recognizer calls avoided")
+        if voice['last_detection_latency_ms'] is not None:
+            print(f"   Last voice trigger reached SOS {voice['last_detection_latency_ms']}ms after the phrase ended")
+        dispatch = self.sos_system.last_dispatch
+        if dispatch:
+            reached = sum(1 for r in dispatch['results'] if r['sms_sid'] or r['call_sid'])
+            print(f"🆘 Last SOS dispatch: {reached}/{dispatch['contacts']} contacts reached "
+                  f"in {dispatch['total_time']:.2f}s ({dispatch['pending']} sends still queued)")
+        outbox = get_outbox_stats()
+        print(f"📮 SOS outbox: {outbox['queue_depth']} queued, {outbox['sent']} sent, {outbox['failed']} failed, "
+              f"delivery p50 {outbox['delivery_p50_ms']}ms, p95 {outbox['delivery_p95_ms']}ms, "
+              f"first notification p50 {outbox['first_notification_p50_ms']}ms")
+        speech_stats = get_speech_pool_stats()
+        print(f"🎤 Speech sessions: {speech_stats['sessions']}/{speech_stats['size']} open, "
+              f"{speech_stats['checkouts']} checkouts, wait p95 {speech_stats['wait_p95_ms']}ms, "
+              f"{speech_stats['recycled']} recycled")
+        risk_stats = get_risk_stats()
+        if risk_stats:
+            print(f"⚡ Risk engine: {risk_stats['incidents']} incidents in {risk_stats['cells']} cells, "
+                  f"{risk_stats['points_scored']} points scored, avg batch {risk_stats['avg_batch_ms']}ms")
+        for host, host_stats in get_http_client().stats().items():
+            print(f"🌐 {host}: {host_stats['requests']} requests, {host_stats['errors']} errors, "
+                  f"p50 {host_stats['p50_ms']}ms, p95 {host_stats['p95_ms']}ms")
     
     def exit_app(self):
         """Option 6: Exit the application"""
         print("\n👋 Thank you for using Girls Safety App!")
         print("Stay safe! 💕")
         self.running = False
-        deactivate_sos()
+        # Leaving the app stops the alarm but not an SOS already being delivered
+        deactivate_sos(cancel=False)
         
-        # Clean up pygame
-        if pygame.mixer.get_init():
-            pygame.mixer.quit()
+        # Release the audio runtime and the speech browser
+        shutdown_audio_service()
+        cleanup_speech_engine()
     
     def run(self):
         """Main application loop"""
@@ -211,6 +307,17 @@ class SafetyApp:
 
 def main():
     """Main function to run the safety app"""
+    parser = argparse.ArgumentParser(description="Girls Safety App")
+    parser.add_argument("--serve", action="store_true", help="run the HTTP API instead of the interactive menu")
+    parser.add_argument("--host", help="API host (default SERVER_HOST or 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="API port (default SERVER_PORT or 5000)")
+    args = parser.parse_args()
+    
+    if args.serve:
+        from server import serve
+        serve(args.host, args.port)
+        return
+    
     try:
         app = SafetyApp()
         app.run()
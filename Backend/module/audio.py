@@ -0,0 +1,220 @@
+import io
+import queue
+import asyncio
+import logging
+import threading
+import time
+import pygame
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SPEECH_CHANNEL = 0
+ALERT_CHANNEL = 1
+
+POLL_INTERVAL = 0.005
+
+
+class SpeechItem:
+    """One queued utterance; ``done`` is set when it finished or was cancelled"""
+
+    def __init__(self, clip):
+        self.clip = clip
+        self.started = threading.Event()
+        self.done = threading.Event()
+        self.cancelled = False
+
+    def wait(self, func=lambda r=None: True, poll=0.1):
+        """Block until played; stops early when func() returns False"""
+        while not self.done.wait(poll):
+            if func() is False:
+                return False
+        return not self.cancelled
+
+
+class AudioService:
+    """Long-lived audio runtime shared by TTS, streaming speech and SOS alerts.
+
+    The mixer is initialised once. Speech clips are played in order by a
+    dedicated playback thread on their own channel (the next clip is decoded
+    while the current one plays), and alerts use a separate channel that
+    pauses speech while it sounds. A persistent asyncio loop thread runs
+    synthesis coroutines so callers never create their own event loop.
+    """
+
+    def __init__(self):
+        self.available = True
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            pygame.mixer.set_reserved(2)
+            self.speech_channel = pygame.mixer.Channel(SPEECH_CHANNEL)
+            self.alert_channel = pygame.mixer.Channel(ALERT_CHANNEL)
+        except pygame.error as e:
+            logger.warning(f"Audio output unavailable, playback disabled: {e}")
+            self.available = False
+
+        self._preloaded = {}
+        self._alert_active = False
+        self._alert_lock = threading.Lock()
+        self._speech_queue = queue.Queue()
+        self._current = None
+        self._running = True
+
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, name="audio-synthesis", daemon=True)
+        self._loop_thread.start()
+
+        self._playback_thread = threading.Thread(target=self._playback_loop, name="audio-playback", daemon=True)
+        self._playback_thread.start()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the persistent synthesis loop; returns a concurrent Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the persistent synthesis loop and return its result"""
+        return self.submit(coro).result(timeout)
+
+    def load(self, clip):
+        """Decode a clip (file path or in-memory mp3 bytes) into a mixer Sound"""
+        if isinstance(clip, pygame.mixer.Sound):
+            return clip
+        if isinstance(clip, (bytes, bytearray)):
+            return pygame.mixer.Sound(file=io.BytesIO(clip))
+        return pygame.mixer.Sound(clip)
+
+    def preload(self, key, clip):
+        """Decode a clip now and keep it in memory under key for instant playback"""
+        if not self.available:
+            return None
+        sound = self.load(clip)
+        self._preloaded[key] = sound
+        return sound
+
+    def get_preloaded(self, key):
+        return self._preloaded.get(key)
+
+    def _speech_busy(self):
+        return self._alert_active or self.speech_channel.get_busy()
+
+    def _finish_current(self):
+        if self._current is not None:
+            self._current.done.set()
+            self._current = None
+
+    def _playback_loop(self):
+        while self._running:
+            if self._current is not None and not self._speech_busy():
+                self._finish_current()
+            try:
+                item = self._speech_queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            if item.cancelled:
+                item.done.set()
+                continue
+
+            try:
+                sound = self.load(item.clip)
+            except Exception as e:
+                logger.error(f"Could not load speech clip: {e}")
+                item.cancelled = True
+                item.done.set()
+                continue
+
+            # Decoded ahead of time; start it the moment the previous clip ends
+            while self._running and self._speech_busy() and not item.cancelled:
+                time.sleep(POLL_INTERVAL)
+            self._finish_current()
+            if item.cancelled or not self._running:
+                item.done.set()
+                continue
+
+            self.speech_channel.play(sound)
+            self._current = item
+            item.started.set()
+
+        self._finish_current()
+
+    def play_speech(self, clip):
+        """Queue a clip (path, mp3 bytes or Sound) for speech playback and return its SpeechItem"""
+        item = SpeechItem(clip)
+        if not self.available:
+            item.done.set()
+            return item
+        self._speech_queue.put(item)
+        return item
+
+    def stop_speech(self):
+        """Cancel queued speech and stop whatever is playing"""
+        while True:
+            try:
+                item = self._speech_queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.cancelled = True
+                item.done.set()
+        if self._current is not None:
+            self._current.cancelled = True
+        if self.available:
+            self.speech_channel.stop()
+
+    def play_alert(self, clip, loops=-1):
+        """Sound an alert immediately, pausing any speech until stop_alert()"""
+        if not self.available:
+            return False
+        sound = self.load(clip)
+        with self._alert_lock:
+            self._alert_active = True
+            self.speech_channel.pause()
+            self.alert_channel.play(sound, loops=loops)
+        return True
+
+    def stop_alert(self):
+        """Silence the alert channel and resume paused speech"""
+        if not self.available:
+            return
+        with self._alert_lock:
+            self.alert_channel.stop()
+            self._alert_active = False
+            self.speech_channel.unpause()
+
+    def shutdown(self):
+        self._running = False
+        self._speech_queue.put(None)
+        self._playback_thread.join(timeout=1)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join(timeout=1)
+        if self.available and pygame.mixer.get_init():
+            pygame.mixer.quit()
+
+
+# Global instance
+_audio_service = None
+_audio_service_lock = threading.Lock()
+
+
+def get_audio_service():
+    """Get or create the shared audio service"""
+    global _audio_service
+    with _audio_service_lock:
+        if _audio_service is None:
+            _audio_service = AudioService()
+    return _audio_service
+
+
+def shutdown_audio_service():
+    """Stop the audio threads and release the mixer"""
+    global _audio_service
+    with _audio_service_lock:
+        if _audio_service is not None:
+            _audio_service.shutdown()
+            _audio_service = None
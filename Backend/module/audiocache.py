@@ -0,0 +1,126 @@
+import os
+import hashlib
+import logging
+import threading
+import tempfile
+from collections import OrderedDict
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class AudioCache:
+    """Content-addressed on-disk cache of synthesized speech.
+
+    Clips are stored as ``<sha256(voice, rate, text)>.mp3`` so the same
+    phrase spoken with the same voice settings is synthesized once. The
+    directory is capped at ``max_bytes``; least recently used clips are
+    evicted first (recency survives restarts through file mtimes).
+    """
+
+    def __init__(self, cache_dir, max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from the files already on disk"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp3"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name[:-4], stat.st_size))
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._bytes += size
+        self._evict()
+
+    @staticmethod
+    def make_key(text, voice, rate):
+        return hashlib.sha256(f"{voice}\0{rate}\0{text}".encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def get(self, text, voice, rate):
+        """Path of the cached clip for this phrase, or None"""
+        key = self.make_key(text, voice, rate)
+        with self._lock:
+            if key not in self._entries:
+                self._stats["misses"] += 1
+                return None
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                # Removed behind our back (another process evicted it)
+                self._bytes -= self._entries.pop(key)
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put_bytes(self, text, voice, rate, data):
+        """Store a clip and return its cached path"""
+        key = self.make_key(text, voice, rate)
+        path = self.path_for(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._bytes += len(data)
+            self._stats["stores"] += 1
+            self._evict()
+        return path
+
+    def put_file(self, text, voice, rate, src_path):
+        """Copy an already synthesized file into the cache"""
+        with open(src_path, "rb") as f:
+            return self.put_bytes(text, voice, rate, f.read())
+
+    def _evict(self):
+        """Drop least recently used clips until under the size cap (lock held)"""
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError as e:
+                logger.debug(f"Could not remove evicted clip {key}: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes_stored"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,248 @@
+import json
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "data" / "cache.db"
+
+
+class PersistentCache:
+    """Two-tier cache: an in-process LRU in front of a shared SQLite (WAL) store.
+
+    Every entry carries its own expiry time. The memory tier is bounded by
+    ``max_entries`` and evicts least recently used keys; the disk tier survives
+    restarts, can be shared by several worker processes and is pruned to
+    ``max_disk_entries``. Values must be JSON serialisable.
+    """
+
+    def __init__(self, name, db_path=None, max_entries=256, ttl=6 * 3600,
+                 max_disk_entries=10000):
+        self.name = name
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_disk_entries = max_disk_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+            "sets": 0,
+            "disk_errors": 0,
+        }
+
+        self._disk_enabled = True
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection()
+        except Exception as e:
+            logger.warning(f"Cache '{name}' running memory-only, disk tier unavailable: {e}")
+            self._disk_enabled = False
+
+    def _connection(self):
+        """One SQLite connection per thread, created lazily"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed "
+                "ON cache (namespace, accessed_at)"
+            )
+            conn.commit()
+            self._local.conn = conn
+        return conn
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self._stats[stat] += amount
+
+    def _remember(self, key, value, expires_at):
+        """Insert into the memory tier, evicting the LRU entries over the cap"""
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss or expiry"""
+        now = time.time()
+        expired = False
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                expired = True
+
+        if self._disk_enabled:
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.name, key)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = json.loads(row[0]), row[1]
+                    if expires_at > now:
+                        conn.execute(
+                            "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                            (now, self.name, key)
+                        )
+                        conn.commit()
+                        self._remember(key, value, expires_at)
+                        with self._lock:
+                            self._stats["hits"] += 1
+                            self._stats["disk_hits"] += 1
+                        return value
+                    conn.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                        (self.name, key)
+                    )
+                    conn.commit()
+                    expired = True
+            except Exception as e:
+                logger.warning(f"Cache '{self.name}' disk read error: {e}")
+                self._count("disk_errors")
+
+        with self._lock:
+            self._stats["misses"] += 1
+            if expired:
+                self._stats["expired"] += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        """Store value under key for ttl seconds (defaults to the cache TTL)"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._remember(key, value, expires_at)
+        self._count("sets")
+
+        if not self._disk_enabled:
+            return
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self.name, key, json.dumps(value), expires_at, now)
+            )
+            conn.commit()
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % 100 == 0
+            if prune:
+                self.prune()
+        except Exception as e:
+            logger.warning(f"Cache '{self.name}' disk write error: {e}")
+            self._count("disk_errors")
+
+    def delete(self, key):
+        """Remove key from both tiers"""
+        with self._lock:
+            self._memory.pop(key, None)
+        if self._disk_enabled:
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                    (self.name, key)
+                )
+                conn.commit()
+            except Exception as e:
+                logger.warning(f"Cache '{self.name}' disk delete error: {e}")
+                self._count("disk_errors")
+
+    def prune(self):
+        """Drop expired rows and trim the disk tier to max_disk_entries"""
+        if not self._disk_enabled:
+            return
+        try:
+            conn = self._connection()
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?",
+                (self.name, time.time())
+            )
+            cursor = conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                " SELECT key FROM cache WHERE namespace = ?"
+                " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.name, self.name, self.max_disk_entries)
+            )
+            conn.commit()
+            if cursor.rowcount and cursor.rowcount > 0:
+                self._count("disk_evictions", cursor.rowcount)
+        except Exception as e:
+            logger.warning(f"Cache '{self.name}' prune error: {e}")
+            self._count("disk_errors")
+
+    def clear(self):
+        """Remove every entry in this namespace"""
+        with self._lock:
+            self._memory.clear()
+        if self._disk_enabled:
+            conn = self._connection()
+            conn.execute("DELETE FROM cache WHERE namespace = ?", (self.name,))
+            conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._memory)
+
+    def stats(self):
+        """Snapshot of the hit/miss/eviction counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Named cache instances
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name, **kwargs):
+    """Get or create the named cache instance"""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = PersistentCache(name, **kwargs)
+        return _caches[name]
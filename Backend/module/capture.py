@@ -0,0 +1,151 @@
+import time
+import logging
+import threading
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """Fixed-size byte ring addressed by absolute stream offset.
+
+    The writer never blocks; once the ring is full the oldest audio is
+    overwritten. Readers ask for ``[start, end)`` in stream offsets and can
+    wait until the writer has reached a given offset.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = bytearray(capacity)
+        self.written = 0
+        self.written_at = None
+        self._cond = threading.Condition()
+
+    def write(self, chunk):
+        with self._cond:
+            chunk = chunk[-self.capacity:]
+            pos = self.written % self.capacity
+            head = min(len(chunk), self.capacity - pos)
+            self._data[pos:pos + head] = chunk[:head]
+            self._data[:len(chunk) - head] = chunk[head:]
+            self.written += len(chunk)
+            self.written_at = time.perf_counter()
+            self._cond.notify_all()
+
+    def oldest(self):
+        """Smallest offset still held"""
+        return max(0, self.written - self.capacity)
+
+    def read(self, start, end):
+        """Bytes for [start, end); start is clamped to the oldest byte still held"""
+        with self._cond:
+            start = max(start, self.oldest())
+            end = min(end, self.written)
+            if start >= end:
+                return b""
+            a, b = start % self.capacity, end % self.capacity
+            if a < b:
+                return bytes(self._data[a:b])
+            return bytes(self._data[a:]) + bytes(self._data[:b])
+
+    def wait_for(self, offset, timeout=None):
+        """Block until offset bytes have been written; False on timeout"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.written >= offset, timeout)
+
+    def time_of(self, offset, byte_rate):
+        """perf_counter() time at which the byte at offset was captured"""
+        with self._cond:
+            return self.written_at - (self.written - offset) / byte_rate
+
+
+class ContinuousCapture:
+    """Microphone capture that never pauses, cut into overlapping windows.
+
+    A capture thread keeps the microphone open and appends every chunk to
+    a RingBuffer holding ``buffer_s`` seconds. ``windows()`` yields
+    ``window_s`` seconds of audio every ``hop_s`` seconds, so a phrase
+    that straddles one window boundary is whole in the next window. A
+    consumer that falls more than the ring behind skips ahead to the
+    newest audio rather than working through stale windows.
+    """
+
+    def __init__(self, microphone, window_s=3.0, hop_s=1.0, buffer_s=10.0):
+        self.microphone = microphone
+        self.window_s = window_s
+        self.hop_s = hop_s
+        self.buffer_s = max(buffer_s, window_s + hop_s)
+        self.ring = None
+        self.sample_rate = None
+        self.sample_width = None
+        self.byte_rate = None
+        self.dropped_windows = 0
+        self._running = False
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self, timeout=5):
+        self._running = True
+        self._thread = threading.Thread(target=self._capture, name="mic-capture", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            raise RuntimeError("Microphone did not start")
+        if self.ring is None:
+            raise RuntimeError("Microphone could not be opened")
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _capture(self):
+        try:
+            with self.microphone as source:
+                self.sample_rate = source.SAMPLE_RATE
+                self.sample_width = source.SAMPLE_WIDTH
+                self.byte_rate = self.sample_rate * self.sample_width
+                self.ring = RingBuffer(int(self.buffer_s * self.byte_rate))
+                self._ready.set()
+                while self._running:
+                    self.ring.write(source.stream.read(source.CHUNK))
+        except Exception as e:
+            logger.error(f"Microphone capture stopped: {e}")
+        finally:
+            self._running = False
+            self._ready.set()
+
+    def _align(self, offset):
+        return offset - offset % self.sample_width
+
+    def read_seconds(self, seconds):
+        """Block until the next ``seconds`` of audio is captured and return it"""
+        start = self.ring.written
+        end = self._align(start + int(seconds * self.byte_rate))
+        while self._running and not self.ring.wait_for(end, timeout=0.5):
+            pass
+        return self.ring.read(start, end)
+
+    def windows(self):
+        """Yield (raw, start_offset) for each overlapping window while capturing"""
+        window = self._align(int(self.window_s * self.byte_rate))
+        hop = self._align(int(self.hop_s * self.byte_rate))
+        end = max(window, self._align(self.ring.written))
+        while self._running:
+            if not self.ring.wait_for(end, timeout=0.5):
+                continue
+            # Fell behind by more than the ring: jump to the newest full window
+            if end - window < self.ring.oldest():
+                latest = self._align(self.ring.written)
+                self.dropped_windows += (latest - end) // hop
+                end = latest
+            start = end - window
+            yield self.ring.read(start, end), start
+            end += hop
+
+    def time_of(self, offset):
+        return self.ring.time_of(offset, self.byte_rate)
@@ -0,0 +1,283 @@
+import os
+import csv
+import sys
+import math
+import mmap
+import time
+import struct
+import bisect
+import logging
+import threading
+from array import array
+from pathlib import Path
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Gazetteer source: a GeoNames dump (e.g. IN.txt or cities500.txt) or a CSV with
+# name, lat, lon and optional region, country columns. Unset disables offline geocoding.
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", "")
+# Compiled form of the source, rebuilt whenever the source is newer
+GAZETTEER_INDEX = os.getenv("GAZETTEER_INDEX", "")
+# Grid cell size of the spatial index, degrees (0.1 ~ 11 km)
+GAZETTEER_CELL_DEG = float(os.getenv("GAZETTEER_CELL_DEG", "0.1"))
+# Places further away than this are not used as an address, km
+GAZETTEER_MAX_KM = float(os.getenv("GAZETTEER_MAX_KM", "25"))
+# GeoNames feature classes kept: P = cities/villages, S = spots (stations, hospitals), L = areas
+GAZETTEER_FEATURE_CLASSES = os.getenv("GAZETTEER_FEATURE_CLASSES", "P")
+
+KM_PER_DEGREE = 111.195
+
+# Header: magic (byte order in the last byte), places, cells, cell size, label bytes
+_MAGIC = b"GZT" + (b"L" if sys.byteorder == "little" else b"B")
+_HEADER = struct.Struct("=4sIIdQ")
+
+
+def _read_geonames(path, classes):
+    """(label, lat, lon) from a tab-separated GeoNames dump"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 15 or (classes and cols[6] not in classes):
+                continue
+            yield f"{cols[1]}, {cols[8]}", float(cols[4]), float(cols[5])
+
+
+def _read_csv(path):
+    """(label, lat, lon) from a CSV with a header row"""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row = {k.strip().lower(): (v or "").strip() for k, v in row.items() if k}
+            lat = row.get("lat") or row.get("latitude")
+            lon = row.get("lon") or row.get("lng") or row.get("longitude")
+            if not row.get("name") or not lat or not lon:
+                continue
+            parts = [row["name"], row.get("region") or row.get("state"), row.get("country")]
+            yield ", ".join(p for p in parts if p), float(lat), float(lon)
+
+
+def read_places(path, classes=GAZETTEER_FEATURE_CLASSES):
+    """Places of a gazetteer source file as (label, lat, lon)"""
+    if str(path).lower().endswith(".csv"):
+        return _read_csv(path)
+    return _read_geonames(path, {c.strip() for c in classes.split(",") if c.strip()})
+
+
+def _cell(lat, lon, cell_deg, cols):
+    row = min(int((lat + 90.0) // cell_deg), int(180.0 / cell_deg))
+    col = int((lon + 180.0) // cell_deg) % cols
+    return row * cols + col
+
+
+def build_index(places, out_path, cell_deg=GAZETTEER_CELL_DEG):
+    """Write places ((label, lat, lon) iterable) as a gazetteer index file; returns the place count.
+
+    Places are sorted by grid cell, so each non-empty cell is one contiguous
+    run: the file holds the sorted cell keys, where each cell's run starts,
+    float32 latitudes and longitudes, label offsets and the UTF-8 labels.
+    """
+    cols = math.ceil(360.0 / cell_deg)
+    rows = sorted((_cell(lat, lon, cell_deg, cols), lat, lon, label) for label, lat, lon in places)
+
+    keys, starts = array("I"), array("I")
+    lats, lons = array("f"), array("f")
+    offsets, labels = array("I", [0]), bytearray()
+    for i, (key, lat, lon, label) in enumerate(rows):
+        if not keys or keys[-1] != key:
+            keys.append(key)
+            starts.append(i)
+        lats.append(lat)
+        lons.append(lon)
+        labels += label.encode("utf-8")
+        offsets.append(len(labels))
+    starts.append(len(rows))
+
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(rows), len(keys), cell_deg, len(labels)))
+        for section in (keys, starts, lats, lons, offsets):
+            section.tofile(f)
+        f.write(labels)
+    os.replace(tmp_path, out_path)
+    return len(rows)
+
+
+class Gazetteer:
+    """Nearest named place to a point, from a memory-mapped index file.
+
+    The index is mapped read-only and its sections are used in place as
+    typed memoryviews, so loading costs nothing up front and several
+    processes share the pages. A lookup binary-searches the cell keys for
+    the cells around the point, ring by ring, and stops as soon as no
+    further ring can hold anything closer.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = Path(index_path)
+        self._file = open(self.index_path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.places, cells, self.cell_deg, label_bytes = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC:
+            raise ValueError(f"{index_path} is not a gazetteer index for this machine")
+        self._cols = math.ceil(360.0 / self.cell_deg)
+        self._rows = int(180.0 / self.cell_deg) + 1
+
+        view = memoryview(self._map)
+        offset = _HEADER.size
+
+        def section(fmt, count):
+            nonlocal offset
+            size = count * 4
+            part = view[offset:offset + size].cast(fmt)
+            offset += size
+            return part
+
+        self._keys = section("I", cells)
+        self._starts = section("I", cells + 1)
+        self._lats = section("f", self.places)
+        self._lons = section("f", self.places)
+        self._offsets = section("I", self.places + 1)
+        self._labels = view[offset:offset + label_bytes]
+
+        self._names = None
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "found": 0, "total_us": 0.0}
+
+    @classmethod
+    def open(cls, source, index_path=None, cell_deg=GAZETTEER_CELL_DEG):
+        """Gazetteer for a source file, compiling its index first when missing or out of date"""
+        source = Path(source)
+        index_path = Path(index_path) if index_path else source.with_suffix(".gzt")
+        if not index_path.exists() or index_path.stat().st_mtime < source.stat().st_mtime:
+            started = time.perf_counter()
+            count = build_index(read_places(source), index_path, cell_deg)
+            logger.info(f"Gazetteer index built: {count} places from {source.name} "
+                        f"in {time.perf_counter() - started:.1f}s")
+        return cls(index_path)
+
+    def __len__(self):
+        return self.places
+
+    def label(self, i):
+        return bytes(self._labels[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def _name_index(self):
+        """Lower-cased place name -> place indices, built on first use"""
+        with self._lock:
+            if self._names is None:
+                names = {}
+                for i in range(self.places):
+                    names.setdefault(self.label(i).split(",")[0].strip().lower(), []).append(i)
+                self._names = names
+            return self._names
+
+    def find(self, text):
+        """Place named by text such as "Kidderpore, Kolkata", as ``{"name", "lat", "lon"}``, or None.
+
+        The first part that names a known place wins; when several places
+        share that name, the one closest to a later part (the city or
+        state) is taken.
+        """
+        names = self._name_index()
+        parts = [p.strip().lower() for p in text.split(",") if p.strip()]
+        for position, part in enumerate(parts):
+            candidates = names.get(part)
+            if not candidates:
+                continue
+            best = candidates[0]
+            context = next((names[p][0] for p in parts[position + 1:] if p in names), None)
+            if context is not None and len(candidates) > 1:
+                clat, clon = self._lats[context], self._lons[context]
+                best = min(candidates, key=lambda i: (self._lats[i] - clat) ** 2 + (self._lons[i] - clon) ** 2)
+            return {"name": self.label(best), "lat": round(self._lats[best], 6), "lon": round(self._lons[best], 6)}
+        return None
+
+    def _scan(self, key, lat, lon, cos_lat, best):
+        i = bisect.bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return best
+        lats, lons = self._lats, self._lons
+        for j in range(self._starts[i], self._starts[i + 1]):
+            dy = lats[j] - lat
+            dx = (lons[j] - lon + 180.0) % 360.0 - 180.0
+            d2 = dy * dy + dx * dx * cos_lat * cos_lat
+            if best is None or d2 < best[0]:
+                best = (d2, j)
+        return best
+
+    def nearest(self, lat, lon, max_km=GAZETTEER_MAX_KM):
+        """``{"name", "lat", "lon", "distance_km"}`` of the closest place within max_km, or None"""
+        started = time.perf_counter()
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+        row = min(int((lat + 90.0) // self.cell_deg), self._rows - 1)
+        col = int((lon + 180.0) // self.cell_deg) % self._cols
+        # Smallest cell side in km, so ring r is at least (r - 1) cells away
+        cell_km = self.cell_deg * KM_PER_DEGREE * cos_lat
+        max_ring = min(math.ceil(max_km / cell_km) + 1, self._cols // 2)
+
+        best = None
+        for ring in range(max_ring + 1):
+            if best is not None and math.sqrt(best[0]) * KM_PER_DEGREE <= (ring - 1) * cell_km:
+                break
+            for r in range(row - ring, row + ring + 1):
+                if not 0 <= r < self._rows:
+                    continue
+                step = 1 if r in (row - ring, row + ring) else 2 * ring or 1
+                for c in range(col - ring, col + ring + 1, step):
+                    best = self._scan(r * self._cols + c % self._cols, lat, lon, cos_lat, best)
+
+        result = None
+        if best is not None:
+            distance = math.sqrt(best[0]) * KM_PER_DEGREE
+            if distance <= max_km:
+                j = best[1]
+                result = {"name": self.label(j), "lat": round(self._lats[j], 6),
+                          "lon": round(self._lons[j], 6), "distance_km": round(distance, 2)}
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats["found"] += result is not None
+            self._stats["total_us"] += (time.perf_counter() - started) * 1e6
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        total_us = stats.pop("total_us")
+        stats["places"] = self.places
+        stats["avg_lookup_us"] = round(total_us / stats["lookups"], 1) if stats["lookups"] else 0.0
+        return stats
+
+
+def describe_place(place):
+    """Human-readable address for a nearest-place result"""
+    if place["distance_km"] < 0.5:
+        return f"📍 Near {place['name']}"
+    return f"📍 Near {place['name']} (~{place['distance_km']:.1f} km)"
+
+
+# Global instance
+_gazetteer = None
+_gazetteer_loaded = False
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """The shared gazetteer from GAZETTEER_PATH, or None when not configured or unreadable"""
+    global _gazetteer, _gazetteer_loaded
+    with _gazetteer_lock:
+        if not _gazetteer_loaded:
+            _gazetteer_loaded = True
+            if GAZETTEER_PATH:
+                try:
+                    _gazetteer = Gazetteer.open(GAZETTEER_PATH, GAZETTEER_INDEX or None)
+                    logger.info(f"Offline geocoding with {len(_gazetteer)} places")
+                except Exception as e:
+                    logger.warning(f"Gazetteer unavailable, offline geocoding disabled: {e}")
+    return _gazetteer
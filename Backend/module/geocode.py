@@ -0,0 +1,171 @@
+import os
+import logging
+import threading
+
+from module.cache import get_cache
+from module.coalesce import SingleFlight
+from module.gazetteer import get_gazetteer, describe_place
+from module.httpclient import get_http_client
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+
+# Geohash length of a cache cell: 6 ~ 1.2 km x 0.6 km, 7 ~ 150 m, 8 ~ 40 m.
+# Every point in a cell gets the cell's address, so the Nominatim detail follows it.
+GEOCODE_PRECISION = int(os.getenv("GEOCODE_PRECISION", "8"))
+# Addresses change rarely; keep resolved cells for a week by default
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(7 * 24 * 3600)))
+GEOCODE_CACHE_MAX_ENTRIES = int(os.getenv("GEOCODE_CACHE_MAX_ENTRIES", "512"))
+# Whole budget for a Nominatim lookup on a miss, seconds
+GEOCODE_TIMEOUT = float(os.getenv("GEOCODE_TIMEOUT", "1.5"))
+# Ask Nominatim for a street-level address on top of the offline gazetteer
+GEOCODE_REFINE = os.getenv("GEOCODE_REFINE", "1") == "1"
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Nominatim zoom no finer than a cell (8 ~ 38 m, 7 ~ 150 m, 6 ~ 1.2 km, 5 ~ 5 km):
+# 18 = building, 17 = street, 15 = settlement, 13 = suburb, 10 = city
+_ZOOM_FOR_PRECISION = {8: 18, 7: 17, 6: 15, 5: 13}
+
+
+def geohash(lat, lon, precision=GEOCODE_PRECISION):
+    """Standard geohash of a point; nearby points share a prefix"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def coordinates_address(lat, lon):
+    return f"📍 Exact Location: {lat:.6f}, {lon:.6f}"
+
+
+class ReverseGeocoder:
+    """Coordinates to address, cached per geohash cell.
+
+    Points in the same ``precision`` cell share one cache entry, so repeated
+    alerts from about the same spot resolve instantly from memory (or the
+    SQLite tier after a restart). A miss is answered offline by the nearest
+    place in the gazetteer, when one is configured, and refined by Nominatim
+    within ``timeout`` seconds unless ``refine`` is off; concurrent misses
+    for one cell share a single request. If Nominatim fails the gazetteer
+    answer (or the raw coordinates) is returned and nothing is cached, so
+    the next alert tries again.
+    """
+
+    def __init__(self, precision=GEOCODE_PRECISION, timeout=GEOCODE_TIMEOUT, cache=None,
+                 gazetteer=None, refine=GEOCODE_REFINE):
+        self.precision = precision
+        self.zoom = _ZOOM_FOR_PRECISION.get(min(precision, 8), 10)
+        self.timeout = timeout
+        self.cache = cache or get_cache("geocode", ttl=GEOCODE_CACHE_TTL,
+                                        max_entries=GEOCODE_CACHE_MAX_ENTRIES)
+        self.gazetteer = gazetteer if gazetteer is not None else get_gazetteer()
+        self.refine = refine
+        self.inflight = SingleFlight()
+        self._lock = threading.Lock()
+        self._stats = {"lookups": 0, "cache_hits": 0, "gazetteer": 0, "nominatim": 0, "fallbacks": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _nominatim(self, lat, lon):
+        response = get_http_client().get(
+            NOMINATIM_URL,
+            params={"format": "json", "lat": lat, "lon": lon, "zoom": self.zoom},
+            timeout=self.timeout, deadline=self.timeout, retries=0
+        )
+        response.raise_for_status()
+        address = response.json().get("display_name")
+        if not address:
+            raise ValueError("no address in Nominatim response")
+        self.cache.set(geohash(lat, lon, self.precision), address)
+        self._count("nominatim")
+        logger.info("OpenStreetMap geocoding successful")
+        return address
+
+    def _offline(self, lat, lon, cell):
+        """Gazetteer answer, else the raw coordinates"""
+        place = self.gazetteer.nearest(lat, lon) if self.gazetteer is not None else None
+        if place:
+            self._count("gazetteer")
+            return {"address": f"{describe_place(place)}\n{coordinates_address(lat, lon)}",
+                    "source": "gazetteer", "cell": cell}
+        self._count("fallbacks")
+        return {"address": coordinates_address(lat, lon), "source": "coordinates", "cell": cell}
+
+    def reverse(self, lat, lon, refine=None):
+        """``{"address", "source", "cell"}``; source is cache, nominatim, gazetteer or coordinates.
+
+        ``refine=False`` never touches the network (the default is the
+        geocoder's ``refine`` setting).
+        """
+        self._count("lookups")
+        cell = geohash(lat, lon, self.precision)
+        address = self.cache.get(cell)
+        if address:
+            self._count("cache_hits")
+            return {"address": address, "source": "cache", "cell": cell}
+
+        if not (self.refine if refine is None else refine):
+            return self._offline(lat, lon, cell)
+
+        try:
+            address = self.inflight.do(cell, self._nominatim, lat, lon)
+        except Exception as e:
+            logger.warning("OpenStreetMap failed: %s", e)
+            return self._offline(lat, lon, cell)
+
+        return {"address": address, "source": "nominatim", "cell": cell}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["coalesced"] = self.inflight.stats()["coalesced"]
+        stats["hit_rate"] = stats["cache_hits"] / stats["lookups"] if stats["lookups"] else 0.0
+        if self.gazetteer is not None:
+            stats["gazetteer_index"] = self.gazetteer.stats()
+        return stats
+
+
+# Global instance
+_geocoder = None
+_geocoder_lock = threading.Lock()
+
+
+def get_reverse_geocoder():
+    """Get or create the shared reverse geocoder"""
+    global _geocoder
+    with _geocoder_lock:
+        if _geocoder is None:
+            _geocoder = ReverseGeocoder()
+    return _geocoder
+
+
+def get_geocode_stats():
+    return get_reverse_geocoder().stats()
@@ -0,0 +1,268 @@
+import os
+import re
+import abc
+import json
+import time
+import logging
+import threading
+import unicodedata
+import speech_recognition as sr
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TRIGGER_PHRASES = ["help me", "emergency", "sos"]
+# Extra trigger phrases, comma separated, e.g. "bachao,madad karo" (or Devanagari for a Hindi Vosk model)
+SOS_HINDI_PHRASES = os.getenv("SOS_HINDI_PHRASES", "bachao,madad karo,bachao mujhe")
+# auto | vosk | sphinx | none
+SOS_LOCAL_BACKEND = os.getenv("SOS_LOCAL_BACKEND", "auto").lower()
+# Directory of an unpacked Vosk model (e.g. vosk-model-small-en-in or vosk-model-small-hi)
+SOS_VOSK_MODEL = os.getenv("SOS_VOSK_MODEL", "")
+# Keyword spotting threshold for Sphinx, 0 (strict) to 1 (eager)
+SOS_SPHINX_SENSITIVITY = float(os.getenv("SOS_SPHINX_SENSITIVITY", "0.8"))
+# Ask the cloud recognizer to confirm a local detection before activating SOS
+SOS_CLOUD_CONFIRM = os.getenv("SOS_CLOUD_CONFIRM", "0") == "1"
+SOS_CLOUD_LANGUAGE = os.getenv("SOS_CLOUD_LANGUAGE", "en-IN")
+
+# After a cloud RequestError, skip the cloud for this long (doubling up to the max), seconds
+CLOUD_BACKOFF = 5.0
+CLOUD_BACKOFF_MAX = 60.0
+
+
+def load_trigger_phrases():
+    """Built-in English trigger phrases plus SOS_HINDI_PHRASES"""
+    extra = [p.strip().lower() for p in SOS_HINDI_PHRASES.split(",") if p.strip()]
+    return list(dict.fromkeys(TRIGGER_PHRASES + extra))
+
+
+def normalize_transcript(text):
+    """Lower-case words with punctuation removed: "S.O.S.!" -> "sos", "help me!" -> "help me" """
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    # Join dotted initials before the dots go
+    text = re.sub(r"\b(\w)\.", r"\1", text)
+    # Punctuation and symbols become spaces; letters and combining marks (Devanagari matras) stay
+    text = "".join(" " if unicodedata.category(c)[0] in "PS" else c for c in text)
+    return " ".join(text.split())
+
+
+def match_trigger(text, phrases):
+    """The first trigger phrase contained in text, or None"""
+    # Whole words only, so "sos" does not fire on "across"
+    text = f" {normalize_transcript(text)} "
+    for phrase in phrases:
+        if f" {normalize_transcript(phrase)} " in text:
+            return phrase
+    return None
+
+
+class RecognizerBackend(abc.ABC):
+    """Turns an ``sr.AudioData`` into text.
+
+    ``transcribe`` returns "" when nothing was understood and raises
+    ``sr.RequestError`` when the backend itself is unavailable. ``local``
+    backends run on the CPU with no network.
+    """
+
+    name = "backend"
+    local = False
+
+    @abc.abstractmethod
+    def transcribe(self, audio):
+        """Text heard in audio, "" when nothing was understood"""
+
+
+class VoskKeywordBackend(RecognizerBackend):
+    """Vosk recognizer restricted to the trigger phrases.
+
+    The model is loaded once and each window is decoded against a grammar
+    of just the trigger phrases, which keeps it fast on a CPU and makes it
+    work for any language Vosk has a model for (Hindi phrases with a Hindi
+    model). Phrases the model has no words for are ignored by Vosk.
+    """
+
+    name = "vosk"
+    local = True
+    SAMPLE_RATE = 16000
+
+    def __init__(self, model_path, phrases):
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        self.model = Model(model_path)
+        self.grammar = json.dumps(list(phrases) + ["[unk]"])
+
+    def transcribe(self, audio):
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self.model, self.SAMPLE_RATE, self.grammar)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_rate=self.SAMPLE_RATE, convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get("text", "")
+        return text.replace("[unk]", "").strip()
+
+
+class SphinxKeywordBackend(RecognizerBackend):
+    """PocketSphinx keyword search through speech_recognition (English dictionary only)"""
+
+    name = "sphinx"
+    local = True
+
+    LANGUAGE = "en-US"
+
+    def __init__(self, phrases, sensitivity=SOS_SPHINX_SENSITIVITY):
+        self.recognizer = sr.Recognizer()
+        # Sphinx rejects the whole keyword list if one word is missing from its dictionary
+        decoder = self._load_decoder()
+        known = [p for p in phrases if all(decoder.lookup_word(w) for w in p.split())]
+        dropped = [p for p in phrases if p not in known]
+        if dropped:
+            logger.warning(f"Sphinx dictionary has no words for {dropped}; not spotting them locally")
+        if not known:
+            raise ValueError("none of the trigger phrases are in the Sphinx dictionary")
+        self.keyword_entries = [(p, sensitivity) for p in known]
+
+    @classmethod
+    def _load_decoder(cls):
+        """A decoder over the dictionary recognize_sphinx uses, for word lookups"""
+        import pocketsphinx
+        data = os.path.join(os.path.dirname(os.path.realpath(sr.__file__)), "pocketsphinx-data", cls.LANGUAGE)
+        config = pocketsphinx.Decoder.default_config()
+        config.set_string("-hmm", os.path.join(data, "acoustic-model"))
+        config.set_string("-lm", os.path.join(data, "language-model.lm.bin"))
+        config.set_string("-dict", os.path.join(data, "pronounciation-dictionary.dict"))
+        config.set_string("-logfn", os.devnull)
+        return pocketsphinx.Decoder(config)
+
+    def transcribe(self, audio):
+        try:
+            return self.recognizer.recognize_sphinx(
+                audio, language=self.LANGUAGE, keyword_entries=self.keyword_entries
+            ).strip()
+        except sr.UnknownValueError:
+            return ""
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API (network)"""
+
+    name = "google"
+
+    def __init__(self, language=SOS_CLOUD_LANGUAGE):
+        self.recognizer = sr.Recognizer()
+        self.language = language
+
+    def transcribe(self, audio):
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language).strip()
+        except sr.UnknownValueError:
+            return ""
+
+
+def create_local_backend(phrases, choice=SOS_LOCAL_BACKEND):
+    """The configured local keyword spotter, or None when none is installed"""
+    if choice == "none":
+        return None
+    if choice in ("auto", "vosk") and SOS_VOSK_MODEL:
+        try:
+            return VoskKeywordBackend(SOS_VOSK_MODEL, phrases)
+        except Exception as e:
+            logger.warning(f"Vosk keyword spotter unavailable: {e}")
+    if choice in ("auto", "sphinx"):
+        try:
+            return SphinxKeywordBackend(phrases)
+        except Exception as e:
+            logger.warning(f"Sphinx keyword spotter unavailable: {e}")
+    return None
+
+
+class VoiceTrigger:
+    """Decides whether a window of audio contains an SOS trigger phrase.
+
+    With a local spotter every window is checked on the CPU; the cloud
+    recognizer is only asked to confirm a hit when ``confirm`` is set, and
+    an unreachable cloud never blocks activation. Without a local spotter
+    the cloud recognizer is used directly, and a RequestError backs it off
+    instead of stopping voice SOS.
+    """
+
+    def __init__(self, local=None, cloud=None, phrases=None, confirm=SOS_CLOUD_CONFIRM):
+        self.phrases = phrases or load_trigger_phrases()
+        self.local = local
+        self.cloud = cloud
+        self.confirm = confirm
+        self._cloud_retry_at = 0.0
+        self._cloud_backoff = CLOUD_BACKOFF
+        self._lock = threading.Lock()
+        self._stats = {"windows": 0, "local_hits": 0, "cloud_calls": 0, "cloud_errors": 0,
+                       "confirmed": 0, "rejected": 0, "triggers": 0}
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def _ask_cloud(self, audio):
+        """Cloud transcript, or None while it is unreachable"""
+        if self.cloud is None or time.monotonic() < self._cloud_retry_at:
+            return None
+        self._count("cloud_calls")
+        try:
+            text = self.cloud.transcribe(audio)
+        except sr.RequestError as e:
+            self._count("cloud_errors")
+            self._cloud_retry_at = time.monotonic() + self._cloud_backoff
+            logger.warning(f"Cloud speech recognition unavailable, retrying in {self._cloud_backoff:.0f}s: {e}")
+            self._cloud_backoff = min(self._cloud_backoff * 2, CLOUD_BACKOFF_MAX)
+            return None
+        self._cloud_backoff = CLOUD_BACKOFF
+        return text
+
+    def detect(self, audio):
+        """``(phrase, backend_name)`` when a trigger phrase was heard, else None"""
+        self._count("windows")
+        if self.local is None:
+            text = self._ask_cloud(audio)
+            phrase = match_trigger(text, self.phrases) if text else None
+            if phrase:
+                self._count("triggers")
+                return phrase, self.cloud.name
+            return None
+
+        phrase = match_trigger(self.local.transcribe(audio), self.phrases)
+        if not phrase:
+            return None
+        self._count("local_hits")
+
+        if self.confirm:
+            text = self._ask_cloud(audio)
+            # Only a clear transcript without a trigger overrules the local spotter
+            if text and not match_trigger(text, self.phrases):
+                self._count("rejected")
+                logger.info(f"Cloud did not confirm '{phrase}' (heard '{text}')")
+                return None
+            if text:
+                self._count("confirmed")
+
+        self._count("triggers")
+        return phrase, self.local.name
+
+    def describe(self):
+        if self.local is None:
+            return f"{self.cloud.name if self.cloud else 'no'} recognizer (cloud only)"
+        confirm = f", {self.cloud.name} confirmation" if self.confirm and self.cloud else ""
+        return f"local {self.local.name} keyword spotting{confirm}"
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["backend"] = self.describe()
+        return stats
+
+
+def create_voice_trigger():
+    """VoiceTrigger from the SOS_* settings"""
+    phrases = load_trigger_phrases()
+    local = create_local_backend(phrases)
+    trigger = VoiceTrigger(local=local, cloud=GoogleBackend(), phrases=phrases)
+    logger.info(f"Voice SOS using {trigger.describe()}")
+    return trigger
@@ -0,0 +1,194 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "SheShield-SafetyApp/1.0"
+
+# Statuses worth another attempt: throttling and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Methods safe to send twice; anything else is only retried when the request cannot have been processed
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"}
+
+
+class HostStats:
+    """Rolling latency and error counters for one host"""
+
+    def __init__(self, window=200):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.samples = deque(maxlen=window)
+
+    def record(self, latency, ok):
+        self.requests += 1
+        if not ok:
+            self.errors += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.samples.append(latency)
+
+    def snapshot(self):
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "avg_ms": round(1000 * self.total_latency / self.requests, 1) if self.requests else 0.0,
+            "p50_ms": round(1000 * percentile(0.50), 1),
+            "p95_ms": round(1000 * percentile(0.95), 1),
+            "max_ms": round(1000 * self.max_latency, 1),
+        }
+
+
+class HttpClient:
+    """Shared HTTP client with a keep-alive connection pool per host.
+
+    Every call gets a timeout (``timeout`` per attempt, ``deadline`` for the
+    whole call including retries). Connection errors, timeouts and
+    RETRY_STATUSES are retried up to ``retries`` times with full-jitter
+    exponential backoff, never past the deadline. Requests that are not
+    idempotent (POST, unless the caller passes ``idempotent=True``) are
+    only retried when they never reached the server: a connect timeout or
+    a 429. Per-host stats count connection failures and statuses of 400
+    and above as errors.
+    """
+
+    def __init__(self, timeout=10, retries=2, backoff=0.25, pool_maxsize=10):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_maxsize = pool_maxsize
+
+        self._sessions = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _host(self, url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def session(self, url):
+        """Keep-alive session dedicated to the host of url"""
+        host = self._host(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers["User-Agent"] = USER_AGENT
+                self._sessions[host] = session
+                self._stats[host] = HostStats()
+            return session
+
+    def request(self, method, url, timeout=None, deadline=None, retries=None, idempotent=None, **kwargs):
+        """Send a request, retrying transient failures within the deadline.
+
+        Returns the final requests.Response (which may still carry an error
+        status); raises the last exception if no attempt got a response.
+        """
+        session = self.session(url)
+        stats = self._stats[self._host(url)]
+        timeout = self.timeout if timeout is None else timeout
+        retries = self.retries if retries is None else retries
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        started = time.monotonic()
+        deadline_at = started + deadline if deadline else None
+
+        attempt = 0
+        while True:
+            attempt_timeout = timeout
+            if deadline_at is not None:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise requests.exceptions.Timeout(f"Deadline of {deadline}s exceeded for {url}")
+                attempt_timeout = min(timeout, remaining)
+
+            attempt_start = time.monotonic()
+            error = None
+            response = None
+            try:
+                response = session.request(method, url, timeout=attempt_timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = e
+            latency = time.monotonic() - attempt_start
+
+            if idempotent:
+                retryable = error is not None or response.status_code in RETRY_STATUSES
+            else:
+                retryable = (isinstance(error, requests.exceptions.ConnectTimeout)
+                             or (response is not None and response.status_code == 429))
+            with self._lock:
+                stats.record(latency, error is None and response.status_code < 400)
+
+            if not retryable or attempt >= retries:
+                if error is not None:
+                    raise error
+                return response
+
+            # Full jitter backoff, clipped to whatever is left of the deadline
+            delay = random.uniform(0, self.backoff * (2 ** attempt))
+            if deadline_at is not None:
+                delay = min(delay, max(0.0, deadline_at - time.monotonic()))
+            attempt += 1
+            with self._lock:
+                stats.retries += 1
+            logger.warning(f"Retrying {method} {self._host(url)} (attempt {attempt + 1}) after "
+                           f"{error or response.status_code}")
+            if response is not None:
+                response.close()
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """Per-host request counts and latency percentiles"""
+        with self._lock:
+            return {host: s.snapshot() for host, s in self._stats.items()}
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+# Global instance
+_http_client = None
+_http_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Get or create the shared HTTP client"""
+    global _http_client
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = HttpClient()
+        return _http_client
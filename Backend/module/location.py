@@ -0,0 +1,159 @@
+import os
+import time
+import logging
+import threading
+
+from module.cache import get_cache
+from module.httpclient import get_http_client
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# How often the last-known fix is refreshed in the background, seconds
+LOCATION_REFRESH_INTERVAL = float(os.getenv("LOCATION_REFRESH_INTERVAL", "300"))
+# Retry sooner after a failed refresh, seconds
+LOCATION_RETRY_INTERVAL = float(os.getenv("LOCATION_RETRY_INTERVAL", "30"))
+# A persisted fix older than this is not used after a restart, seconds
+LOCATION_MAX_AGE = float(os.getenv("LOCATION_MAX_AGE", str(24 * 3600)))
+
+UNKNOWN_LOCATION = {
+    'coordinates': 'Unknown',
+    'city': 'Unknown',
+    'country': 'Unknown',
+    'maps_url': 'Location unavailable',
+    'full_address': 'Location unavailable',
+}
+
+
+def fetch_ip_location():
+    """Current location from IP geolocation; raises on failure"""
+    response = get_http_client().get("https://ipinfo.io/json", timeout=5, deadline=10)
+    response.raise_for_status()
+    data = response.json()
+
+    loc = data.get('loc')
+    if not loc:
+        raise ValueError("no coordinates in ipinfo response")
+    city = data.get('city', 'Unknown')
+    country = data.get('country', 'Unknown')
+
+    return {
+        'coordinates': loc,
+        'city': city,
+        'country': country,
+        'maps_url': f"https://www.google.com/maps?q={loc}",
+        'full_address': f"{city}, {country}",
+    }
+
+
+def describe_age(seconds):
+    """'just now', '4 min ago', '2 h ago'"""
+    if seconds is None:
+        return "unknown time"
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    return f"{seconds / 3600:.0f} h ago"
+
+
+class LocationTracker:
+    """Keeps a timestamped last-known location fresh in the background.
+
+    A daemon thread calls ``fetch`` every ``interval`` seconds (sooner after
+    a failure) and keeps the newest fix in memory and in the persistent
+    cache, so ``current()`` never touches the network and a restart still
+    has the previous fix. Other sources (e.g. a phone's GPS) can push a fix
+    with ``update()``.
+    """
+
+    def __init__(self, fetch=fetch_ip_location, source="ipinfo", interval=LOCATION_REFRESH_INTERVAL,
+                 retry_interval=LOCATION_RETRY_INTERVAL):
+        self.fetch = fetch
+        self.source = source
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.cache = get_cache("location", ttl=int(LOCATION_MAX_AGE), max_entries=4)
+        self._fix = self.cache.get("last_fix")
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._running = False
+        self._stats = {"refreshes": 0, "failures": 0}
+
+    def start(self):
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="location-tracker", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+
+    def update(self, fix, source):
+        """Record a new fix (dict with the UNKNOWN_LOCATION keys) from source"""
+        fix = dict(fix, source=source, fixed_at=time.time())
+        with self._lock:
+            self._fix = fix
+        self.cache.set("last_fix", fix)
+
+    def refresh(self):
+        """Fetch a fix now; returns False when the fetch failed"""
+        try:
+            fix = self.fetch()
+        except Exception as e:
+            with self._lock:
+                self._stats["failures"] += 1
+            logger.warning(f"Location refresh failed: {e}")
+            return False
+        self.update(fix, self.source)
+        with self._lock:
+            self._stats["refreshes"] += 1
+        logger.info(f"Location retrieved: {fix['full_address']}")
+        return True
+
+    def refresh_soon(self):
+        """Ask the background thread to refresh now instead of at the next interval"""
+        self._wake.set()
+
+    def _run(self):
+        while self._running:
+            ok = self.refresh()
+            self._wake.clear()
+            self._wake.wait(self.interval if ok else self.retry_interval)
+
+    def current(self):
+        """Last-known fix with its ``source`` and ``age`` in seconds; never blocks on the network"""
+        with self._lock:
+            fix = self._fix
+        if fix is None:
+            return dict(UNKNOWN_LOCATION, source=None, fixed_at=None, age=None)
+        return dict(fix, age=time.time() - fix["fixed_at"])
+
+    def stats(self):
+        fix = self.current()
+        with self._lock:
+            stats = dict(self._stats)
+        stats["source"] = fix["source"]
+        stats["age_s"] = round(fix["age"], 1) if fix["age"] is not None else None
+        return stats
+
+
+# Global instance
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+def get_location_tracker():
+    """Get the shared location tracker, starting its refresh thread on first use"""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            _tracker = LocationTracker().start()
+    return _tracker
@@ -0,0 +1,128 @@
+import os
+import math
+import smtplib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "30"))
+# Messages one connection sends before another connection is opened alongside it
+SMTP_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MESSAGES_PER_CONNECTION", "10"))
+# Most connections opened in parallel for one batch
+SMTP_MAX_CONNECTIONS = int(os.getenv("SMTP_MAX_CONNECTIONS", "3"))
+
+# The server closed or reset the session; reconnecting and resending is safe
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SMTPBatchSender:
+    """Send many messages over as few authenticated SMTP connections as possible.
+
+    ``send_batch`` opens one SMTP_SSL connection and logs in once, then
+    sends every message over it. Lists longer than ``per_connection`` are
+    split across up to ``max_connections`` connections running in
+    parallel. A dropped session is reopened transparently and the message
+    that hit it is sent again (once); a refused recipient only fails that
+    message.
+    """
+
+    def __init__(self, user, password, host=SMTP_HOST, port=SMTP_PORT, timeout=SMTP_TIMEOUT,
+                 per_connection=SMTP_MESSAGES_PER_CONNECTION, max_connections=SMTP_MAX_CONNECTIONS):
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.per_connection = max(1, per_connection)
+        self.max_connections = max(1, max_connections)
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "connections": 0, "reconnects": 0, "sent": 0, "failed": 0}
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _connect(self):
+        smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        try:
+            smtp.login(self.user, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._count("connections")
+        return smtp
+
+    @staticmethod
+    def _close(smtp):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _send_over_connection(self, messages):
+        results = []
+        smtp = None
+        try:
+            for index, msg in enumerate(messages):
+                for attempt in (1, 2):
+                    if smtp is None:
+                        try:
+                            smtp = self._connect()
+                        except Exception as e:
+                            # Cannot connect or log in: nothing else in this chunk can go out either
+                            failed = len(messages) - index
+                            results.extend([(False, f"SMTP connect failed: {e}")] * failed)
+                            self._count("failed", failed)
+                            return results
+                    try:
+                        smtp.send_message(msg)
+                        results.append((True, None))
+                        self._count("sent")
+                        break
+                    except RECONNECT_ERRORS as e:
+                        smtp.close()
+                        smtp = None
+                        if attempt == 2:
+                            results.append((False, f"connection lost: {e}"))
+                            self._count("failed")
+                        else:
+                            logger.warning(f"SMTP session dropped, reconnecting: {e}")
+                            self._count("reconnects")
+                    except Exception as e:
+                        results.append((False, str(e)))
+                        self._count("failed")
+                        break
+        finally:
+            if smtp is not None:
+                self._close(smtp)
+        return results
+
+    def send_batch(self, messages):
+        """Send email.message.Message objects; returns one (ok, error) per message, in order"""
+        if not messages:
+            return []
+        self._count("batches")
+        connections = min(self.max_connections, math.ceil(len(messages) / self.per_connection))
+        if connections == 1:
+            return self._send_over_connection(messages)
+
+        size = math.ceil(len(messages) / connections)
+        chunks = [messages[i:i + size] for i in range(0, len(messages), size)]
+        with ThreadPoolExecutor(max_workers=len(chunks), thread_name_prefix="smtp") as pool:
+            results = []
+            for chunk_results in pool.map(self._send_over_connection, chunks):
+                results.extend(chunk_results)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -1,13 +1,23 @@
 # notification.py (FREE VERSION - CORRECTED)
 import os
+import math
+import hashlib
 import logging
-import smtplib
-import requests
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
 import datetime
 import time
+import threading
+from module.geocode import get_reverse_geocoder
+from module.outbox import get_outbox, new_alert_id, SENT, PENDING, SENDING
+from module.mailer import SMTPBatchSender
+
+# Longest send_sos_alert_from_mobile() waits for the first delivery attempt, seconds
+EMAIL_DISPATCH_TIMEOUT = float(os.getenv("EMAIL_DISPATCH_TIMEOUT", "30"))
+# Email the coordinates at once and the resolved address as a follow-up, instead of
+# holding the first email until the address is known
+SOS_TWO_PHASE = os.getenv("SOS_TWO_PHASE", "1") == "1"
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -29,32 +39,36 @@ class NotificationSystem:
         
         self.last_sent_time = 0
         self.min_interval = 60
+        self._rate_lock = threading.Lock()
+        # Latest alert, cancelled by cancel_alert() without an id
+        self.last_alert_id = None
+        
+        # One authenticated SMTP connection (or a few in parallel) per batch of emails
+        self.mailer = SMTPBatchSender(self.sender_email, self.sender_password)
+        
+        # Emails are queued in the durable outbox and delivered (and retried) by its worker
+        self.outbox = get_outbox()
+        self.outbox.register("email", self._deliver_email_batch)
+        self.two_phase = SOS_TWO_PHASE
         
         logger.info("FREE SOS Notification system initialized")
 
-    def get_precise_location_from_mobile(self, lat, lon):
-        """FREE version - No Google Maps API needed"""
+    def get_precise_location_from_mobile(self, lat, lon, resolve=True):
+        """FREE version - No Google Maps API needed
+
+        With ``resolve=False`` the address comes from the cache or the
+        offline gazetteer only, so the result is immediate.
+        """
         try:
             logger.info("Using MOBILE GPS: %s, %s", lat, lon)
             
             # Direct Google Maps link without API
             google_maps_url = f"https://www.google.com/maps?q={lat},{lon}&z=16"
             
-            # Get approximate address using free OpenStreetMap
-            precise_address = f"📍 Exact Location: {lat:.6f}, {lon:.6f}"
-            
-            try:
-                # FREE geocoding using OpenStreetMap
-                osm_url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={lat}&lon={lon}&zoom=18"
-                response = requests.get(osm_url, timeout=5)
-                if response.status_code == 200:
-                    data = response.json()
-                    if 'display_name' in data:
-                        precise_address = data['display_name']
-                        logger.info("OpenStreetMap geocoding successful")
-            except Exception as e:
-                logger.warning("OpenStreetMap failed: %s", e)
-                # If free service fails, use coordinates
+            # Address from the per-cell cache, else free OpenStreetMap within a tight
+            # deadline, else the nearest place in the offline gazetteer, else the raw coordinates
+            resolved = get_reverse_geocoder().reverse(lat, lon, refine=None if resolve else False)
+            precise_address = resolved["address"]
 
             return {
                 "precise_address": precise_address,
@@ -62,7 +76,8 @@ class NotificationSystem:
                 "latitude": lat,
                 "longitude": lon,
                 "google_maps_url": google_maps_url,
-                "source": "mobile_gps_free"
+                "source": "mobile_gps_free",
+                "address_source": resolved["source"]
             }
 
         except Exception as e:
@@ -74,12 +89,33 @@ class NotificationSystem:
                 "source": "mobile_gps"
             }
 
-    def _send_sos_email(self, to_email, recipient_name, location_data, timestamp, extra_info=None):
-        """Send SOS email - FREE version"""
-        try:
-            subject = "🚨 SOS EMERGENCY - LIVE LOCATION 🚨"
-            
+    def _compose_sos_email(self, recipient_name, location_data, timestamp, extra_info=None, followup=False):
+        """Subject and body of the SOS email (or its address follow-up) for one contact"""
+        if followup:
+            subject = "📍 SOS UPDATE - ADDRESS FOUND"
             body = f"""
+Hello {recipient_name},
+
+Update to the SOS alert sent at {timestamp}.
+
+📍 ADDRESS:
+{location_data.get('precise_address')}
+
+🗺️ GOOGLE MAPS (Click to Open):
+{location_data.get('google_maps_url')}
+
+📞 CALL: +91 8318629910
+
+{f'Additional Info: {extra_info}' if extra_info else ''}
+
+Stay Safe,
+Girls Safety App
+"""
+            return subject, body
+
+        subject = "🚨 SOS EMERGENCY - LIVE LOCATION 🚨"
+        
+        body = f"""
 URGENT SOS ALERT! 🚨
 
 Hello {recipient_name},
@@ -110,65 +146,148 @@ This is an automated SOS alert. Please respond immediately.
 Stay Safe,
 Girls Safety App
 """
-            msg = MIMEMultipart()
-            msg['Subject'] = subject
-            msg['From'] = self.sender_email
-            msg['To'] = to_email
-            msg.attach(MIMEText(body, 'plain'))
+        return subject, body
 
-            if not self.sender_email or not self.sender_password:
-                return False
+    def _build_message(self, to_email, subject, body, key=None):
+        msg = MIMEMultipart()
+        msg['Subject'] = subject
+        msg['From'] = self.sender_email
+        msg['To'] = to_email
+        if key:
+            # Stable across retries, so a resend after a crash is the same message to the mailbox
+            domain = self.sender_email.rpartition("@")[2] or "localhost"
+            msg['Message-ID'] = f"<sos-{hashlib.sha256(key.encode()).hexdigest()[:32]}@{domain}>"
+        msg.attach(MIMEText(body, 'plain'))
+        return msg
 
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=30) as smtp:
-                smtp.login(self.sender_email, self.sender_password)
-                smtp.send_message(msg)
+    def _deliver_email_batch(self, rows):
+        """Outbox handler for the "email" channel: the whole batch shares SMTP connections"""
+        if not self.sender_email or not self.sender_password:
+            return [(False, "Email credentials not configured")] * len(rows)
 
-            logger.info("FREE SOS email sent to %s", to_email)
-            return True
+        messages = [self._build_message(row["recipient"], row["payload"]["subject"], row["payload"]["body"],
+                                        row.get("idempotency_key"))
+                    for row in rows]
+        results = self.mailer.send_batch(messages)
+        for row, (ok, error) in zip(rows, results):
+            if ok:
+                logger.info("FREE SOS email sent to %s", row["recipient"])
+            else:
+                logger.error("Email failed for %s: %s", row["recipient"], error)
+        return results
 
-        except Exception as e:
-            logger.error("Email failed for %s: %s", to_email, e)
-            return False
+    def _queue_emails(self, alert_id, location_data, timestamp, extra_info=None, followup=False, started=None):
+        """Put one email per contact in the outbox"""
+        phase = "followup" if followup else "alert"
+        for contact in self.emergency_contacts:
+            subject, body = self._compose_sos_email(contact["name"], location_data, timestamp, extra_info, followup)
+            self.outbox.enqueue(alert_id, "email", contact["email"], {
+                "subject": subject,
+                "body": body,
+                "maps_link": location_data.get("google_maps_url"),
+                "address": location_data.get("precise_address"),
+                "timestamp": timestamp,
+                "phase": phase,
+            }, key=f"{alert_id}:email:{contact['email']}:{phase}", created_at=started)
+
+    def _send_followup(self, alert_id, lat, lon, timestamp, extra_info=None):
+        """Phase two: resolve the address and email it once the first alert went out"""
+        if self.outbox.is_cancelled(alert_id):
+            return
+        location_data = self.get_precise_location_from_mobile(lat, lon)
+        if location_data.get("address_source") not in ("nominatim", "cache"):
+            # Nothing better than what the contacts already have
+            return
+        # The update must not overtake the alert itself
+        self.outbox.wait(alert_id, EMAIL_DISPATCH_TIMEOUT)
+        if self.outbox.is_cancelled(alert_id):
+            logger.info("SOS alert %s cancelled, address follow-up not sent", alert_id)
+            return
+        self._queue_emails(alert_id, location_data, timestamp, extra_info, followup=True)
+
+    def _alert_result(self, alert_id, rows):
+        """API result for an alert from its outbox rows"""
+        rows = [row for row in rows if row["payload"].get("phase") != "followup"]
+        first = self.outbox.first_notification(alert_id)
+        sent_count = sum(1 for row in rows if row["status"] == SENT)
+        payload = rows[0]["payload"] if rows else {}
+        return {
+            "success": sent_count > 0,
+            "alert_id": alert_id,
+            "alerts_sent": sent_count,
+            # Still being retried by the outbox worker
+            "alerts_pending": sum(1 for row in rows if row["status"] in (PENDING, SENDING)),
+            "maps_link": payload.get("maps_link"),
+            "address": payload.get("address"),
+            "timestamp": payload.get("timestamp"),
+            "time_to_first_notification": round(first, 3) if first is not None else None,
+        }
 
-    def send_sos_alert_from_mobile(self, lat, lon, extra_info=None):
-        """Main SOS method - FREE"""
+    def send_sos_alert_from_mobile(self, lat, lon, extra_info=None, alert_id=None):
+        """Main SOS method - FREE
+
+        Passing the same ``alert_id`` again (e.g. a client retrying after a
+        timeout) returns that alert's status instead of sending it twice.
+        """
         try:
-            current_time = time.time()
-            if current_time - self.last_sent_time < self.min_interval:
-                return {"success": False, "error": "Please wait 60 seconds between alerts"}
-            
-            self.last_sent_time = current_time
+            if alert_id and self.outbox.has_alert(alert_id):
+                return self._alert_result(alert_id, self.outbox.rows(alert_id))
+
+            if not self.sender_email or not self.sender_password:
+                return {"success": False, "error": "Email credentials not configured"}
+
+            with self._rate_lock:
+                current_time = time.time()
+                if current_time - self.last_sent_time < self.min_interval:
+                    wait = math.ceil(self.min_interval - (current_time - self.last_sent_time))
+                    return {"success": False, "error": f"Please wait {self.min_interval} seconds between alerts",
+                            "retry_after": wait}
+                
+                self.last_sent_time = current_time
+            started = time.time()
             
-            location_data = self.get_precise_location_from_mobile(lat, lon)
+            # Two-phase: no network before the first email; a cache miss goes out with the
+            # offline address (or coordinates) and Nominatim's address follows
+            location_data = self.get_precise_location_from_mobile(lat, lon, resolve=not self.two_phase)
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            sent_count = 0
-            for contact in self.emergency_contacts:
-                if self._send_sos_email(contact["email"], contact["name"], location_data, timestamp, extra_info):
-                    sent_count += 1
-
-            result = {
-                "success": sent_count > 0,
-                "alerts_sent": sent_count,
-                "maps_link": location_data.get("google_maps_url"),
-                "address": location_data.get("precise_address"),
-                "timestamp": timestamp
-            }
-            
-            return result
+            alert_id = alert_id or new_alert_id()
+            self.last_alert_id = alert_id
+            self._queue_emails(alert_id, location_data, timestamp, extra_info, started=started)
+            refine = get_reverse_geocoder().refine
+            if self.two_phase and refine and location_data.get("address_source") in ("gazetteer", "coordinates"):
+                threading.Thread(target=self._send_followup, args=(alert_id, lat, lon, timestamp, extra_info),
+                                 name="sos-followup", daemon=True).start()
+
+            return self._alert_result(alert_id, self.outbox.wait(alert_id, EMAIL_DISPATCH_TIMEOUT))
 
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def cancel_alert(self, alert_id=None):
+        """Drop the unsent emails (and any follow-up) of an alert, the latest one by default"""
+        alert_id = alert_id or self.last_alert_id
+        if not alert_id:
+            return 0
+        dropped = self.outbox.cancel(alert_id)
+        logger.info("SOS alert %s cancelled, %d pending emails dropped", alert_id, dropped)
+        return dropped
+
 # Global instance
 _sos_system = None
+_sos_system_lock = threading.Lock()
 
 def get_sos_system():
     global _sos_system
-    if _sos_system is None:
-        _sos_system = NotificationSystem()
+    with _sos_system_lock:
+        if _sos_system is None:
+            _sos_system = NotificationSystem()
     return _sos_system
 
+def get_email_stats():
+    """SMTP connections opened, reconnects and messages sent by the SOS mailer"""
+    return get_sos_system().mailer.stats()
+
 # Test function
 def test_sos_system():
     sos_system = NotificationSystem()
@@ -0,0 +1,411 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "data" / "outbox.db"
+
+# Attempts per notification before it is marked failed
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+# Retry delay after the first failure, doubling up to OUTBOX_BACKOFF_MAX, seconds
+OUTBOX_BACKOFF = float(os.getenv("OUTBOX_BACKOFF", "2"))
+OUTBOX_BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", "300"))
+# A notification claimed this long ago without a result is assumed lost in a crash, seconds
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "120"))
+# Notifications of an alert raised longer ago than this are dropped instead of (re)sent, seconds
+OUTBOX_MAX_AGE = float(os.getenv("OUTBOX_MAX_AGE", "1800"))
+
+PENDING = "pending"
+SENDING = "sending"
+SENT = "sent"
+FAILED = "failed"
+# Dropped unsent: the alert was cancelled, or it is older than OUTBOX_MAX_AGE
+CANCELLED = "cancelled"
+EXPIRED = "expired"
+
+
+def new_alert_id():
+    return uuid.uuid4().hex
+
+
+class Outbox:
+    """Durable queue of outgoing SOS notifications in SQLite.
+
+    Every notification is written here before anything is sent, keyed by
+    an idempotency key (alert, channel, recipient by default) so enqueueing
+    the same notification twice has no effect. A worker thread claims due
+    rows, hands them to the handler registered for their channel in one
+    batch per channel, and records each result. Failures are retried with
+    exponential backoff up to ``max_attempts``; rows claimed by a process
+    that died are picked up again once their lease expires, so delivery
+    resumes after a restart, unless the alert is older than ``max_age``.
+
+    Delivery is at least once. The idempotency key only dedups
+    ``enqueue``: a send the provider accepted just before a crash, before
+    it was recorded as sent, is sent again once its lease expires.
+    Twilio's API takes no idempotency key, so such an SMS or call can
+    repeat; emails carry a Message-ID derived from the key, so a repeat
+    shows up as the same message in the recipient's mailbox.
+
+    ``cancel(alert_id)`` drops an alert's unsent notifications (a false
+    alarm) and refuses anything queued for it afterwards.
+
+    A handler takes a list of rows (dicts with id, alert_id, recipient,
+    payload, attempts) and returns one ``(ok, info)`` per row, where info
+    is the provider id on success and the error text on failure.
+    """
+
+    def __init__(self, db_path=None, max_attempts=OUTBOX_MAX_ATTEMPTS, backoff=OUTBOX_BACKOFF,
+                 backoff_max=OUTBOX_BACKOFF_MAX, lease=OUTBOX_LEASE, max_age=OUTBOX_MAX_AGE, batch_size=100):
+        self.db_path = Path(db_path) if db_path else DEFAULT_DB_PATH
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.lease = lease
+        self.max_age = max_age
+        self.batch_size = batch_size
+
+        self._handlers = {}
+        self._local = threading.local()
+        self._wake = threading.Event()
+        self._changed = threading.Condition()
+        self._thread = None
+        self._running = False
+        # Channels are delivered side by side (e.g. SMS and calls at once)
+        self._channel_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="outbox-channel")
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection()
+
+    def _connection(self):
+        """One SQLite connection per thread, created lazily"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS outbox ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " idempotency_key TEXT NOT NULL UNIQUE,"
+                " alert_id TEXT NOT NULL,"
+                " channel TEXT NOT NULL,"
+                " recipient TEXT NOT NULL,"
+                " payload TEXT NOT NULL,"
+                " status TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " next_attempt_at REAL NOT NULL,"
+                " leased_until REAL,"
+                " created_at REAL NOT NULL,"
+                " sent_at REAL,"
+                " result TEXT,"
+                " last_error TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_alert ON outbox (alert_id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cancelled_alerts (alert_id TEXT PRIMARY KEY, cancelled_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def register(self, channel, handler):
+        """Deliver rows of this channel with handler(rows) -> [(ok, info), ...]"""
+        self._handlers[channel] = handler
+        self.wake()
+
+    def enqueue(self, alert_id, channel, recipient, payload, key=None, created_at=None):
+        """Record a notification; returns False when its idempotency key already exists
+        or the alert was cancelled.
+
+        ``created_at`` backdates the row to when the alert was raised, so
+        latencies include any work done before queueing.
+        """
+        now = time.time()
+        key = key or f"{alert_id}:{channel}:{recipient}"
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO outbox (idempotency_key, alert_id, channel, recipient, payload,"
+            " status, next_attempt_at, created_at)"
+            " SELECT ?, ?, ?, ?, ?, ?, ?, ?"
+            " WHERE NOT EXISTS (SELECT 1 FROM cancelled_alerts WHERE alert_id = ?)",
+            (key, alert_id, channel, recipient, json.dumps(payload), PENDING, now, created_at or now, alert_id)
+        )
+        if cursor.rowcount:
+            self.wake()
+            return True
+        if self.is_cancelled(alert_id):
+            logger.info(f"Alert {alert_id} was cancelled, not queueing {key}")
+        else:
+            logger.info(f"Notification {key} already queued, not sending it twice")
+        return False
+
+    def cancel(self, alert_id):
+        """Drop every unsent notification of an alert and refuse new ones; returns how many were dropped.
+
+        A notification already handed to its provider cannot be recalled;
+        its result is still recorded if it goes through.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT OR IGNORE INTO cancelled_alerts (alert_id, cancelled_at) VALUES (?, ?)",
+                         (alert_id, time.time()))
+            dropped = conn.execute(
+                "UPDATE outbox SET status = ?, leased_until = NULL, last_error = ?"
+                " WHERE alert_id = ? AND status IN (?, ?)",
+                (CANCELLED, "alert cancelled", alert_id, PENDING, SENDING)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        logger.info(f"Alert {alert_id} cancelled, {dropped} unsent notifications dropped")
+        with self._changed:
+            self._changed.notify_all()
+        return dropped
+
+    def is_cancelled(self, alert_id):
+        row = self._connection().execute(
+            "SELECT 1 FROM cancelled_alerts WHERE alert_id = ?", (alert_id,)
+        ).fetchone()
+        return row is not None
+
+    def has_alert(self, alert_id):
+        row = self._connection().execute(
+            "SELECT 1 FROM outbox WHERE alert_id = ? LIMIT 1", (alert_id,)
+        ).fetchone()
+        return row is not None
+
+    def start(self):
+        """Start the delivery worker (once); rows left from a previous run are resumed"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="sos-outbox", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self.wake()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def wake(self):
+        self._wake.set()
+
+    def _claim(self):
+        """Lease due rows of registered channels to this worker.
+
+        Unsent rows of alerts older than ``max_age`` (e.g. left from before
+        a restart) are marked expired instead.
+        """
+        channels = list(self._handlers)
+        if not channels:
+            return []
+        now = time.time()
+        marks = ",".join("?" * len(channels))
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            expired = conn.execute(
+                "UPDATE outbox SET status = ?, leased_until = NULL, last_error = ?"
+                " WHERE status IN (?, ?) AND created_at < ?",
+                (EXPIRED, f"older than {self.max_age:.0f}s", PENDING, SENDING, now - self.max_age)
+            ).rowcount
+            if expired:
+                logger.warning(f"Dropped {expired} notifications of alerts older than {self.max_age:.0f}s")
+            rows = conn.execute(
+                f"SELECT * FROM outbox WHERE channel IN ({marks}) AND ("
+                " (status = ? AND next_attempt_at <= ?) OR (status = ? AND leased_until < ?))"
+                " ORDER BY created_at LIMIT ?",
+                (*channels, PENDING, now, SENDING, now, self.batch_size)
+            ).fetchall()
+            for row in rows:
+                if row["status"] == SENDING:
+                    logger.warning(f"Resuming notification {row['idempotency_key']} after an interrupted send")
+            conn.executemany(
+                "UPDATE outbox SET status = ?, leased_until = ?, attempts = attempts + 1 WHERE id = ?",
+                [(SENDING, now + self.lease, row["id"]) for row in rows]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [dict(row, payload=json.loads(row["payload"]), attempts=row["attempts"] + 1) for row in rows]
+
+    def _record(self, row, ok, info):
+        now = time.time()
+        conn = self._connection()
+        if ok:
+            # Recorded even when the alert was cancelled mid-send: the message did go out
+            conn.execute(
+                "UPDATE outbox SET status = ?, sent_at = ?, result = ?, leased_until = NULL"
+                " WHERE id = ? AND status IN (?, ?)",
+                (SENT, now, None if info is None else str(info), row["id"], SENDING, CANCELLED)
+            )
+        elif row["attempts"] >= self.max_attempts:
+            # Only while still sending: a row cancelled in flight stays cancelled
+            if conn.execute(
+                "UPDATE outbox SET status = ?, last_error = ?, leased_until = NULL WHERE id = ? AND status = ?",
+                (FAILED, str(info), row["id"], SENDING)
+            ).rowcount:
+                logger.error(f"Giving up on {row['channel']} to {row['recipient']} "
+                             f"after {row['attempts']} attempts: {info}")
+        else:
+            delay = min(self.backoff * 2 ** (row["attempts"] - 1), self.backoff_max)
+            if conn.execute(
+                "UPDATE outbox SET status = ?, next_attempt_at = ?, last_error = ?, leased_until = NULL"
+                " WHERE id = ? AND status = ?",
+                (PENDING, now + delay, str(info), row["id"], SENDING)
+            ).rowcount:
+                logger.warning(f"{row['channel']} to {row['recipient']} failed "
+                               f"(attempt {row['attempts']}), retrying in {delay:.1f}s: {info}")
+
+    def _deliver_channel(self, channel, rows):
+        # Skip rows whose alert was cancelled since they were claimed
+        marks = ",".join("?" * len(rows))
+        sending = {r[0] for r in self._connection().execute(
+            f"SELECT id FROM outbox WHERE id IN ({marks}) AND status = ?", (*[row["id"] for row in rows], SENDING)
+        ).fetchall()}
+        rows = [row for row in rows if row["id"] in sending]
+        if not rows:
+            return
+        try:
+            results = self._handlers[channel](rows)
+        except Exception as e:
+            results = [(False, f"{type(e).__name__}: {e}")] * len(rows)
+        for row, (ok, info) in zip(rows, results):
+            self._record(row, ok, info)
+
+    def _next_due_in(self):
+        row = self._connection().execute(
+            "SELECT MIN(CASE WHEN status = ? THEN next_attempt_at ELSE leased_until END) FROM outbox"
+            " WHERE status IN (?, ?)", (PENDING, PENDING, SENDING)
+        ).fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def _run(self):
+        while self._running:
+            self._wake.clear()
+            try:
+                rows = self._claim()
+            except Exception as e:
+                logger.error(f"Outbox claim failed: {e}")
+                rows = []
+
+            if rows:
+                by_channel = defaultdict(list)
+                for row in rows:
+                    by_channel[row["channel"]].append(row)
+                futures = [self._channel_pool.submit(self._deliver_channel, channel, batch)
+                           for channel, batch in by_channel.items()]
+                for future in futures:
+                    future.result()
+                with self._changed:
+                    self._changed.notify_all()
+                continue
+
+            due_in = self._next_due_in()
+            self._wake.wait(5.0 if due_in is None else min(due_in + 0.01, 5.0))
+
+    def rows(self, alert_id):
+        """Every notification of an alert, as dicts"""
+        rows = self._connection().execute(
+            "SELECT * FROM outbox WHERE alert_id = ? ORDER BY id", (alert_id,)
+        ).fetchall()
+        return [dict(row, payload=json.loads(row["payload"])) for row in rows]
+
+    def wait(self, alert_id, timeout):
+        """Wait until no notification of the alert is in its first delivery attempt, then return its rows.
+
+        Returns early once every row has an outcome of its first attempt
+        (sent, failed or waiting for a retry); retries carry on in the
+        background after ``timeout``.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            rows = self.rows(alert_id)
+            if all(row["status"] != SENDING and (row["attempts"] or row["status"] != PENDING) for row in rows):
+                return rows
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return rows
+            with self._changed:
+                self._changed.wait(min(remaining, 0.5))
+
+    def first_notification(self, alert_id):
+        """Seconds from queueing an alert to its first delivered notification, or None"""
+        row = self._connection().execute(
+            "SELECT MIN(sent_at) - MIN(created_at) FROM outbox WHERE alert_id = ?"
+            " HAVING MIN(sent_at) IS NOT NULL", (alert_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        conn = self._connection()
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status IN (?, ?)", (PENDING, SENDING)
+        ).fetchone()[0]
+        latencies = sorted(r[0] for r in conn.execute(
+            "SELECT sent_at - created_at FROM outbox WHERE status = ? ORDER BY sent_at DESC LIMIT 200", (SENT,)
+        ).fetchall())
+        # Time to first notification: per alert, queueing to the first message that got through
+        first = sorted(r[0] for r in conn.execute(
+            "SELECT MIN(sent_at) - MIN(created_at) FROM outbox GROUP BY alert_id"
+            " HAVING MIN(sent_at) IS NOT NULL ORDER BY MIN(created_at) DESC LIMIT 200"
+        ).fetchall())
+
+        def percentile(p, values=latencies):
+            if not values:
+                return 0.0
+            return values[min(len(values) - 1, int(p * len(values)))]
+
+        return {
+            "queue_depth": counts.get(PENDING, 0) + counts.get(SENDING, 0),
+            "sending": counts.get(SENDING, 0),
+            "sent": counts.get(SENT, 0),
+            "failed": counts.get(FAILED, 0),
+            "cancelled": counts.get(CANCELLED, 0),
+            "expired": counts.get(EXPIRED, 0),
+            "oldest_pending_s": round(time.time() - oldest, 1) if oldest else 0.0,
+            "delivery_p50_ms": round(1000 * percentile(0.50), 1),
+            "delivery_p95_ms": round(1000 * percentile(0.95), 1),
+            "first_notification_p50_ms": round(1000 * percentile(0.50, first), 1),
+            "first_notification_p95_ms": round(1000 * percentile(0.95, first), 1),
+        }
+
+
+# Global instance
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    """Get or create the shared SOS outbox and start its worker"""
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = Outbox(os.getenv("SOS_OUTBOX_DB")).start()
+    return _outbox
+
+
+def get_outbox_stats():
+    return get_outbox().stats()
@@ -0,0 +1,131 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import as_completed
+
+from module.audio import get_audio_service
+from module.text import (AssistantVoice, SpeechRate, audio_cache, SynthesizeSpeech,
+                         RememberSpeech, EmergencyPhrases, ContinuationResponses)
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Parallel edge_tts requests while warming up
+PREWARM_CONCURRENCY = int(os.getenv("PREWARM_CONCURRENCY", "4"))
+
+
+def load_prewarm_phrases():
+    """Phrases to warm: PREWARM_PHRASES_FILE (one per line) or the built-in emergency and UI phrases"""
+    path = os.getenv("PREWARM_PHRASES_FILE")
+    if path:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return [line.strip() for line in f if line.strip()]
+        except Exception as e:
+            logger.warning(f"Could not read prewarm phrases from {path}: {e}")
+    # Emergency phrases first: they are the ones that must never wait on the network
+    return list(EmergencyPhrases) + list(ContinuationResponses)
+
+
+class PhrasePrewarmer:
+    """Synthesize (or load from the audio cache) and decode phrases in the background.
+
+    Each warmed phrase ends up decoded in the audio service, so TTS plays it
+    without any synthesis or disk access. Progress is available from
+    ``status()`` and through the optional ``on_progress(status)`` callback.
+    """
+
+    def __init__(self, phrases, on_progress=None, on_done=None):
+        self.phrases = list(dict.fromkeys(phrases))
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.warmed = 0
+        self.failed = 0
+        # Synthesized but not decoded, e.g. no audio device to decode on
+        self.missed = 0
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="tts-prewarm", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def _warm(self, audio, phrase, clip):
+        if audio.preload(phrase, clip) is None:
+            self.missed += 1
+        else:
+            self.warmed += 1
+        if self.on_progress:
+            self.on_progress(self.status())
+
+    def _run(self):
+        self.started_at = time.perf_counter()
+        audio = get_audio_service()
+        # Bound to the synthesis loop on first use
+        semaphore = asyncio.Semaphore(PREWARM_CONCURRENCY)
+
+        async def synthesize(phrase):
+            async with semaphore:
+                return await SynthesizeSpeech(phrase)
+
+        try:
+            pending = {}
+            for phrase in self.phrases:
+                cached_path = audio_cache.get(phrase, AssistantVoice, SpeechRate)
+                if cached_path:
+                    try:
+                        self._warm(audio, phrase, cached_path)
+                        continue
+                    except Exception as e:
+                        logger.debug(f"Cached clip unusable, re-synthesizing: {e}")
+                future = audio.submit(synthesize(phrase))
+                pending[future] = phrase
+
+            for future in as_completed(pending):
+                phrase = pending[future]
+                try:
+                    clip = future.result()
+                    RememberSpeech(phrase, clip)
+                    self._warm(audio, phrase, clip)
+                except Exception as e:
+                    self.failed += 1
+                    logger.warning(f"Could not pre-warm '{phrase[:40]}': {e}")
+        finally:
+            self.finished_at = time.perf_counter()
+            logger.info(f"Pre-warmed {self.warmed}/{len(self.phrases)} phrases "
+                        f"({self.missed} not decoded, {self.failed} failed) "
+                        f"in {self.finished_at - self.started_at:.2f}s")
+            if self.on_done:
+                self.on_done(self.status())
+
+    def status(self):
+        end = self.finished_at or time.perf_counter()
+        return {
+            "total": len(self.phrases),
+            "warmed": self.warmed,
+            "failed": self.failed,
+            "missed": self.missed,
+            "done": self.finished_at is not None,
+            "elapsed": round(end - self.started_at, 3) if self.started_at else 0.0,
+        }
+
+
+# Global instance
+_prewarmer = None
+
+
+def start_prewarm(phrases=None, on_progress=None, on_done=None):
+    """Start warming the phrase list in the background (once per process)"""
+    global _prewarmer
+    if _prewarmer is None:
+        _prewarmer = PhrasePrewarmer(phrases or load_prewarm_phrases(), on_progress, on_done)
+        _prewarmer.start()
+    return _prewarmer
@@ -0,0 +1,242 @@
+import os
+import re
+import sys
+import json
+import unicodedata
+import logging
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Time-of-day bands used when SAFETY_TIME_BUCKETS=bands (start hour, end hour inclusive)
+DEFAULT_TIME_BANDS = [
+    ("late_night", 0, 4),
+    ("early_morning", 5, 7),
+    ("morning", 8, 11),
+    ("afternoon", 12, 15),
+    ("evening", 16, 19),
+    ("night", 20, 23),
+]
+
+# Words that name a part of the day, mapped to a representative hour
+PERIOD_WORDS = {
+    "midnight": 0,
+    "late night": 1,
+    "early morning": 6,
+    "morning": 9, "subah": 9, "savere": 7,
+    "noon": 12, "afternoon": 14, "dopahar": 14, "dopehar": 14,
+    "evening": 18, "shaam": 18, "sham": 18,
+    "night": 21, "tonight": 21, "raat": 21, "rat": 21,
+}
+
+# Words that pin an ambiguous clock hour to the afternoon/night
+PM_WORDS = {"pm", "p.m.", "evening", "night", "tonight", "raat", "rat", "shaam", "sham", "dopahar", "dopehar", "afternoon"}
+AM_WORDS = {"am", "a.m.", "morning", "subah", "savere"}
+
+DEFAULT_LOCATION_ALIASES = {
+    "cp": "connaught place",
+    "new delhi": "delhi",
+    "bombay": "mumbai",
+    "calcutta": "kolkata",
+    "madras": "chennai",
+    "bangalore": "bengaluru",
+    "gurgaon": "gurugram",
+    "poona": "pune",
+    "benares": "varanasi",
+    "banaras": "varanasi",
+    "rly stn": "railway station",
+    "rly station": "railway station",
+    "stn": "station",
+    "rd": "road",
+    "mkt": "market",
+}
+
+# Filler words that do not change the place being asked about
+LOCATION_STOPWORDS = {"the", "near", "india"}
+
+
+def _load_time_bands():
+    """Read custom bands from SAFETY_TIME_BANDS ("name:start-end,...")"""
+    raw = os.getenv("SAFETY_TIME_BANDS", "").strip()
+    if not raw:
+        return DEFAULT_TIME_BANDS
+    bands = []
+    try:
+        for part in raw.split(","):
+            name, hours = part.split(":")
+            start, end = hours.split("-")
+            bands.append((name.strip(), int(start), int(end)))
+        return bands
+    except ValueError:
+        logger.warning(f"Invalid SAFETY_TIME_BANDS '{raw}', using defaults")
+        return DEFAULT_TIME_BANDS
+
+
+def _load_location_aliases():
+    """Default aliases plus any JSON mapping given in SAFETY_LOCATION_ALIASES"""
+    aliases = dict(DEFAULT_LOCATION_ALIASES)
+    path = os.getenv("SAFETY_LOCATION_ALIASES")
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                aliases.update({k.lower(): v.lower() for k, v in json.load(f).items()})
+        except Exception as e:
+            logger.warning(f"Could not load location aliases from {path}: {e}")
+    return aliases
+
+
+TIME_BUCKET_MODE = os.getenv("SAFETY_TIME_BUCKETS", "bands").lower()
+TIME_BANDS = _load_time_bands()
+LOCATION_ALIASES = _load_location_aliases()
+
+
+def _simplify(text):
+    """Casefold, strip accents and turn punctuation into spaces"""
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    text = re.sub(r"[^\w\s:.]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def parse_hour(time_text):
+    """Best-effort parse of free-form time text into an hour 0-23.
+
+    Understands "10pm", "10 pm", "10:30 p.m.", "22:00", "2200 hrs",
+    "10 baje raat", "raat 10 baje", "midnight" and bare period words such
+    as "evening". Returns None when nothing time-like is found.
+    """
+    text = _simplify(time_text)
+    if not text:
+        return None
+    words = set(text.replace(".", " ").split()) | set(text.split())
+
+    # 24h clock: 22:00, 22.00, 2200 hrs
+    match = re.search(r"\b([01]?\d|2[0-3])[:.]([0-5]\d)\b", text)
+    if not match:
+        match = re.search(r"\b([01]\d|2[0-3])([0-5]\d)\s*(?:hrs|hours|h)\b", text)
+    hour = None
+    if match:
+        hour = int(match.group(1))
+    else:
+        match = re.search(r"\b(1[0-2]|0?\d)\s*(?:am|pm|a\.m\.?|p\.m\.?|baje|o clock|oclock|bje)?\b", text)
+        if match and re.search(r"\d", match.group(0)):
+            hour = int(match.group(1))
+
+    if hour is None:
+        for phrase in sorted(PERIOD_WORDS, key=len, reverse=True):
+            if re.search(rf"\b{phrase}\b", text):
+                return PERIOD_WORDS[phrase]
+        return None
+
+    if hour <= 12:
+        is_pm = bool(words & PM_WORDS) or "p.m" in text or re.search(r"\d\s*pm\b", text)
+        is_am = bool(words & AM_WORDS) or "a.m" in text or re.search(r"\d\s*am\b", text)
+        if is_pm and hour < 12:
+            # "12 baje raat" is midnight, "10 baje raat" is 22:00,
+            # but "2 baje raat" is still the small hours
+            if ({"raat", "rat", "night"} & words) and hour < 4:
+                return hour
+            hour += 12
+        elif is_am and hour == 12:
+            hour = 0
+        elif is_pm and hour == 12 and ({"raat", "rat", "night", "midnight"} & words):
+            hour = 0
+    return hour % 24
+
+
+def time_bucket(time_text, mode=None):
+    """Map free-form time text onto a canonical bucket label"""
+    mode = (mode or TIME_BUCKET_MODE).lower()
+    hour = parse_hour(time_text)
+    if hour is None:
+        # Unparseable: fall back to the normalized text so we never merge
+        # unrelated queries
+        return _simplify(time_text) or "anytime"
+    if mode == "hourly":
+        return f"h{hour:02d}"
+    for name, start, end in TIME_BANDS:
+        if start <= hour <= end:
+            return name
+    return f"h{hour:02d}"
+
+
+def normalize_location(location):
+    """Canonical spelling of a place name for cache lookups"""
+    text = _simplify(location)
+    # Join dotted initials ("m.g. road" -> "mg road") before dropping dots
+    text = re.sub(r"\b(\w)\.", r"\1", text)
+    text = text.replace(".", " ").replace(":", " ")
+    text = re.sub(r"\s+", " ", text).strip()
+    for alias in sorted(LOCATION_ALIASES, key=len, reverse=True):
+        text = re.sub(rf"\b{re.escape(alias)}\b", LOCATION_ALIASES[alias], text)
+    words = [w for w in text.split() if w not in LOCATION_STOPWORDS]
+    # Drop repeated words introduced by aliasing ("new delhi delhi")
+    deduped = []
+    for word in words:
+        if not deduped or deduped[-1] != word:
+            deduped.append(word)
+    return " ".join(deduped)
+
+
+def make_query_key(location, time_text, mode=None):
+    """Canonical cache key for a (location, time) safety query"""
+    return f"{normalize_location(location)}_{time_bucket(time_text, mode)}"
+
+
+def legacy_query_key(location, time_text):
+    """The key format used before canonicalization, kept for comparisons"""
+    return f"{location.lower()}_{time_text.lower()}"
+
+
+def read_query_log(log_file):
+    """Yield (location, time) pairs from the safety_app_log.txt format"""
+    with open(log_file, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            if not line.startswith("Location: "):
+                continue
+            location, sep, time_text = line[len("Location: "):].rstrip("\n").rpartition(", Time: ")
+            if sep:
+                yield location, time_text
+
+
+def replay_hit_rate(queries, key_func):
+    """Hit rate an unbounded cache would have seen for a replayed query stream"""
+    seen = set()
+    hits = 0
+    total = 0
+    for location, time_text in queries:
+        key = key_func(location, time_text)
+        total += 1
+        if key in seen:
+            hits += 1
+        seen.add(key)
+    return {
+        "queries": total,
+        "hits": hits,
+        "unique_keys": len(seen),
+        "hit_rate": round(hits / total, 4) if total else 0.0,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    log_file = argv[0] if argv else "safety_app_log.txt"
+    if not os.path.exists(log_file):
+        print(f"❌ Query log not found: {log_file}")
+        return 1
+
+    queries = list(read_query_log(log_file))
+    before = replay_hit_rate(queries, legacy_query_key)
+    after = replay_hit_rate(queries, make_query_key)
+    print(f"📜 Replayed {before['queries']} queries from {log_file}")
+    print(f"Before: {before['unique_keys']} unique keys, hit rate {before['hit_rate']:.1%}")
+    print(f"After:  {after['unique_keys']} unique keys, hit rate {after['hit_rate']:.1%} "
+          f"(bucket mode: {TIME_BUCKET_MODE})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,394 @@
+import os
+import re
+import csv
+import math
+import time
+import logging
+import datetime
+import threading
+import numpy as np
+
+from module.gazetteer import get_gazetteer
+from module.querykey import parse_hour
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Incident dataset (CSV or Parquet with lat, lon, time/hour[, weekday], category[, weight]).
+# Unset disables local risk scoring and every check goes to the LLM as before.
+RISK_INCIDENTS_PATH = os.getenv("RISK_INCIDENTS_PATH", "")
+# Grid cell size, degrees (0.01 ~ 1.1 km)
+RISK_CELL_DEG = float(os.getenv("RISK_CELL_DEG", "0.01"))
+# Spatial kernel width (Gaussian sigma), km
+RISK_BANDWIDTH_KM = float(os.getenv("RISK_BANDWIDTH_KM", "1.0"))
+# Temporal kernel width over the hour of the week (Gaussian sigma), hours
+RISK_TIME_BANDWIDTH_H = float(os.getenv("RISK_TIME_BANDWIDTH_H", "1.5"))
+# Label thresholds as percentiles of the risk at places where incidents happened
+RISK_MODERATE_PERCENTILE = float(os.getenv("RISK_MODERATE_PERCENTILE", "50"))
+RISK_HIGH_PERCENTILE = float(os.getenv("RISK_HIGH_PERCENTILE", "85"))
+
+KM_PER_DEGREE = 111.195
+HOURS_PER_WEEK = 168
+LABELS = ["Safe", "Moderate Risk", "High Risk"]
+
+# Severity of an incident category; anything else counts 1
+CATEGORY_WEIGHTS = {
+    "rape": 5.0, "sexual assault": 5.0, "murder": 5.0, "kidnapping": 4.0, "acid attack": 5.0,
+    "assault": 3.0, "molestation": 3.0, "stalking": 2.5, "harassment": 2.0, "eve teasing": 2.0,
+    "robbery": 2.0, "snatching": 2.0, "chain snatching": 2.0, "theft": 1.0,
+}
+
+_DAYS = {
+    "monday": 0, "mon": 0, "somvar": 0, "tuesday": 1, "tue": 1, "mangalvar": 1,
+    "wednesday": 2, "wed": 2, "budhvar": 2, "thursday": 3, "thu": 3, "guruvar": 3,
+    "friday": 4, "fri": 4, "shukravar": 4, "saturday": 5, "sat": 5, "shanivar": 5,
+    "sunday": 6, "sun": 6, "ravivar": 6, "itvaar": 6,
+}
+
+
+def check_coordinates(lats, lons):
+    """Raise ValueError unless every coordinate is finite and on the globe"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    if not (np.isfinite(lats).all() and np.isfinite(lons).all()):
+        raise ValueError("coordinates must be finite numbers")
+    if (np.abs(lats) > 90).any() or (np.abs(lons) > 180).any():
+        raise ValueError("latitude must be within [-90, 90] and longitude within [-180, 180]")
+
+
+def parse_hour_of_week(text, now=None):
+    """Hour of the week (0 = Monday 00:00) of a travel time like "10 pm", "22:30",
+    "raat 10 baje", "friday 9pm" or "now"; None when no hour can be found.
+
+    The hour itself comes from ``querykey.parse_hour``, the same reading
+    used for the safety cache keys; this only adds the day.
+    """
+    now = now or datetime.datetime.now()
+    words = re.findall(r"[a-z]+", str(text).lower())
+
+    day = now.weekday()
+    for word in words:
+        if word in _DAYS:
+            day = _DAYS[word]
+            break
+    else:
+        if "tomorrow" in words or "kal" in words:
+            day = (day + 1) % 7
+
+    if "now" in words or "abhi" in words:
+        return day * 24 + now.hour
+    hour = parse_hour(text)
+    if hour is None:
+        return None
+    return day * 24 + hour
+
+
+def _hour_of_week(row):
+    """Hour of the week of an incident record, or a list of seven hours when only the hour is known"""
+    stamp = row.get("time") or row.get("datetime") or row.get("timestamp") or row.get("date")
+    if stamp and not row.get("hour"):
+        try:
+            when = datetime.datetime.fromisoformat(stamp)
+        except ValueError:
+            from dateutil import parser
+            when = parser.parse(stamp)
+        return when.weekday() * 24 + when.hour
+    hour = int(float(row["hour"])) % 24
+    day = str(row.get("weekday") or row.get("day") or "").strip().lower()
+    if day.isdigit():
+        return int(day) % 7 * 24 + hour
+    if day in _DAYS:
+        return _DAYS[day] * 24 + hour
+    return [d * 24 + hour for d in range(7)]
+
+
+def load_incidents(path):
+    """lat, lon, hour_of_week, weight and share arrays and category labels of an incident file.
+
+    An incident without a weekday becomes seven rows, one per day, each with
+    a ``share`` of 1/7 so counts still add up to one incident.
+    """
+    if str(path).lower().endswith((".parquet", ".pq")):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("Reading Parquet incident files needs pandas and pyarrow (pip install pandas pyarrow)")
+        records = pd.read_parquet(path).astype(str).to_dict("records")
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            records = list(csv.DictReader(f))
+
+    lats, lons, hours, weights, shares, categories = [], [], [], [], [], []
+    skipped = 0
+    for record in records:
+        row = {str(k).strip().lower(): str(v).strip() for k, v in record.items() if k and v not in (None, "", "nan")}
+        try:
+            lat = float(row.get("lat") or row.get("latitude"))
+            lon = float(row.get("lon") or row.get("lng") or row.get("longitude"))
+            how = _hour_of_week(row)
+        except (TypeError, ValueError, KeyError):
+            skipped += 1
+            continue
+        category = (row.get("category") or row.get("type") or row.get("crime") or "other").lower()
+        weight = float(row["weight"]) if row.get("weight") else CATEGORY_WEIGHTS.get(category, 1.0)
+        # Unknown weekday: spread the incident over that hour of every day
+        spread = how if isinstance(how, list) else [how]
+        for h in spread:
+            lats.append(lat)
+            lons.append(lon)
+            hours.append(h)
+            weights.append(weight / len(spread))
+            shares.append(1.0 / len(spread))
+            categories.append(category)
+    if skipped:
+        logger.warning(f"Skipped {skipped} incident rows without usable location or time")
+    return (np.array(lats, dtype=np.float64), np.array(lons, dtype=np.float64),
+            np.array(hours, dtype=np.int64), np.array(weights, dtype=np.float32),
+            np.array(shares, dtype=np.float32), categories)
+
+
+class RiskEngine:
+    """Kernel-density risk from past incidents, by place and hour of the week.
+
+    Incidents are binned into a ``cell_deg`` grid; only occupied cells are
+    stored, as a sorted key array and a (cells x 168) matrix of severity
+    weights smoothed over neighbouring hours with a circular Gaussian. The
+    risk at a point is the Gaussian-weighted (``bandwidth_km``) sum of the
+    surrounding cells at that hour, computed for whole arrays of points at
+    once with NumPy. Labels come from where a score falls among the scores
+    at places incidents actually happened.
+    """
+
+    def __init__(self, lats, lons, hours, weights, shares=None, categories=None, cell_deg=RISK_CELL_DEG,
+                 bandwidth_km=RISK_BANDWIDTH_KM, time_bandwidth_h=RISK_TIME_BANDWIDTH_H,
+                 moderate_percentile=RISK_MODERATE_PERCENTILE, high_percentile=RISK_HIGH_PERCENTILE):
+        self.cell_deg = cell_deg
+        self.bandwidth_km = bandwidth_km
+        shares = np.ones(len(lats), dtype=np.float32) if shares is None else np.asarray(shares)
+        self.incidents = int(round(float(shares.sum())))
+        self._cols = math.ceil(360.0 / cell_deg)
+
+        keys = self._keys_of(*self._cells_of(np.asarray(lats), np.asarray(lons)))
+        self.keys, inverse = np.unique(keys, return_inverse=True)
+        counts = np.zeros((len(self.keys), HOURS_PER_WEEK), dtype=np.float32)
+        np.add.at(counts, (inverse, np.asarray(hours) % HOURS_PER_WEEK), weights)
+        self.grid = self._smooth_hours(counts, time_bandwidth_h)
+
+        # Incidents per cell and category, for the narrative
+        self.category_names, category_index = np.unique(np.asarray(categories or ["other"] * len(lats)),
+                                                        return_inverse=True)
+        self.category_counts = np.zeros((len(self.keys), len(self.category_names)), dtype=np.float32)
+        np.add.at(self.category_counts, (inverse, category_index), shares)
+
+        # Neighbour cells inside three sigmas; cells narrow towards the poles, so more columns
+        cell_km = cell_deg * KM_PER_DEGREE
+        cos_min = max(math.cos(math.radians(float(np.abs(lats).max()))), 0.2) if len(lats) else 1.0
+        row_reach = min(math.ceil(3 * bandwidth_km / cell_km), 25)
+        col_reach = min(math.ceil(3 * bandwidth_km / (cell_km * cos_min)), 25)
+        dr, dc = np.meshgrid(np.arange(-row_reach, row_reach + 1), np.arange(-col_reach, col_reach + 1),
+                             indexing="ij")
+        self._dr = dr.ravel()
+        self._dc = dc.ravel()
+
+        # Reference distribution: risk at incident cells over every hour
+        self.reference = np.sort(self._reference_scores())
+        self.thresholds = (self._score_at_percentile(moderate_percentile),
+                           self._score_at_percentile(high_percentile))
+
+        self._lock = threading.Lock()
+        self._stats = {"points_scored": 0, "batches": 0, "total_ms": 0.0}
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        started = time.perf_counter()
+        engine = cls(*load_incidents(path), **kwargs)
+        logger.info(f"Risk engine: {engine.incidents} incidents in {len(engine.keys)} cells "
+                    f"loaded in {time.perf_counter() - started:.1f}s")
+        return engine
+
+    def _cells_of(self, lats, lons):
+        rows = np.floor((lats + 90.0) / self.cell_deg).astype(np.int64)
+        cols = np.floor((lons + 180.0) / self.cell_deg).astype(np.int64) % self._cols
+        return rows, cols
+
+    def _keys_of(self, rows, cols):
+        return rows * self._cols + cols % self._cols
+
+    @staticmethod
+    def _smooth_hours(counts, sigma):
+        """Circular Gaussian smoothing along the hour-of-week axis"""
+        if sigma <= 0 or not len(counts):
+            return counts
+        offsets = np.arange(HOURS_PER_WEEK)
+        offsets = np.minimum(offsets, HOURS_PER_WEEK - offsets)
+        kernel = np.exp(-0.5 * (offsets / sigma) ** 2)
+        kernel /= kernel.sum()
+        smoothed = np.fft.irfft(np.fft.rfft(counts, axis=1) * np.fft.rfft(kernel), n=HOURS_PER_WEEK, axis=1)
+        return np.maximum(smoothed, 0).astype(np.float32)
+
+    def _reference_scores(self, limit=20000):
+        if not len(self.keys):
+            return np.zeros(1, dtype=np.float32)
+        rows, cols = np.divmod(self.keys, self._cols)
+        lats = (rows + 0.5) * self.cell_deg - 90.0
+        lons = (cols + 0.5) * self.cell_deg - 180.0
+        cells = np.repeat(np.arange(len(self.keys)), HOURS_PER_WEEK)
+        hours = np.tile(np.arange(HOURS_PER_WEEK), len(self.keys))
+        # Only where something happened at about that hour
+        occupied = self.grid[cells, hours] > 1e-3
+        cells, hours = cells[occupied], hours[occupied]
+        if not len(cells):
+            return np.zeros(1, dtype=np.float32)
+        if len(cells) > limit:
+            pick = np.random.default_rng(0).choice(len(cells), limit, replace=False)
+            cells, hours = cells[pick], hours[pick]
+        return self._scores(lats[cells], lons[cells], hours)
+
+    def _score_at_percentile(self, percentile):
+        return float(np.percentile(self.reference, percentile))
+
+    def _scores(self, lats, lons, hours):
+        """Kernel-weighted risk of each point at its hour of the week"""
+        if not len(self.keys):
+            return np.zeros(len(lats), dtype=np.float32)
+        rows, cols = self._cells_of(lats, lons)
+        keys = self._keys_of(rows[:, None] + self._dr, cols[:, None] + self._dc)
+        index = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[index] == keys
+
+        # Distance from each point to the centre of each neighbour cell
+        centre_lats = (rows[:, None] + self._dr + 0.5) * self.cell_deg - 90.0
+        centre_lons = (cols[:, None] + self._dc + 0.5) * self.cell_deg - 180.0
+        dy = (centre_lats - lats[:, None]) * KM_PER_DEGREE
+        dx = ((centre_lons - lons[:, None] + 180.0) % 360.0 - 180.0) * KM_PER_DEGREE * np.cos(np.radians(lats))[:, None]
+        kernel = np.exp(-0.5 * (dx * dx + dy * dy) / self.bandwidth_km ** 2) * found
+
+        return (kernel * self.grid[index, (hours % HOURS_PER_WEEK)[:, None]]).sum(axis=1).astype(np.float32)
+
+    def score_many(self, lats, lons, hours, chunk=8192):
+        """Score arrays of points; returns ``{"score", "percentile", "label"}`` arrays.
+
+        ``label`` indexes LABELS. Points are processed ``chunk`` at a time to
+        bound the size of the neighbour matrices.
+        """
+        started = time.perf_counter()
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        hours = np.broadcast_to(np.asarray(hours, dtype=np.int64), lats.shape)
+        scores = np.concatenate([self._scores(lats[i:i + chunk], lons[i:i + chunk], hours[i:i + chunk])
+                                 for i in range(0, len(lats), chunk)]) if len(lats) else np.zeros(0, np.float32)
+
+        result = self.classify(scores)
+
+        with self._lock:
+            self._stats["points_scored"] += len(lats)
+            self._stats["batches"] += 1
+            self._stats["total_ms"] += (time.perf_counter() - started) * 1000
+        return result
+
+    def classify(self, scores):
+        """``{"score", "percentile", "label"}`` arrays for risk scores (e.g. averaged over a stretch)"""
+        scores = np.asarray(scores, dtype=np.float32)
+        percentile = 100.0 * np.searchsorted(self.reference, scores, side="right") / len(self.reference)
+        label = (scores >= self.thresholds[0]).astype(np.int8) + (scores >= self.thresholds[1])
+        label[scores <= 1e-6] = 0
+        return {"score": scores, "percentile": percentile, "label": label}
+
+    def nearby_categories(self, lat, lon, radius_km=None, top=3):
+        """(incident count, [(category, count), ...]) within radius_km of a point, over all hours"""
+        radius_km = radius_km or 2 * self.bandwidth_km
+        if not len(self.keys):
+            return 0, []
+        rows, cols = self._cells_of(np.array([lat]), np.array([lon]))
+        keys = self._keys_of(rows[:, None] + self._dr, cols[:, None] + self._dc)[0]
+        index = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        centre_lats = (rows[0] + self._dr + 0.5) * self.cell_deg - 90.0
+        centre_lons = (cols[0] + self._dc + 0.5) * self.cell_deg - 180.0
+        dist = np.hypot((centre_lats - lat) * KM_PER_DEGREE,
+                        (centre_lons - lon) * KM_PER_DEGREE * math.cos(math.radians(lat)))
+        index = index[(self.keys[index] == keys) & (dist <= radius_km)]
+        counts = self.category_counts[index].sum(axis=0)
+        order = np.argsort(counts)[::-1][:top]
+        return (int(round(float(counts.sum()))),
+                [(str(self.category_names[i]), int(round(float(counts[i])))) for i in order if counts[i] > 0])
+
+    def assess(self, lat, lon, hour_of_week):
+        """Label, score and nearby incident summary for one point"""
+        result = self.score_many([lat], [lon], [hour_of_week])
+        incidents, categories = self.nearby_categories(lat, lon)
+        return {
+            "label": LABELS[int(result["label"][0])],
+            "score": round(float(result["score"][0]), 4),
+            "percentile": round(float(result["percentile"][0]), 1),
+            "incidents_nearby": incidents,
+            "top_categories": categories,
+            "lat": lat,
+            "lon": lon,
+            "hour_of_week": int(hour_of_week),
+        }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        total_ms = stats.pop("total_ms")
+        stats["incidents"] = self.incidents
+        stats["cells"] = len(self.keys)
+        stats["avg_batch_ms"] = round(total_ms / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+
+_COORDINATES = re.compile(r"^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$")
+
+
+def resolve_point(location):
+    """(lat, lon) of a location given as "lat, lon" or a place in the offline gazetteer, else None"""
+    match = _COORDINATES.match(location)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return None
+    place = gazetteer.find(location)
+    return (place["lat"], place["lon"]) if place else None
+
+
+# Global instance
+_engine = None
+_engine_loaded = False
+_engine_lock = threading.Lock()
+
+
+def get_risk_engine():
+    """The shared risk engine from RISK_INCIDENTS_PATH, or None when not configured or unreadable"""
+    global _engine, _engine_loaded
+    with _engine_lock:
+        if not _engine_loaded:
+            _engine_loaded = True
+            if RISK_INCIDENTS_PATH:
+                try:
+                    _engine = RiskEngine.from_file(RISK_INCIDENTS_PATH)
+                except Exception as e:
+                    logger.warning(f"Risk engine unavailable, every check goes to the LLM: {e}")
+    return _engine
+
+
+def assess_location_risk(location, time_of_travel):
+    """Local risk assessment of a (location, time) query in milliseconds, or None when the
+    engine is not configured or the place or time cannot be resolved offline"""
+    engine = get_risk_engine()
+    if engine is None:
+        return None
+    point = resolve_point(location)
+    hour_of_week = parse_hour_of_week(time_of_travel)
+    if point is None or hour_of_week is None:
+        return None
+    return engine.assess(point[0], point[1], hour_of_week)
+
+
+def get_risk_stats():
+    engine = get_risk_engine()
+    return engine.stats() if engine is not None else None
@@ -0,0 +1,160 @@
+import os
+import logging
+import numpy as np
+
+from module.risk import get_risk_engine, check_coordinates, LABELS, KM_PER_DEGREE, HOURS_PER_WEEK
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Distance between risk samples along a route, km
+ROUTE_SAMPLE_KM = float(os.getenv("ROUTE_SAMPLE_KM", "0.1"))
+# Length of a reported route segment, km
+ROUTE_SEGMENT_KM = float(os.getenv("ROUTE_SEGMENT_KM", "0.5"))
+# Assumed travel speed, so later parts of a long route are scored at the hour they are reached, km/h
+ROUTE_SPEED_KMH = float(os.getenv("ROUTE_SPEED_KMH", "20"))
+# Longest route scored, km
+ROUTE_MAX_KM = float(os.getenv("ROUTE_MAX_KM", "100"))
+
+
+def decode_polyline(encoded, precision=5):
+    """[(lat, lon), ...] of a Google encoded polyline"""
+    points = []
+    index = lat = lon = 0
+    factor = 10 ** precision
+    while index < len(encoded):
+        for axis in (0, 1):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            delta = ~(result >> 1) if result & 1 else result >> 1
+            if axis == 0:
+                lat += delta
+            else:
+                lon += delta
+        points.append((lat / factor, lon / factor))
+    return points
+
+
+def route_points(route):
+    """(n, 2) lat/lon array of a route given as an encoded polyline or a list of [lat, lon] waypoints"""
+    if isinstance(route, str):
+        try:
+            points = decode_polyline(route)
+        except IndexError:
+            raise ValueError("malformed polyline") from None
+    else:
+        points = []
+        for i, p in enumerate(route):
+            try:
+                points.append((float(p[0]), float(p[1])))
+            except (IndexError, KeyError, TypeError):
+                raise ValueError(f"waypoint {i} needs [lat, lon]") from None
+    if len(points) < 2:
+        raise ValueError("a route needs at least two points")
+    points = np.asarray(points, dtype=np.float64)
+    check_coordinates(points[:, 0], points[:, 1])
+    return points
+
+
+def sample_route(points, sample_km=ROUTE_SAMPLE_KM, max_km=None):
+    """Points every ``sample_km`` along a polyline, with the distance of each from the start.
+
+    Returns (lats, lons, distances_km); the last vertex is always included.
+    A route longer than ``max_km`` raises ValueError before any sampling.
+    """
+    mid_lat = np.radians((points[1:, 0] + points[:-1, 0]) / 2)
+    dy = np.diff(points[:, 0]) * KM_PER_DEGREE
+    dx = np.diff(points[:, 1]) * KM_PER_DEGREE * np.cos(mid_lat)
+    along = np.concatenate([[0.0], np.cumsum(np.hypot(dx, dy))])
+    if max_km is not None and along[-1] > max_km:
+        raise ValueError(f"route is {along[-1]:.0f} km long; at most {max_km:.0f} km is scored")
+    distances = np.append(np.arange(0.0, along[-1], sample_km), along[-1])
+    return np.interp(distances, along, points[:, 0]), np.interp(distances, along, points[:, 1]), distances
+
+
+def score_routes(routes, departure_hour_of_week, engine=None, speed_kmh=ROUTE_SPEED_KMH,
+                 sample_km=ROUTE_SAMPLE_KM, segment_km=ROUTE_SEGMENT_KM, max_km=ROUTE_MAX_KM):
+    """Risk along each candidate route, scored together in one batched engine call.
+
+    Each route is sampled every ``sample_km``; a sample is scored at the hour
+    of the week it is reached when leaving at ``departure_hour_of_week`` and
+    moving at ``speed_kmh``. Samples are averaged into ``segment_km``
+    segments. A route's ``exposure`` is its segment risk integrated over
+    distance, and routes are ranked by it: ``safest`` is the index of the
+    lowest. A route's ``label`` is that of its worst segment. Returns
+    ``{"routes": [...], "safest": index}``.
+    """
+    engine = engine or get_risk_engine()
+    if engine is None:
+        raise RuntimeError("Local risk scoring is not configured (RISK_INCIDENTS_PATH)")
+    # Every segment then holds at least one sample
+    segment_km = max(segment_km, sample_km)
+
+    sampled = []
+    for i, route in enumerate(routes):
+        try:
+            sampled.append(sample_route(route_points(route), sample_km, max_km))
+        except ValueError as e:
+            raise ValueError(f"route {i}: {e}")
+    lats = np.concatenate([s[0] for s in sampled])
+    lons = np.concatenate([s[1] for s in sampled])
+    distances = np.concatenate([s[2] for s in sampled])
+    hours = (departure_hour_of_week + (distances / speed_kmh).astype(np.int64)) % HOURS_PER_WEEK
+    scores = engine.score_many(lats, lons, hours)["score"]
+
+    results = []
+    start = 0
+    for route_lats, route_lons, route_distances in sampled:
+        end = start + len(route_distances)
+        route_scores = scores[start:end]
+        start = end
+
+        length = float(route_distances[-1])
+        segment = np.minimum((route_distances // segment_km).astype(np.int64),
+                             max(int(np.ceil(length / segment_km)) - 1, 0))
+        count = np.bincount(segment)
+        mean = np.bincount(segment, weights=route_scores) / np.maximum(count, 1)
+        peak = np.zeros(len(count), dtype=np.float32)
+        np.maximum.at(peak, segment, route_scores)
+        classified = engine.classify(mean)
+        # A segment runs from its first sample to the first sample of the next one
+        first = np.searchsorted(segment, np.arange(len(count)))
+        ends = np.append(first[1:], len(segment) - 1)
+        seg_lengths = route_distances[ends] - route_distances[first]
+
+        segments = [{
+            "from": [round(float(route_lats[a]), 6), round(float(route_lons[a]), 6)],
+            "to": [round(float(route_lats[b]), 6), round(float(route_lons[b]), 6)],
+            "start_km": round(float(route_distances[a]), 3),
+            "length_km": round(float(seg_length), 3),
+            "score": round(float(mean[i]), 4),
+            "peak": round(float(peak[i]), 4),
+            "percentile": round(float(classified["percentile"][i]), 1),
+            "label": LABELS[int(classified["label"][i])],
+        } for i, (a, b, seg_length) in enumerate(zip(first, ends, seg_lengths))]
+
+        exposure = float(np.dot(mean, seg_lengths))
+        route_label = max((int(label) for label in classified["label"]), default=0)
+        results.append({
+            "length_km": round(length, 3),
+            "duration_min": round(length / speed_kmh * 60, 1),
+            "exposure": round(exposure, 4),
+            "mean_score": round(exposure / length, 4) if length else 0.0,
+            "label": LABELS[route_label],
+            "risk_km": {name: round(float(seg_lengths[classified["label"] == level].sum()), 3)
+                        for level, name in enumerate(LABELS)},
+            "segments": segments,
+        })
+
+    safest = min(range(len(results)), key=lambda i: results[i]["exposure"]) if results else None
+    return {"routes": results, "safest": safest}
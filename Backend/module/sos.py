@@ -1,15 +1,22 @@
 import os
 import threading
 import datetime
-import requests
 import time
 import speech_recognition as sr
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
 from dotenv import load_dotenv
-import pygame
 import logging
 import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from module.location import get_location_tracker, describe_age, LOCATION_REFRESH_INTERVAL
+from module.audio import get_audio_service
+from module.vad import EnergyGate
+from module.capture import ContinuousCapture
+from module.hotword import create_voice_trigger
+from module.outbox import get_outbox, new_alert_id, SENT, PENDING, SENDING
 
 # Setup logging
 logging.basicConfig(
@@ -18,6 +25,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Voice SOS analysis: VOICE_WINDOW_S of audio every VOICE_HOP_S, from a VOICE_BUFFER_S ring
+VOICE_WINDOW_S = float(os.getenv("VOICE_WINDOW_S", "3.0"))
+VOICE_HOP_S = float(os.getenv("VOICE_HOP_S", "1.0"))
+VOICE_BUFFER_S = float(os.getenv("VOICE_BUFFER_S", "10.0"))
+
+# Concurrent Twilio requests during an SOS fan-out
+SOS_DISPATCH_WORKERS = int(os.getenv("SOS_DISPATCH_WORKERS", "8"))
+# Longest activate_sos() waits for the first delivery attempt; the outbox keeps retrying after, seconds
+SOS_DISPATCH_TIMEOUT = float(os.getenv("SOS_DISPATCH_TIMEOUT", "20"))
+# Per-request timeout for the Twilio API, seconds
+TWILIO_TIMEOUT = float(os.getenv("TWILIO_TIMEOUT", "10"))
+# Text the last-known fix at once and a fresh one as a follow-up, instead of
+# refreshing a stale fix before the first SMS
+SOS_TWO_PHASE = os.getenv("SOS_TWO_PHASE", "1") == "1"
+
 class SOSEmergencySystem:
     def __init__(self):
         load_dotenv()
@@ -29,7 +51,7 @@ class SOSEmergencySystem:
         
         # Emergency contacts
         contacts = os.getenv('EMERGENCY_CONTACTS', '')
-        self.emergency_contacts = [c.strip() for c in contacts.split(',') if c.strip()]
+        self.emergency_contacts = list(dict.fromkeys(c.strip() for c in contacts.split(',') if c.strip()))
         
         # File paths
         self.base_dir = Path(__file__).parent.parent
@@ -44,9 +66,35 @@ class SOSEmergencySystem:
         # Initialize log file
         self._init_log_file()
         
-        # System state
+        # Keeps a last-known fix in memory so activate_sos() never waits on ipinfo
+        self.location_tracker = get_location_tracker()
+        
+        # System state (shared between menu, voice listener and server threads)
         self.sos_active = False
         self.voice_listener_active = False
+        self._state_lock = threading.Lock()
+        # Outbox alert of the active SOS, cancelled by deactivate_sos()
+        self.alert_id = None
+        
+        # One Twilio client (keep-alive connection pool) and a bounded pool for SOS fan-out
+        self._twilio_client = None
+        self._twilio_lock = threading.Lock()
+        self.dispatch_executor = ThreadPoolExecutor(max_workers=SOS_DISPATCH_WORKERS,
+                                                    thread_name_prefix="sos-dispatch")
+        self.last_dispatch = None
+        self.two_phase = SOS_TWO_PHASE
+        
+        # Every SMS/call goes through the durable outbox, which retries and survives restarts
+        self.outbox = get_outbox()
+        self.outbox.register("sms", lambda rows: self._deliver_batch("sms", rows))
+        self.outbox.register("call", lambda rows: self._deliver_batch("call", rows))
+        
+        # Drops silence and background noise before it reaches the recognizer
+        self.vad = EnergyGate()
+        self.voice_capture = None
+        self.voice_trigger = None
+        # Seconds from the end of the trigger phrase to activate_sos()
+        self.detection_latencies = deque(maxlen=50)
         
         logger.info("SOS Emergency System initialized")
     
@@ -74,35 +122,11 @@ class SOSEmergencySystem:
             logger.error(f"Logging error: {e}")
     
     def get_location(self):
-        """Get current location using IP geolocation"""
-        try:
-            response = requests.get("https://ipinfo.io/json", timeout=10)
-            data = response.json()
-            
-            loc = data.get('loc', 'Unknown')
-            city = data.get('city', 'Unknown')
-            country = data.get('country', 'Unknown')
-            
-            location_info = {
-                'coordinates': loc,
-                'city': city,
-                'country': country,
-                'maps_url': f"https://www.google.com/maps?q={loc}",
-                'full_address': f"{city}, {country}"
-            }
-            
-            logger.info(f"Location retrieved: {location_info['full_address']}")
-            return location_info
-            
-        except Exception as e:
-            logger.error(f"Location error: {e}")
-            return {
-                'coordinates': 'Unknown',
-                'city': 'Unknown', 
-                'country': 'Unknown',
-                'maps_url': 'Location unavailable',
-                'full_address': 'Location unavailable'
-            }
+        """Last-known location (IP geolocation, refreshed in the background); never blocks"""
+        location_info = self.location_tracker.current()
+        if location_info['age'] is None or location_info['age'] > LOCATION_REFRESH_INTERVAL:
+            self.location_tracker.refresh_soon()
+        return location_info
     
     def play_alert_sound(self, sound_path):
         """Play alert sound continuously"""
@@ -111,61 +135,193 @@ class SOSEmergencySystem:
                 logger.warning(f"Alert sound file not found: {sound_path}")
                 return
             
-            pygame.mixer.init()
-            pygame.mixer.music.load(str(sound_path))
-            pygame.mixer.music.play(-1)  # Loop indefinitely
-            logger.info("Alert sound started")
+            # Alert channel preempts (pauses) any speech that is playing
+            if get_audio_service().play_alert(str(sound_path), loops=-1):  # Loop indefinitely
+                logger.info("Alert sound started")
             
         except Exception as e:
             logger.error(f"Alert sound error: {e}")
     
+    def _sound_alarm(self, announce=None):
+        """Speak the activation confirmation, if any, then loop the alert sound.
+        
+        The alert channel pauses speech, so the confirmation has to finish first.
+        """
+        if announce:
+            try:
+                announce()
+            except Exception as e:
+                logger.warning(f"SOS confirmation could not be spoken: {e}")
+        if self.sos_active:
+            self.play_alert_sound(self.alert_sound_path)
+    
     def stop_alert_sound(self):
         """Stop alert sound"""
         try:
-            if pygame.mixer.get_init():
-                pygame.mixer.music.stop()
-                pygame.mixer.quit()
+            get_audio_service().stop_alert()
             logger.info("Alert sound stopped")
         except Exception as e:
             logger.warning(f"Error stopping alert sound: {e}")
     
-    def send_sms(self, contact, message):
-        """Send emergency SMS"""
+    def get_twilio_client(self):
+        """Shared Twilio client; its HTTP session keeps connections to the API open"""
+        with self._twilio_lock:
+            if self._twilio_client is None:
+                http_client = TwilioHttpClient(pool_connections=True, timeout=TWILIO_TIMEOUT)
+                self._twilio_client = Client(self.account_sid, self.auth_token, http_client=http_client)
+        return self._twilio_client
+    
+    def _create_sms(self, contact, message):
+        """Send one SMS and return its SID; raises on failure"""
         if contact == self.twilio_number:
-            return False
-            
+            raise ValueError("refusing to message the Twilio number itself")
+        return self.get_twilio_client().messages.create(
+            body=message,
+            from_=self.twilio_number,
+            to=contact
+        ).sid
+    
+    def _create_call(self, contact, voice_message):
+        """Place one call and return its SID; raises on failure"""
+        if contact == self.twilio_number:
+            raise ValueError("refusing to call the Twilio number itself")
+        return self.get_twilio_client().calls.create(
+            twiml=f'<Response><Say voice="alice">{voice_message}</Say></Response>',
+            from_=self.twilio_number,
+            to=contact
+        ).sid
+    
+    def send_sms(self, contact, message):
+        """Send emergency SMS; returns the message SID or None"""
         try:
-            client = Client(self.account_sid, self.auth_token)
-            message = client.messages.create(
-                body=message,
-                from_=self.twilio_number,
-                to=contact
-            )
-            self.log_event(f"SMS sent to {contact} - SID: {message.sid}")
-            return True
+            sid = self._create_sms(contact, message)
+            self.log_event(f"SMS sent to {contact} - SID: {sid}")
+            return sid
             
         except Exception as e:
             self.log_event(f"SMS failed to {contact}: {str(e)}")
-            return False
+            return None
     
     def make_call(self, contact, voice_message):
-        """Make emergency call"""
-        if contact == self.twilio_number:
-            return False
-            
+        """Make emergency call; returns the call SID or None"""
         try:
-            client = Client(self.account_sid, self.auth_token)
-            call = client.calls.create(
-                twiml=f'<Response><Say voice="alice">{voice_message}</Say></Response>',
-                from_=self.twilio_number,
-                to=contact
-            )
-            self.log_event(f"Call initiated to {contact} - SID: {call.sid}")
-            return True
+            sid = self._create_call(contact, voice_message)
+            self.log_event(f"Call initiated to {contact} - SID: {sid}")
+            return sid
             
         except Exception as e:
             self.log_event(f"Call failed to {contact}: {str(e)}")
-            return False
+            return None
+    
+    def _deliver_batch(self, channel, rows):
+        """Outbox handler: send one channel's batch in parallel on the bounded dispatch pool"""
+        send = self._create_sms if channel == "sms" else self._create_call
+        sent, failed = ("SMS sent to", "SMS failed to") if channel == "sms" else ("Call initiated to", "Call failed to")
+        
+        def run(row):
+            try:
+                sid = send(row["recipient"], row["payload"]["message"])
+                self.log_event(f"{sent} {row['recipient']} - SID: {sid}")
+                return True, sid
+            except Exception as e:
+                self.log_event(f"{failed} {row['recipient']}: {str(e)}")
+                return False, str(e)
+        
+        return list(self.dispatch_executor.map(run, rows))
+    
+    def dispatch_to_contacts(self, contacts, sms_message, voice_message, timeout=SOS_DISPATCH_TIMEOUT,
+                             followup=None, started_at=None, alert_id=None):
+        """Queue the SMS and call for every contact and wait for the first delivery attempt.
+        
+        Returns one dict per contact (contact, sms_sid, call_sid, latency,
+        error), where latency is seconds from queueing until the contact's
+        last successful send. Waits at most ``timeout`` seconds; anything
+        not delivered by then stays in the outbox and keeps being retried.
+        ``followup(alert_id, contacts)`` is started in a thread once the
+        alert is queued. ``started_at`` (wall clock) is when the alert was
+        raised, for the time-to-first-notification metric.
+        """
+        started = time.perf_counter()
+        alert_id = alert_id or new_alert_id()
+        # Once per number: results are keyed by contact, and nobody should get two alerts
+        contacts = list(dict.fromkeys(c.strip() for c in contacts if c and c.strip() != self.twilio_number))
+        for contact in contacts:
+            self.outbox.enqueue(alert_id, "sms", contact, {"message": sms_message}, created_at=started_at)
+            self.outbox.enqueue(alert_id, "call", contact, {"message": voice_message}, created_at=started_at)
+        if followup:
+            threading.Thread(target=followup, args=(alert_id, contacts), name="sos-followup", daemon=True).start()
+        
+        rows = [row for row in self.outbox.wait(alert_id, timeout)
+                if row["payload"].get("phase") != "followup"]
+        results = {contact: {"contact": contact, "sms_sid": None, "call_sid": None,
+                             "latency": None, "error": None} for contact in contacts}
+        for row in rows:
+            result = results[row["recipient"]]
+            channel = row["channel"]
+            if row["status"] == SENT:
+                result[f"{channel}_sid"] = row["result"]
+                result["latency"] = round(max(result["latency"] or 0.0, row["sent_at"] - row["created_at"]), 3)
+                continue
+            if row["status"] not in (PENDING, SENDING):
+                # Failed, or dropped because the alert was cancelled
+                error = row["last_error"]
+            elif row["status"] == PENDING and row["attempts"]:
+                error = f"{row['last_error']} (will retry)"
+            else:
+                error = f"not delivered within {timeout:.0f}s, still queued"
+            result["error"] = f"{result['error']}; {channel}: {error}" if result["error"] else f"{channel}: {error}"
+        
+        first = self.outbox.first_notification(alert_id)
+        self.last_dispatch = {
+            "alert_id": alert_id,
+            "contacts": len(contacts),
+            "total_time": round(time.perf_counter() - started, 3),
+            "first_notification": round(first, 3) if first is not None else None,
+            "pending": sum(1 for row in rows if row["status"] in (PENDING, SENDING)),
+            "results": list(results.values()),
+        }
+        return self.last_dispatch["results"]
+    
+    def _compose_sms(self, location_info, followup=False):
+        if followup:
+            return f"""📍 SOS UPDATE: fresh location
+
+📍 Location: {location_info['full_address']}
+🗺️ Maps: {location_info['maps_url']}
+📱 Coordinates: {location_info['coordinates']}
+
+Sent via Girlas Safety App"""
+
+        return f"""🚨 EMERGENCY ALERT 🚨
+
+I am in danger and need immediate help!
+
+📍 Location: {location_info['full_address']}
+🗺️ Maps: {location_info['maps_url']}
+📱 Coordinates: {location_info['coordinates']}
+🕒 Last known {describe_age(location_info['age'])} ({location_info['source'] or 'no fix'})
+
+🆘 Please send help immediately!
+
+Sent via Girlas Safety App"""
+    
+    def _alert_active(self, alert_id):
+        """True while this alert has not been deactivated or cancelled"""
+        return self.sos_active and self.alert_id == alert_id and not self.outbox.is_cancelled(alert_id)
+    
+    def _send_location_followup(self, alert_id, contacts):
+        """Phase two: fetch a fresh fix and text it once the first SMS went out"""
+        if not self._alert_active(alert_id) or not self.location_tracker.refresh():
+            return
+        sms_message = self._compose_sms(self.location_tracker.current(), followup=True)
+        # The update must not overtake the alert itself
+        self.outbox.wait(alert_id, SOS_DISPATCH_TIMEOUT)
+        if not self._alert_active(alert_id):
+            logger.info("SOS deactivated, location follow-up not sent")
+            return
+        for contact in contacts:
+            self.outbox.enqueue(alert_id, "sms", contact, {"message": sms_message, "phase": "followup"},
+                                key=f"{alert_id}:sms:{contact}:followup")
     
     def emergency_auto_call(self):
         """Make automatic emergency call after delay"""
@@ -181,69 +337,105 @@ class SOSEmergencySystem:
                 "Emergency! No response from user. Immediate assistance required."
             )
     
+    def get_voice_stats(self):
+        """Voice gate counters, dropped windows and trigger-to-activation latency"""
+        stats = self.vad.stats()
+        stats["dropped_windows"] = self.voice_capture.dropped_windows if self.voice_capture else 0
+        if self.voice_trigger:
+            stats["recognizer"] = self.voice_trigger.stats()
+        latencies = list(self.detection_latencies)
+        stats["detections"] = len(latencies)
+        stats["last_detection_latency_ms"] = round(1000 * latencies[-1], 1) if latencies else None
+        return stats
+    
     def listen_for_sos_voice(self):
-        """Listen for voice activation"""
-        recognizer = sr.Recognizer()
-        microphone = sr.Microphone()
+        """Listen for voice activation.
+        
+        The microphone is captured continuously into a ring buffer on its own
+        thread; this worker analyses overlapping windows from it, so audio
+        keeps being recorded while a window is being recognized and a phrase
+        split across one window boundary is whole in the next.
+        """
+        if self.voice_trigger is None:
+            self.voice_trigger = create_voice_trigger()
+        capture = ContinuousCapture(sr.Microphone(), VOICE_WINDOW_S, VOICE_HOP_S, VOICE_BUFFER_S)
+        try:
+            capture.start()
+        except Exception as e:
+            logger.error(f"Voice listener error: {e}")
+            return
+        self.voice_capture = capture
         
-        with microphone as source:
-            recognizer.adjust_for_ambient_noise(source)
+        self.vad.calibrate(capture.read_seconds(1), capture.sample_rate, capture.sample_width)
         
         self.voice_listener_active = True
         logger.info("Voice activation listener started")
+        print("🎤 Listening for 'help me'...")
         
-        while self.voice_listener_active:
-            try:
-                with microphone as source:
-                    print("🎤 Listening for 'help me'...")
-                    audio = recognizer.listen(source, timeout=5, phrase_time_limit=3)
+        try:
+            for raw, start in capture.windows():
+                if not self.voice_listener_active:
+                    break
+                
+                # Earlier speech was already sent with a previous overlapping window;
+                # frames seen in one are not classified again
+                has_speech, speech_end_ms = self.vad.gate(
+                    raw, capture.sample_rate, capture.sample_width, fresh_ms=1000 * VOICE_HOP_S, offset=start
+                )
+                if not has_speech:
+                    continue
                 
-                command = recognizer.recognize_google(audio).strip().lower()
-                logger.debug(f"Voice command heard: {command}")
+                try:
+                    detected = self.voice_trigger.detect(sr.AudioData(raw, capture.sample_rate, capture.sample_width))
+                except Exception as e:
+                    # A failing backend must not end voice SOS; try the next window
+                    logger.error(f"Speech recognition error: {e}")
+                    continue
                 
-                if "help me" in command or "emergency" in command or "sos" in command:
-                    logger.info("SOS activated by voice command")
+                if detected:
+                    phrase, backend = detected
+                    utterance_end = capture.time_of(start + speech_end_ms * capture.byte_rate // 1000)
+                    latency = time.perf_counter() - utterance_end
+                    self.detection_latencies.append(latency)
+                    logger.info(f"SOS activated by voice command '{phrase}' via {backend} "
+                                f"({1000 * latency:.0f} ms after the phrase ended)")
                     self.activate_sos()
                     break
-                    
-            except sr.WaitTimeoutError:
-                continue
-            except sr.UnknownValueError:
-                continue
-            except sr.RequestError as e:
-                logger.error(f"Speech recognition error: {e}")
-                break
-            except Exception as e:
-                logger.error(f"Voice listener error: {e}")
-                break
+        except Exception as e:
+            logger.error(f"Voice listener error: {e}")
+        finally:
+            capture.stop()
     
-    def activate_sos(self):
-        """Activate SOS emergency system"""
-        if self.sos_active:
-            logger.warning("SOS already active")
-            return
+    def activate_sos(self, announce=None):
+        """Activate SOS emergency system. Returns False if it was already active.
+        
+        ``announce()`` (e.g. speaking a confirmation) runs before the alert
+        sound starts; notifications are not held for it.
+        """
+        with self._state_lock:
+            if self.sos_active:
+                logger.warning("SOS already active")
+                return False
+            self.sos_active = True
+            alert_id = self.alert_id = new_alert_id()
+        started_at = time.time()
         
-        self.sos_active = True
         self.log_event("🚨 SOS EMERGENCY ACTIVATED")
         
         print("🚨 EMERGENCY SOS ACTIVATED!")
         print("🆘 Notifying emergency contacts...")
         
-        # Get location
-        location_info = self.get_location()
+        # Last-known location from memory; no network on the alert path
+        location_info = self.location_tracker.current()
+        stale = location_info['age'] is None or location_info['age'] > LOCATION_REFRESH_INTERVAL
+        if stale and not self.two_phase and self.location_tracker.refresh():
+            location_info = self.location_tracker.current()
+        
+        # Phase two: the fresh fix follows the first SMS instead of delaying it
+        followup = self._send_location_followup if stale and self.two_phase else None
         
         # Create messages
-        sms_message = f"""🚨 EMERGENCY ALERT 🚨
-
-I am in danger and need immediate help!
-
-📍 Location: {location_info['full_address']}
-🗺️ Maps: {location_info['maps_url']}
-📱 Coordinates: {location_info['coordinates']}
-
-🆘 Please send help immediately!
-
-Sent via Girlas Safety App"""
+        sms_message = self._compose_sms(location_info)
 
         voice_message = f"""Emergency! I am in danger and need immediate assistance. 
         My location is {location_info['city']}, {location_info['country']}. 
@@ -251,51 +443,43 @@ Sent via Girlas Safety App"""
         
         # Start alert sound
         sound_thread = threading.Thread(
-            target=self.play_alert_sound, 
-            args=(self.alert_sound_path,)
+            target=self._sound_alarm, 
+            args=(announce,)
         )
         sound_thread.daemon = True
         sound_thread.start()
         
-        # Send notifications to all contacts
-        notification_threads = []
-        
-        for contact in self.emergency_contacts:
-            if contact:
-                # SMS thread
-                sms_thread = threading.Thread(
-                    target=self.send_sms,
-                    args=(contact, sms_message)
-                )
-                sms_thread.daemon = True
-                sms_thread.start()
-                notification_threads.append(sms_thread)
-                
-                # Call thread
-                call_thread = threading.Thread(
-                    target=self.make_call,
-                    args=(contact, voice_message)
-                )
-                call_thread.daemon = True
-                call_thread.start()
-                notification_threads.append(call_thread)
-        
         # Start auto emergency call
         auto_call_thread = threading.Thread(target=self.emergency_auto_call)
         auto_call_thread.daemon = True
         auto_call_thread.start()
         
-        logger.info(f"SOS activated for {len(self.emergency_contacts)} contacts")
+        # Send notifications to all contacts (bounded by SOS_DISPATCH_TIMEOUT in total)
+        contacts = [c for c in self.emergency_contacts if c]
+        results = self.dispatch_to_contacts(contacts, sms_message, voice_message, followup=followup,
+                                            started_at=started_at, alert_id=alert_id)
         
-        # Wait for notifications to complete
-        for thread in notification_threads:
-            thread.join(timeout=10)
+        reached = sum(1 for r in results if r["sms_sid"] or r["call_sid"])
+        logger.info(f"SOS activated: {reached}/{len(contacts)} contacts reached "
+                    f"in {self.last_dispatch['total_time']:.2f}s "
+                    f"(first notification after {self.last_dispatch['first_notification']}s)")
+        return True
     
-    def deactivate_sos(self):
-        """Deactivate SOS system"""
-        self.sos_active = False
+    def deactivate_sos(self, cancel=True):
+        """Deactivate SOS system.
+        
+        With ``cancel`` (a false alarm) every SMS and call of the alert
+        that has not gone out yet is dropped from the outbox, including
+        retries and follow-ups.
+        """
+        with self._state_lock:
+            self.sos_active = False
+            alert_id, self.alert_id = self.alert_id, None
         self.voice_listener_active = False
         self.stop_alert_sound()
+        if cancel and alert_id:
+            dropped = self.outbox.cancel(alert_id)
+            self.log_event(f"SOS alert cancelled, {dropped} pending notifications dropped")
         self.log_event("SOS system deactivated")
         logger.info("SOS system deactivated")
     
@@ -308,29 +492,35 @@ Sent via Girlas Safety App"""
 
 # Global instance
 _sos_system = None
+_sos_system_lock = threading.Lock()
 
 def get_sos_system():
     """Get or create SOS system instance"""
     global _sos_system
-    if _sos_system is None:
-        _sos_system = SOSEmergencySystem()
+    with _sos_system_lock:
+        if _sos_system is None:
+            _sos_system = SOSEmergencySystem()
     return _sos_system
 
-def activate_sos():
+def activate_sos(announce=None):
     """Activate SOS emergency system"""
     system = get_sos_system()
-    system.activate_sos()
+    return system.activate_sos(announce)
 
 def start_voice_activation():
     """Start voice activation for SOS"""
     system = get_sos_system()
     return system.start_voice_listener()
 
-def deactivate_sos():
-    """Deactivate SOS system"""
+def get_dispatch_stats():
+    """Summary and per-contact results of the last SOS fan-out (None before the first)"""
+    return get_sos_system().last_dispatch
+
+def deactivate_sos(cancel=True):
+    """Deactivate SOS system; ``cancel=False`` stops the alarm but lets queued notifications finish"""
     global _sos_system
     if _sos_system:
-        _sos_system.deactivate_sos()
+        _sos_system.deactivate_sos(cancel)
 
 if __name__ == "__main__":
     print("🆘 SOS Emergency System")
@@ -348,4 +538,4 @@ if __name__ == "__main__":
             
     except KeyboardInterrupt:
         print("\n👋 Shutting down SOS system...")
-        deactivate_sos()
\ No newline at end of file
+        deactivate_sos(cancel=False)
\ No newline at end of file
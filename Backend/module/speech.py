@@ -1,6 +1,11 @@
 import os
 import time
+import queue
+import shutil
 import logging
+import subprocess
+from collections import deque
+from contextlib import contextmanager
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
@@ -19,27 +24,124 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Longest single execute_async_script wait in push mode, seconds
+PUSH_WAIT_SLICE = 1.0
+# DOM polling interval in poll mode, seconds
+POLL_INTERVAL = 0.5
+# Remembers the last chromedriver that worked, so later starts need no network
+DRIVER_PATH_FILE = "chromedriver.path"
+
+# Browser sessions available for concurrent recognitions
+SPEECH_POOL_SIZE = int(os.getenv("SPEECH_POOL_SIZE", "2"))
+# Recycle a session's Chrome after this many recognitions to cap memory growth
+SPEECH_SESSION_MAX_USES = int(os.getenv("SPEECH_SESSION_MAX_USES", "50"))
+# Longest wait for a free session before giving up, seconds
+SPEECH_CHECKOUT_TIMEOUT = float(os.getenv("SPEECH_CHECKOUT_TIMEOUT", "30"))
+
 class SpeechRecognitionEngine:
     def __init__(self):
         self.env_vars = dotenv_values(".env")
         self.input_language = self.env_vars.get("inputLanguage", "en-US")
+        # "push" (page calls back into WebDriver) or "poll" (legacy DOM polling)
+        self.capture_mode = self.env_vars.get("speechCaptureMode", "push").lower()
         self.driver = None
         self.is_listening = False
+        self.last_result_at = None
+        self.startup_time = None
+        self.uses = 0
         self.setup_driver()
         
+    @staticmethod
+    def driver_runs(path):
+        """True when path is an executable chromedriver that answers --version"""
+        if not path or not os.path.isfile(path) or not os.access(path, os.X_OK):
+            return False
+        try:
+            result = subprocess.run([path, "--version"], capture_output=True, timeout=10)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"chromedriver at {path} does not run: {e}")
+            return False
+        return result.returncode == 0
+
+    def _driver_cache_file(self):
+        return os.path.join(self.data_dir, DRIVER_PATH_FILE)
+
+    def remember_driver_path(self, path):
+        """Record a chromedriver that just started Chrome, for the next start"""
+        try:
+            with open(self._driver_cache_file(), "w", encoding='utf-8') as f:
+                f.write(path)
+        except OSError as e:
+            logger.debug(f"Could not remember chromedriver path: {e}")
+
+    def forget_driver_path(self):
+        try:
+            os.remove(self._driver_cache_file())
+        except OSError:
+            pass
+
+    def resolve_driver_path(self, exclude=()):
+        """Find a chromedriver without touching the network when possible.
+
+        Order: ``chromeDriverPath`` from .env, the path remembered from the
+        last successful start, a chromedriver on PATH, then ChromeDriverManager
+        (network). Each candidate must run; a remembered one that does not
+        is forgotten. Paths in ``exclude`` are skipped. Returns None to let
+        Selenium Manager resolve it instead.
+        """
+        remembered = None
+        try:
+            with open(self._driver_cache_file(), "r", encoding='utf-8') as f:
+                remembered = f.read().strip()
+        except OSError:
+            pass
+        candidates = [self.env_vars.get("chromeDriverPath"), remembered, shutil.which("chromedriver")]
+
+        for path in candidates:
+            if not path or path in exclude:
+                continue
+            if self.driver_runs(path):
+                logger.debug(f"Using chromedriver at {path}")
+                return path
+            if path == remembered:
+                logger.warning(f"Remembered chromedriver {path} no longer works, forgetting it")
+                self.forget_driver_path()
+
+        try:
+            path = ChromeDriverManager().install()
+        except Exception as e:
+            logger.warning(f"ChromeDriverManager unavailable, falling back to Selenium Manager: {e}")
+            return None
+        if path in exclude or not self.driver_runs(path):
+            logger.warning(f"chromedriver from ChromeDriverManager at {path} does not run, using Selenium Manager")
+            return None
+        return path
+    
+    def write_html(self):
+        """Write Data/Voice.html, leaving it untouched when the content is unchanged"""
+        html_code = self.generate_html()
+        html_path = os.path.join(self.data_dir, "Voice.html")
+        try:
+            with open(html_path, "r", encoding='utf-8') as f:
+                if f.read() == html_code:
+                    return html_path
+        except OSError:
+            pass
+        with open(html_path, "w", encoding='utf-8') as f:
+            f.write(html_code)
+        return html_path
+    
     def setup_driver(self):
         """Setup Chrome driver for speech recognition"""
         try:
+            started = time.perf_counter()
+            
             # Create data directory
             self.data_dir = os.path.join(os.getcwd(), "Data")
             os.makedirs(self.data_dir, exist_ok=True)
             
             # HTML for speech recognition
-            html_code = self.generate_html()
-            html_path = os.path.join(self.data_dir, "Voice.html")
-            
-            with open(html_path, "w", encoding='utf-8') as f:
-                f.write(html_code)
+            html_path = self.write_html()
             
             # Chrome options
             chrome_options = Options()
@@ -54,12 +156,25 @@ class SpeechRecognitionEngine:
             chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
             chrome_options.add_experimental_option('useAutomationExtension', False)
             
-            # Initialize driver
-            service = Service(ChromeDriverManager().install())
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)
+            # Initialize driver; a path is remembered only once it has started Chrome
+            driver_path = self.resolve_driver_path()
+            try:
+                self.driver = webdriver.Chrome(service=Service(driver_path) if driver_path else Service(),
+                                               options=chrome_options)
+            except Exception as e:
+                if driver_path is None:
+                    raise
+                logger.warning(f"chromedriver at {driver_path} could not start Chrome, trying another: {e}")
+                self.forget_driver_path()
+                driver_path = self.resolve_driver_path(exclude={driver_path})
+                self.driver = webdriver.Chrome(service=Service(driver_path) if driver_path else Service(),
+                                               options=chrome_options)
+            if driver_path:
+                self.remember_driver_path(driver_path)
             
             self.driver.get(f"file://{os.path.abspath(html_path)}")
-            logger.info("Speech recognition engine initialized")
+            self.startup_time = time.perf_counter() - started
+            logger.info(f"Speech recognition engine initialized in {self.startup_time:.2f}s")
             
         except Exception as e:
             logger.error(f"Driver setup error: {e}")
@@ -136,6 +251,62 @@ class SpeechRecognitionEngine:
     <script>
         let recognition = null;
         let isListening = false;
+        let gotResult = false;
+        
+        // Push delivery to Python: waitForResult() parks the WebDriver async-script
+        // callback here and it is invoked the moment a result (or the end of the
+        // session without one) arrives, instead of Python polling the DOM
+        let pendingCallback = null;
+        let pendingResult = null;
+        
+        function deliver(payload) {{
+            payload.at = performance.timeOrigin + performance.now();
+            if (pendingCallback) {{
+                const callback = pendingCallback;
+                pendingCallback = null;
+                clearTimeout(pendingTimer);
+                callback(payload);
+            }} else {{
+                pendingResult = payload;
+            }}
+        }}
+        
+        let pendingTimer = null;
+        
+        window.waitForResult = function(callback, maxMs) {{
+            if (pendingResult) {{
+                const payload = pendingResult;
+                pendingResult = null;
+                callback(payload);
+                return;
+            }}
+            pendingCallback = callback;
+            // Answer before WebDriver's script timeout so a callback is never left stale
+            pendingTimer = setTimeout(function() {{
+                if (pendingCallback === callback) {{
+                    pendingCallback = null;
+                    callback({{timeout: true}});
+                }}
+            }}, maxMs);
+        }};
+        
+        window.resetResult = function() {{
+            pendingResult = null;
+            gotResult = false;
+            document.getElementById('output').innerHTML = '';
+        }};
+        
+        function handleRecognized(resultText) {{
+            console.log("Recognized:", resultText);
+            gotResult = true;
+            
+            const output = document.getElementById('output');
+            output.innerHTML = '<strong>Recognized:</strong> ' + resultText;
+            
+            document.getElementById('status').innerHTML = '✅ Speech recognized!';
+            document.getElementById('status').className = 'status';
+            deliver({{text: resultText}});
+        }}
         
         // Initialize speech recognition
         function initSpeechRecognition() {{
@@ -152,14 +323,7 @@ class SpeechRecognitionEngine:
             }};
 
             recognition.onresult = function(event) {{
-                const resultText = event.results[0][0].transcript;
-                console.log("Recognized:", resultText);
-                
-                const output = document.getElementById('output');
-                output.innerHTML = '<strong>Recognized:</strong> ' + resultText;
-                
-                document.getElementById('status').innerHTML = '✅ Speech recognized!';
-                document.getElementById('status').className = 'status';
+                handleRecognized(event.results[0][0].transcript);
             }};
 
             recognition.onerror = function(event) {{
@@ -173,6 +337,9 @@ class SpeechRecognitionEngine:
                 isListening = false;
                 document.getElementById('status').innerHTML = '⏹️ Ready to listen';
                 document.getElementById('status').className = 'status';
+                if (!gotResult) {{
+                    deliver({{text: null}});
+                }}
             }};
         }}
 
@@ -240,6 +407,55 @@ class SpeechRecognitionEngine:
             logger.error(f"Translation error: {e}")
             return text
     
+    def _await_pushed_result(self, timeout):
+        """Block in execute_async_script until the page pushes a result.
+
+        Waits in short slices so stop_listening() (which can only reach the
+        driver between commands) takes effect quickly; a result that lands
+        between slices is held by the page and returned by the next one.
+        """
+        deadline = time.time() + timeout
+        while self.is_listening:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None
+            wait_ms = int(1000 * min(PUSH_WAIT_SLICE, remaining))
+            self.driver.set_script_timeout(wait_ms / 1000 + 5)
+            payload = self.driver.execute_async_script(
+                "window.waitForResult(arguments[arguments.length - 1], arguments[0]);", wait_ms
+            ) or {}
+            if payload.get("timeout"):
+                continue
+            self.last_result_at = payload.get("at")
+            return payload.get("text")
+        return None
+    
+    def _poll_for_result(self, timeout):
+        """Legacy capture: read the #output element every POLL_INTERVAL seconds"""
+        start_time = time.time()
+        while self.is_listening and (time.time() - start_time) < timeout:
+            try:
+                output_element = self.driver.find_element(By.ID, "output")
+                current_text = output_element.text.strip()
+                
+                # Remove "Recognized:" prefix if present
+                if current_text.startswith("Recognized:"):
+                    current_text = current_text.replace("Recognized:", "").strip()
+                
+                if current_text:
+                    self.last_result_at = None
+                    return current_text
+            except Exception as e:
+                logger.debug(f"Waiting for speech: {e}")
+            time.sleep(POLL_INTERVAL)
+        return None
+    
+    def wait_for_result(self, timeout, mode=None):
+        """Raw transcript of the current listening session, or None"""
+        if (mode or self.capture_mode) == "poll":
+            return self._poll_for_result(timeout)
+        return self._await_pushed_result(timeout)
+    
     def SpeechRecognition(self, timeout=15):
         """Main speech recognition function"""
         try:
@@ -252,48 +468,31 @@ class SpeechRecognitionEngine:
             logger.info("Starting speech recognition...")
             print("🎤 Listening... Speak now!")
             
-            # Click start button
+            # Forget the previous session's result, then click start button
+            self.driver.execute_script("window.resetResult();")
             start_button = WebDriverWait(self.driver, 10).until(
                 EC.element_to_be_clickable((By.ID, "start"))
             )
             start_button.click()
             
-            start_time = time.time()
-            last_text = ""
+            current_text = self.wait_for_result(timeout)
             
-            while self.is_listening and (time.time() - start_time) < timeout:
-                try:
-                    # Get recognized text
-                    output_element = self.driver.find_element(By.ID, "output")
-                    current_text = output_element.text.strip()
-                    
-                    # Remove "Recognized:" prefix if present
-                    if current_text.startswith("Recognized:"):
-                        current_text = current_text.replace("Recognized:", "").strip()
-                    
-                    if current_text and current_text != last_text:
-                        logger.info(f"Speech recognized: {current_text}")
-                        print(f"✅ Recognized: {current_text}")
-                        
-                        # Process the text
-                        if self.input_language.lower().startswith("en"):
-                            final_text = self.QueryModifier(current_text)
-                        else:
-                            self.SetAssistantStatus("Translating...")
-                            final_text = self.QueryModifier(
-                                self.UniversalTranslator(current_text)
-                            )
-                        
-                        self.SetAssistantStatus("Processing...")
-                        self.is_listening = False
-                        return final_text
-                    
-                    last_text = current_text
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    logger.debug(f"Waiting for speech: {e}")
-                    time.sleep(0.5)
+            if current_text:
+                logger.info(f"Speech recognized: {current_text}")
+                print(f"✅ Recognized: {current_text}")
+                
+                # Process the text
+                if self.input_language.lower().startswith("en"):
+                    final_text = self.QueryModifier(current_text)
+                else:
+                    self.SetAssistantStatus("Translating...")
+                    final_text = self.QueryModifier(
+                        self.UniversalTranslator(current_text)
+                    )
+                
+                self.SetAssistantStatus("Processing...")
+                self.is_listening = False
+                return final_text
             
             # Timeout or no speech detected
             if self.is_listening:
@@ -318,6 +517,16 @@ class SpeechRecognitionEngine:
         except:
             pass
     
+    def is_healthy(self):
+        """True when the browser responds and Voice.html is loaded"""
+        if not self.driver:
+            return False
+        try:
+            return self.driver.execute_script("return typeof window.waitForResult === 'function';") is True
+        except Exception as e:
+            logger.debug(f"Speech session health check failed: {e}")
+            return False
+    
     def cleanup(self):
         """Clean up resources"""
         try:
@@ -327,33 +536,203 @@ class SpeechRecognitionEngine:
         except Exception as e:
             logger.warning(f"Cleanup error: {e}")
 
+class SpeechSessionPool:
+    """Bounded pool of recognition sessions, one Chrome instance each.
+
+    ``checkout()`` hands out an idle session, starts a new one while fewer
+    than ``size`` exist, or waits up to ``timeout`` for one to be checked
+    back in. Sessions are health-checked on checkout and replaced when the
+    browser has died, and recycled after ``max_uses`` recognitions.
+    """
+
+    def __init__(self, size=SPEECH_POOL_SIZE, max_uses=SPEECH_SESSION_MAX_USES, factory=None):
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.factory = factory or SpeechRecognitionEngine
+        # Last returned first, so the warmest browser is reused
+        self._idle = queue.LifoQueue()
+        self._in_use = set()
+        self._created = 0
+        self._warming = 0
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=200)
+        self._stats = {"checkouts": 0, "timeouts": 0, "started": 0, "recycled": 0, "unhealthy": 0}
+
+    def _start_session(self):
+        try:
+            engine = self.factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+        with self._lock:
+            self._stats["started"] += 1
+        return engine
+
+    def _discard(self, engine, reason):
+        engine.cleanup()
+        with self._lock:
+            self._created -= 1
+            self._stats[reason] += 1
+
+    def checkout(self, timeout=SPEECH_CHECKOUT_TIMEOUT):
+        """Get a healthy session, waiting for one if the pool is exhausted"""
+        started = time.perf_counter()
+        deadline = started + timeout
+        while True:
+            try:
+                engine = self._idle.get_nowait()
+            except queue.Empty:
+                engine = None
+                with self._lock:
+                    # A session being pre-warmed will be ready sooner than a new one
+                    can_start = self._created < self.size and not self._warming
+                    if can_start:
+                        self._created += 1
+                if can_start:
+                    engine = self._start_session()
+                else:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        with self._lock:
+                            self._stats["timeouts"] += 1
+                        raise TimeoutError(f"No speech session free after {timeout:g}s")
+                    # Short waits so a failed pre-warm or a recycled session frees a slot quickly
+                    try:
+                        engine = self._idle.get(timeout=min(0.25, remaining))
+                    except queue.Empty:
+                        continue
+
+            if not engine.is_healthy():
+                logger.warning("Speech session unresponsive, replacing it")
+                self._discard(engine, "unhealthy")
+                continue
+
+            with self._lock:
+                self._in_use.add(engine)
+                self._stats["checkouts"] += 1
+                self._waits.append(time.perf_counter() - started)
+            return engine
+
+    def checkin(self, engine):
+        """Return a session; it is closed instead once it reached max_uses"""
+        engine.is_listening = False
+        engine.uses += 1
+        with self._lock:
+            self._in_use.discard(engine)
+        if self.max_uses and engine.uses >= self.max_uses:
+            logger.info(f"Recycling speech session after {engine.uses} uses")
+            self._discard(engine, "recycled")
+        else:
+            self._idle.put(engine)
+
+    @contextmanager
+    def session(self, timeout=SPEECH_CHECKOUT_TIMEOUT):
+        """``with pool.session() as engine: ...`` checks the session back in afterwards"""
+        engine = self.checkout(timeout)
+        try:
+            yield engine
+        finally:
+            self.checkin(engine)
+
+    def prewarm(self, count=1):
+        """Start up to count sessions ahead of the first checkout"""
+        for _ in range(count):
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+                self._warming += 1
+            try:
+                self._idle.put(self._start_session())
+            finally:
+                with self._lock:
+                    self._warming -= 1
+
+    def stop_all(self):
+        """Stop every recognition currently in progress"""
+        with self._lock:
+            engines = list(self._in_use)
+        for engine in engines:
+            engine.stop_listening()
+
+    def close(self):
+        """Quit every idle browser; sessions in use are closed when checked in"""
+        self.max_uses = 1
+        while True:
+            try:
+                engine = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(engine, "recycled")
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._waits)
+            stats = dict(self._stats)
+            stats.update(size=self.size, sessions=self._created, in_use=len(self._in_use))
+
+        def percentile(p):
+            if not waits:
+                return 0.0
+            return waits[min(len(waits) - 1, int(p * len(waits)))]
+
+        stats["idle"] = self._idle.qsize()
+        stats["wait_avg_ms"] = round(1000 * sum(waits) / len(waits), 1) if waits else 0.0
+        stats["wait_p95_ms"] = round(1000 * percentile(0.95), 1)
+        stats["wait_max_ms"] = round(1000 * waits[-1], 1) if waits else 0.0
+        return stats
+
+
 # Global instance
-_speech_engine = None
+_speech_pool = None
+_speech_pool_lock = threading.Lock()
 
-def get_speech_engine():
-    """Get or create speech engine instance"""
-    global _speech_engine
-    if _speech_engine is None:
-        _speech_engine = SpeechRecognitionEngine()
-    return _speech_engine
+def get_speech_pool():
+    """Get or create the shared pool of speech sessions"""
+    global _speech_pool
+    with _speech_pool_lock:
+        if _speech_pool is None:
+            _speech_pool = SpeechSessionPool()
+    return _speech_pool
 
-def SpeechRecognition():
-    """Main function for speech recognition"""
-    engine = get_speech_engine()
-    return engine.SpeechRecognition()
+def prewarm_speech_engine():
+    """Start Chrome and load Voice.html in the background before the first recognition"""
+    def warm():
+        try:
+            get_speech_pool().prewarm(1)
+        except Exception as e:
+            logger.warning(f"Speech engine pre-warm failed, will retry on first use: {e}")
+    
+    thread = threading.Thread(target=warm, name="speech-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+def SpeechRecognition(timeout=15):
+    """Main function for speech recognition; safe to call from several threads"""
+    try:
+        with get_speech_pool().session() as engine:
+            return engine.SpeechRecognition(timeout)
+    except Exception as e:
+        logger.error(f"No speech session available: {e}")
+        return "No speech detected."
 
 def stop_speech_recognition():
-    """Stop speech recognition"""
-    global _speech_engine
-    if _speech_engine:
-        _speech_engine.stop_listening()
+    """Stop all speech recognitions in progress"""
+    if _speech_pool:
+        _speech_pool.stop_all()
+
+def get_speech_pool_stats():
+    """Session pool counters and checkout wait times"""
+    return get_speech_pool().stats()
 
 def cleanup_speech_engine():
-    """Cleanup speech engine"""
-    global _speech_engine
-    if _speech_engine:
-        _speech_engine.cleanup()
-        _speech_engine = None
+    """Close every speech session"""
+    global _speech_pool
+    with _speech_pool_lock:
+        if _speech_pool:
+            _speech_pool.close()
+            _speech_pool = None
 
 if __name__ == "__main__":
     print("🎤 Speech Recognition Test Mode")
@@ -0,0 +1,202 @@
+import re
+import json
+import time
+import queue
+import logging
+import threading
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# A sentence ends at ., !, ? or the Devanagari danda followed by whitespace, or at a newline
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?।])\s+|\n+')
+
+
+class SentenceSplitter:
+    """Incrementally cut a token stream into speakable sentences.
+
+    Fragments shorter than ``min_chars`` (e.g. "10 p.m.") are held back and
+    joined with the next sentence so each synthesized clip sounds natural.
+    """
+
+    def __init__(self, min_chars=24):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text):
+        """Add streamed text and return the sentences it completed"""
+        self.buffer += text
+        sentences = []
+        start = 0
+        pending = ""
+        for match in SENTENCE_BOUNDARY.finditer(self.buffer):
+            piece = pending + self.buffer[start:match.start()]
+            start = match.end()
+            if len(piece.strip()) < self.min_chars and "\n" not in match.group(0):
+                pending = piece + " "
+                continue
+            pending = ""
+            if piece.strip():
+                sentences.append(piece.strip())
+        self.buffer = pending + self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+
+def iter_sse_text(response):
+    """Yield content deltas from an OpenAI-style server-sent-events response"""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            break
+        try:
+            chunk = json.loads(payload)
+        except ValueError:
+            logger.debug(f"Skipping malformed stream chunk: {payload[:80]}")
+            continue
+        choices = chunk.get("choices") or []
+        if not choices:
+            continue
+        choice = choices[0]
+        text = (choice.get("delta") or {}).get("content") or choice.get("text") or ""
+        if text:
+            yield text
+
+
+def edge_tts_synthesizer():
+    """Synthesize one sentence to in-memory mp3 with edge_tts, reusing the TTS audio cache"""
+    from module.text import AssistantVoice, SpeechRate, audio_cache, SynthesizeSpeech, RememberSpeech
+    from module.audio import get_audio_service
+
+    audio = get_audio_service()
+
+    def synthesize(text):
+        cached_path = audio_cache.get(text, AssistantVoice, SpeechRate)
+        if cached_path:
+            return cached_path
+        clip = audio.run(SynthesizeSpeech(text))
+        RememberSpeech(text, clip)
+        return clip
+
+    return synthesize
+
+
+class AudioServicePlayer:
+    """Queue clips on the shared audio service's speech channel back to back"""
+
+    def __init__(self):
+        from module.audio import get_audio_service
+        self.audio = get_audio_service()
+        self.last_item = None
+
+    def play(self, clip):
+        self.last_item = self.audio.play_speech(clip)
+
+    def wait(self, func=lambda r=None: True):
+        if self.last_item is not None and not self.last_item.wait(func):
+            self.audio.stop_speech()
+
+
+class StreamingSpeaker:
+    """Speak a text stream sentence by sentence while it is still arriving.
+
+    Three stages run concurrently: the caller's thread splits incoming text
+    into sentences, a synthesis thread turns each sentence into a clip, and
+    a playback thread queues clips on the player back to back. ``synthesize``
+    is ``text -> clip`` and ``player`` exposes ``play(clip)`` and ``wait()``;
+    they default to edge_tts and the shared audio service.
+    """
+
+    def __init__(self, synthesize=None, player=None, clean=None, on_sentence=None):
+        self.synthesize = synthesize
+        self.player = player
+        self.clean = clean or (lambda text: text)
+        self.on_sentence = on_sentence
+        self.metrics = {}
+
+    def _synthesis_worker(self, sentences, clips):
+        try:
+            while True:
+                sentence = sentences.get()
+                if sentence is None:
+                    break
+                try:
+                    clips.put(self.synthesize(sentence))
+                except Exception as e:
+                    logger.error(f"Sentence synthesis failed: {e}")
+        finally:
+            clips.put(None)
+
+    def _playback_worker(self, clips, started):
+        while True:
+            clip = clips.get()
+            if clip is None:
+                break
+            try:
+                self.player.play(clip)
+                if "time_to_first_audio" not in self.metrics:
+                    self.metrics["time_to_first_audio"] = time.perf_counter() - started
+            except Exception as e:
+                logger.error(f"Clip playback failed: {e}")
+
+    def speak(self, chunks, started=None):
+        """Consume text chunks, speaking each sentence as soon as it completes.
+
+        Returns the full concatenated text once playback has finished.
+        """
+        if self.synthesize is None:
+            self.synthesize = edge_tts_synthesizer()
+        if self.player is None:
+            self.player = AudioServicePlayer()
+
+        started = started or time.perf_counter()
+        self.metrics = {}
+        sentences = queue.Queue()
+        clips = queue.Queue()
+        splitter = SentenceSplitter()
+
+        synth_thread = threading.Thread(target=self._synthesis_worker, args=(sentences, clips), daemon=True)
+        play_thread = threading.Thread(target=self._playback_worker, args=(clips, started), daemon=True)
+        synth_thread.start()
+        play_thread.start()
+
+        def submit(sentence):
+            cleaned = self.clean(sentence)
+            if not cleaned:
+                return
+            if "time_to_first_sentence" not in self.metrics:
+                self.metrics["time_to_first_sentence"] = time.perf_counter() - started
+            if self.on_sentence:
+                self.on_sentence(cleaned)
+            sentences.put(cleaned)
+            self.metrics["sentences"] = self.metrics.get("sentences", 0) + 1
+
+        parts = []
+        try:
+            for chunk in chunks:
+                if "time_to_first_token" not in self.metrics:
+                    self.metrics["time_to_first_token"] = time.perf_counter() - started
+                parts.append(chunk)
+                for sentence in splitter.feed(chunk):
+                    submit(sentence)
+            for sentence in splitter.flush():
+                submit(sentence)
+        finally:
+            sentences.put(None)
+            synth_thread.join()
+            play_thread.join()
+
+        self.player.wait()
+        self.metrics["total"] = time.perf_counter() - started
+        return "".join(parts)
@@ -1,9 +1,10 @@
-import pygame
 import random
-import asyncio
 import edge_tts
 import os
+import threading
 from dotenv import dotenv_values
+from module.audiocache import AudioCache
+from module.audio import get_audio_service
 
 # Load environment variables
 env_vars = dotenv_values(".env")
@@ -12,38 +13,115 @@ AssistantVoice = env_vars.get("AssistantVoice")
 if not AssistantVoice:
     raise ValueError("❌ Error: AssistantVoice not found in .env file.")
 
+SpeechRate = '+13%'
+
+# "memory" synthesizes and plays without touching disk; "file" uses data/speech.mp3
+SpeechMode = (env_vars.get("TTS_MODE") or "memory").lower()
+
 # Ensure data directory exists
 os.makedirs("data", exist_ok=True)
 
-async def TextToSpeech(text) -> None:
+# Synthesized phrases, keyed by hash(text, voice, rate)
+audio_cache = AudioCache(
+    env_vars.get("TTS_CACHE_DIR") or os.path.join("data", "tts_cache"),
+    max_bytes=int(env_vars.get("TTS_CACHE_MAX_MB") or 50) * 1024 * 1024
+)
+
+# Canned continuations spoken by TesToSpeech after a long answer is cut short
+ContinuationResponses = [
+    "Ma'am, the remaining part of the result, along with a detailed explanation and relevant insights, has been printed on the chat screen. Please check it out for a complete understanding.",
+    "Ma'am, the continuation of the answer, including key points, examples, and additional explanations, is now visible on the chat screen. Kindly take a look to get a clear perspective.",
+    "You can find the rest of the text, along with further elaboration on the topic, important context, and supporting details, displayed on the chat screen, ma'am.",
+    "The remaining part of the text, along with essential clarifications and additional insights to enhance comprehension, has been posted on the chat screen, ma'am.",
+    "Ma'am, I have shared the next portion of the answer on the chat screen, ensuring that it includes relevant details, examples, and necessary explanations for better understanding.",
+    "The rest of the answer, with important points, clarifications, and a structured breakdown of the topic, is now available on the chat screen, ma'am.",
+    "Ma'am, please check the chat screen for the complete response, which includes in-depth explanations, supporting details, and additional context to provide a thorough understanding.",
+    "You'll find the detailed continuation of the answer, enriched with key insights, structured information, and relevant examples, on the chat screen, ma'am.",
+    "The next section of the text, which contains a deeper discussion on the topic, additional references, and useful explanations, is now available on the chat screen, ma'am."
+]
+
+# Fixed phrases spoken on the emergency path; pre-warmed at startup
+SOSActivatedPhrase = "SOS activated. Notifying emergency contacts."
+SOSCancelledPhrase = "SOS activation cancelled."
+SOSLocationPhrase = "Sending your location to your emergency contacts."
+VoiceSOSPhrase = "Voice SOS is listening. Say help me to raise an alert."
+
+EmergencyPhrases = [
+    SOSActivatedPhrase,
+    SOSCancelledPhrase,
+    SOSLocationPhrase,
+    VoiceSOSPhrase,
+]
+
+async def SynthesizeSpeech(text) -> bytes:
+    """Synthesize text straight into memory by gathering edge_tts audio chunks"""
+    communication = edge_tts.Communicate(text, AssistantVoice, rate=SpeechRate)
+    audio = bytearray()
+    async for chunk in communication.stream():
+        if chunk["type"] == "audio":
+            audio.extend(chunk["data"])
+    return bytes(audio)
+
+async def TextToSpeech(text):
+    """Return a playable clip for text: the cached file path, or fresh mp3 bytes"""
+    cached_path = audio_cache.get(text, AssistantVoice, SpeechRate)
+    if cached_path:
+        return cached_path
+    
+    if SpeechMode == "memory":
+        return await SynthesizeSpeech(text)
+    
+    # Legacy file mode: a shared scratch file, not safe for concurrent calls
     file_path = "data/speech.mp3"
     
     if os.path.exists(file_path):
         os.remove(file_path)
         
-    communication = edge_tts.Communicate(text, AssistantVoice,  rate='+13%') 
+    communication = edge_tts.Communicate(text, AssistantVoice,  rate=SpeechRate) 
 
     await communication.save(file_path)
+    
+    try:
+        return audio_cache.put_file(text, AssistantVoice, SpeechRate, file_path)
+    except Exception as e:
+        print(f"⚠️ Could not cache speech: {e}")
+        return file_path
 
-def TTS(Text, func=lambda r=None: True):
+def RememberSpeech(text, clip):
+    """Store freshly synthesized bytes in the audio cache (after playback has started)"""
+    if not isinstance(clip, bytes) or not clip:
+        return
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(TextToSpeech(Text))
-        
-        pygame.mixer.init()
+        audio_cache.put_bytes(text, AssistantVoice, SpeechRate, clip)
+    except Exception as e:
+        print(f"⚠️ Could not cache speech: {e}")
+
+def get_tts_cache_stats():
+    """Hit rate and bytes stored in the TTS audio cache"""
+    return audio_cache.stats()
+
+def SignalSpeechDone(func):
+    """Tell the caller's callback that speaking has finished"""
+    try:
+        func(False)
+    except Exception as e:
+        print(f"❌ Error in speech callback: {e}")
+
+def TTS(Text, func=lambda r=None: True, finish=True):
+    """Speak Text; func(False) signals the end unless ``finish`` is off (more speech follows)"""
+    try:
+        audio = get_audio_service()
+        # Pre-warmed phrases are already decoded in memory
+        clip = audio.get_preloaded(Text) or audio.run(TextToSpeech(Text))
         
-        if not os.path.exists("data/speech.mp3"):
-            print("❌ Error: speech file not found.")
+        if not clip or (isinstance(clip, str) and not os.path.exists(clip)):
+            print("❌ Error: no speech audio produced.")
             return False
         
-        pygame.mixer.music.load("data/speech.mp3")
-        pygame.mixer.music.play()
-        
-        while pygame.mixer.music.get_busy():
-            if func() is False:
-                break
-            pygame.time.Clock().tick(10)
+        item = audio.play_speech(clip)
+        RememberSpeech(Text, clip)
+        if not item.wait(func):
+            audio.stop_speech()
         
         return True
     
@@ -51,34 +129,30 @@ def TTS(Text, func=lambda r=None: True):
         print("❌ Error in TTS:", e)
     
     finally:
-        try:
-            func(False)
-            if pygame.mixer.get_init():
-                pygame.mixer.music.stop()
-                pygame.mixer.quit()
-        except Exception as e:
-            print(f"❌ Error in finally block: {e}")
+        if finish:
+            SignalSpeechDone(func)
+
+def SpeakInBackground(Text):
+    """Speak without blocking the caller (used for emergency confirmations)"""
+    thread = threading.Thread(target=TTS, args=(Text,), daemon=True)
+    thread.start()
+    return thread
 
 def TesToSpeech(Text, func=lambda r=None: True):
     Data = str(Text).split(".")
    
    
-    responses = [
-    "Ma'am, the remaining part of the result, along with a detailed explanation and relevant insights, has been printed on the chat screen. Please check it out for a complete understanding.",
-    "Ma'am, the continuation of the answer, including key points, examples, and additional explanations, is now visible on the chat screen. Kindly take a look to get a clear perspective.",
-    "You can find the rest of the text, along with further elaboration on the topic, important context, and supporting details, displayed on the chat screen, ma'am.",
-    "The remaining part of the text, along with essential clarifications and additional insights to enhance comprehension, has been posted on the chat screen, ma'am.",
-    "Ma'am, I have shared the next portion of the answer on the chat screen, ensuring that it includes relevant details, examples, and necessary explanations for better understanding.",
-    "The rest of the answer, with important points, clarifications, and a structured breakdown of the topic, is now available on the chat screen, ma'am.",
-    "Ma'am, please check the chat screen for the complete response, which includes in-depth explanations, supporting details, and additional context to provide a thorough understanding.",
-    "You'll find the detailed continuation of the answer, enriched with key insights, structured information, and relevant examples, on the chat screen, ma'am.",
-    "The next section of the text, which contains a deeper discussion on the topic, additional references, and useful explanations, is now available on the chat screen, ma'am."
-]
- 
+
     #  Added a default response to avoid errors.
     
     if len(Data) > 4 and len(Text) >= 250:
-        TTS("".join(Text.split(".")[0:2]) + "." + random.choice(responses), func)
+        # Speak the canned continuation separately so its audio is reused from the cache;
+        # the caller hears speech has finished only after it, not between the two
+        spoken = TTS("".join(Text.split(".")[0:2]) + ".", func, finish=False)
+        if spoken and func() is not False:
+            TTS(random.choice(ContinuationResponses), func)
+        else:
+            SignalSpeechDone(func)
     else:
         TTS(Text, func)
 
@@ -0,0 +1,180 @@
+import os
+import math
+import array
+import logging
+import threading
+
+try:
+    # C implementation (also what speech_recognition uses); pure Python fallback otherwise
+    import audioop
+except ImportError:
+    audioop = None
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Analysis frame length, milliseconds
+VAD_FRAME_MS = int(os.getenv("VAD_FRAME_MS", "30"))
+# A frame is speech when its RMS exceeds the noise floor by this factor...
+VAD_SPEECH_RATIO = float(os.getenv("VAD_SPEECH_RATIO", "2.5"))
+# ...and this absolute level (16-bit RMS), so a silent room never counts as speech
+VAD_MIN_ENERGY = float(os.getenv("VAD_MIN_ENERGY", "300"))
+# Speech needed in a segment before it is worth sending to a recognizer, milliseconds
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "240"))
+
+
+def frame_rms(frame, sample_width=2):
+    """Root-mean-square level of one frame of signed little-endian PCM, in 16-bit units"""
+    if audioop is not None:
+        if sample_width == 1:
+            # 8-bit PCM is unsigned
+            return float(audioop.rms(audioop.bias(frame, 1, -128), 1) << 8)
+        return audioop.rms(frame, sample_width) / (1 << (8 * (sample_width - 2)))
+    if sample_width == 1:
+        samples = [(b - 128) << 8 for b in frame]
+    else:
+        codes = {2: "h", 4: "i"}
+        usable = len(frame) - len(frame) % sample_width
+        shift = 8 * (sample_width - 2)
+        samples = [s >> shift for s in array.array(codes[sample_width], frame[:usable])]
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+class EnergyGate:
+    """Energy voice-activity gate with an adaptive noise floor.
+
+    Raw PCM is split into VAD_FRAME_MS frames. A frame counts as speech
+    when its RMS is VAD_SPEECH_RATIO times the running noise floor (and
+    above VAD_MIN_ENERGY); non-speech frames keep the floor tracking the
+    room. A segment is forwarded only when it holds at least
+    VAD_MIN_SPEECH_MS of speech, so silence, clicks and steady background
+    noise never reach the recognizer.
+
+    Overlapping windows of one stream pass their stream ``offset``: frames
+    then sit on a grid fixed to the stream, each is classified once and
+    its result reused by later windows, so the noise floor and the frame
+    counters advance once per frame of audio, not once per window.
+    """
+
+    def __init__(self, frame_ms=VAD_FRAME_MS, speech_ratio=VAD_SPEECH_RATIO,
+                 min_energy=VAD_MIN_ENERGY, min_speech_ms=VAD_MIN_SPEECH_MS):
+        self.frame_ms = frame_ms
+        self.speech_ratio = speech_ratio
+        self.min_energy = min_energy
+        self.min_speech_ms = min_speech_ms
+        self.noise_floor = None
+        # Stream frame index -> speech, for frames of windows passed with an offset
+        self._classified = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "frames_captured": 0,
+            "speech_frames": 0,
+            "segments_seen": 0,
+            "segments_forwarded": 0,
+            "recognizer_calls_avoided": 0,
+        }
+
+    def calibrate(self, raw, sample_rate, sample_width=2):
+        """Seed the noise floor from audio known to contain no speech (a new stream starts here)"""
+        self._classified.clear()
+        levels = [frame_rms(frame, sample_width) for frame in self.frames(raw, sample_rate, sample_width)]
+        if levels:
+            levels.sort()
+            self.noise_floor = levels[len(levels) // 2]
+            logger.debug(f"VAD noise floor calibrated at {self.noise_floor:.0f}")
+
+    def _frame_size(self, sample_rate, sample_width):
+        return max(1, sample_rate * self.frame_ms // 1000) * sample_width
+
+    def frames(self, raw, sample_rate, sample_width=2):
+        size = self._frame_size(sample_rate, sample_width)
+        for start in range(0, len(raw) - size + 1, size):
+            yield raw[start:start + size]
+
+    def _stream_frames(self, raw, offset, sample_rate, sample_width):
+        """(speech, end_ms) per whole stream frame in a window starting at stream ``offset``,
+        classifying only frames no earlier window has covered; returns (results, new_frames)"""
+        size = self._frame_size(sample_rate, sample_width)
+        first = -(-offset // size)
+        last = (offset + len(raw)) // size
+        if self._classified and first < min(self._classified):
+            # Offsets went back: a new stream
+            self._classified.clear()
+        for index in [i for i in self._classified if i < first]:
+            del self._classified[index]
+
+        results = []
+        new_frames = []
+        for index in range(first, last):
+            start = index * size - offset
+            if index not in self._classified:
+                self._classified[index] = self.is_speech(raw[start:start + size], sample_width)
+                new_frames.append(self._classified[index])
+            end_ms = (start + size) * 1000 // (sample_rate * sample_width)
+            results.append((self._classified[index], end_ms))
+        return results, new_frames
+
+    def is_speech(self, frame, sample_width=2):
+        """Classify one frame and update the noise floor from non-speech frames"""
+        level = frame_rms(frame, sample_width)
+        if self.noise_floor is None:
+            self.noise_floor = level
+            return False
+        speech = level >= self.min_energy and level >= self.noise_floor * self.speech_ratio
+        if not speech:
+            # Fast to follow the room down, slow to follow it up
+            alpha = 0.3 if level < self.noise_floor else 0.05
+            self.noise_floor += alpha * (level - self.noise_floor)
+        return speech
+
+    def gate(self, raw, sample_rate, sample_width=2, fresh_ms=None, offset=None):
+        """Decide whether a segment goes to the recognizer.
+
+        Returns ``(forward, speech_end_ms)`` where speech_end_ms is where the
+        last speech frame ends within the segment (None without speech).
+        With ``fresh_ms`` the segment is only forwarded when that speech
+        reaches into its final fresh_ms, i.e. it holds speech an earlier
+        overlapping segment has not already covered. ``offset`` is the
+        segment's byte position in the stream, for overlapping segments.
+        """
+        if offset is None:
+            results = []
+            for total, frame in enumerate(self.frames(raw, sample_rate, sample_width), 1):
+                results.append((self.is_speech(frame, sample_width), total * self.frame_ms))
+            new_frames = [speech for speech, _ in results]
+        else:
+            results, new_frames = self._stream_frames(raw, offset, sample_rate, sample_width)
+
+        speech_ends = [end_ms for speech, end_ms in results if speech]
+        speech_end_ms = speech_ends[-1] if speech_ends else None
+        forward = len(speech_ends) * self.frame_ms >= self.min_speech_ms
+        if forward and fresh_ms is not None:
+            duration_ms = len(raw) * 1000 // (sample_rate * sample_width)
+            forward = speech_end_ms > duration_ms - fresh_ms
+        with self._lock:
+            self._stats["frames_captured"] += len(new_frames)
+            self._stats["speech_frames"] += sum(new_frames)
+            self._stats["segments_seen"] += 1
+            if forward:
+                self._stats["segments_forwarded"] += 1
+            else:
+                self._stats["recognizer_calls_avoided"] += 1
+        return forward, speech_end_ms
+
+    def contains_speech(self, raw, sample_rate, sample_width=2):
+        """True when a segment should be sent to the recognizer"""
+        return self.gate(raw, sample_rate, sample_width)[0]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["forward_rate"] = (stats["segments_forwarded"] / stats["segments_seen"]
+                                 if stats["segments_seen"] else 0.0)
+        stats["noise_floor"] = round(self.noise_floor or 0.0, 1)
+        return stats
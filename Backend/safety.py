@@ -1,5 +1,11 @@
 import time
 import os
+import sys
+import csv
+import json
+import itertools
+import argparse
+import threading
 import requests
 from dotenv import load_dotenv
 import asyncio
@@ -7,6 +13,12 @@ import pygame
 import speech_recognition as sr
 from module.text import TTS  # Import Text-to-Speech function
 from module.speech import SpeechRecognition as STT  # Import Speech-to-Text function
+from module.cache import get_cache
+from module.querykey import make_query_key
+from module.httpclient import get_http_client
+from module.streaming import iter_sse_text
+from module.coalesce import SingleFlight
+from module.risk import assess_location_risk
 import re
 
 # Load API token
@@ -14,19 +26,32 @@ load_dotenv()
 
 API_TOKEN = os.getenv("TOGETHER_API_KEY")
 API_URL = "https://api.together.xyz/v1/chat/completions"
+API_TIMEOUT = float(os.getenv("TOGETHER_API_TIMEOUT", "30"))
 
-# Store previous results to avoid redundant calls
-previous_queries = {}
+# Store previous results to avoid redundant calls (LRU + TTL, persisted to disk)
+safety_cache = get_cache(
+    "safety",
+    max_entries=int(os.getenv("SAFETY_CACHE_MAX_ENTRIES", "256")),
+    ttl=int(os.getenv("SAFETY_CACHE_TTL", str(6 * 3600))),
+    db_path=os.getenv("SAFETY_CACHE_DB") or None
+)
+
+# Concurrent identical queries share a single LLM call
+inflight_queries = SingleFlight()
+
+# Maximum LLM calls in flight for batch assessments
+BATCH_CONCURRENCY = int(os.getenv("SAFETY_BATCH_CONCURRENCY", "8"))
 
 # Log file for history
 LOG_FILE = "safety_app_log.txt"
+_log_lock = threading.Lock()
 
 def show_welcome_message():
     print("\n Hey Girls! I'm your Safety Guard 🤖 - Any Time, Any Where! ")
     print(" Use me like this: Enter your location and time, and I'll tell you if it's safe! 🚀\n")
 
 def log_query(location, time, response):
-    with open(LOG_FILE, "a") as log:
+    with _log_lock, open(LOG_FILE, "a") as log:
         log.write(f"Location: {location}, Time: {time}\nResponse: {response}\n{'-'*40}\n")
 
 def get_google_maps_link(location):
@@ -41,12 +66,32 @@ def clean_response_for_tts(response):
     response = re.sub(r'\s+', ' ', response)  # Remove extra spaces
     return response.strip()
 
-def get_safety_status(location, time):
-    query_key = f"{location.lower()}_{time.lower()}"
-    if query_key in previous_queries:
-        print(f"Previously checked: '{location}' at {time}. No change in status.\n")
-        return previous_queries[query_key]
-    
+def get_local_risk(location, time):
+    """Risk level from local incident data in milliseconds, or None (see module.risk)"""
+    try:
+        return assess_location_risk(location, time)
+    except Exception as e:
+        print(f" Local risk scoring failed: {e}\n")
+        return None
+
+def describe_local_risk(risk):
+    """One line summary of a local risk assessment"""
+    categories = ", ".join(name for name, _ in risk["top_categories"])
+    return (f"{risk['label']} ({risk['incidents_nearby']} incidents reported nearby"
+            f"{f', mostly {categories}' if categories else ''})")
+
+def build_safety_request(location, time, stream=False, risk=None):
+    """Headers and payload for the Together completion call
+
+    With a local ``risk`` assessment the model is given the risk level and
+    only writes the insights and tips around it.
+    """
+    risk_note = ""
+    if risk:
+        risk_note = f"""
+    **Risk Level (local incident data se pehle hi calculate ho chuka hai):** {describe_local_risk(risk)}
+    Yahi Risk Level likhiye, ise badaliye mat. Aapko sirf Incident Insights, Precaution Tips aur Alternative Routes likhne hain.
+"""
     # Advanced professional prompt for LLM
     prompt = f"""
     **Advanced Travel Safety Assessment Assistant**
@@ -73,7 +118,7 @@ def get_safety_status(location, time):
     **Precautions:** Akeli mat nikliye, trusted vehicle ka use kariye, aur well-lit (roshan) areas mein hi rahiyega.
     **Suggestion:** Alipore ya Park Street jaise jagah better hain, wahan security aur camera coverage zyada hai.
      Maps: https://www.google.com/maps/search/Kidderpore+Kolkata
-
+{risk_note}
     **Ab is jagah ka safety assessment dein:**
     -  **Location:** {location}
     -  **Time:** {time}
@@ -95,30 +140,148 @@ def get_safety_status(location, time):
         "repetition_penalty": 1.1,
         "stop": ["</s>"]
     }
+    if stream:
+        data["stream"] = True
+    return headers, data
+
+def fetch_safety_status(location, time, verbose=False):
+    """Safety assessment for one query; raises instead of returning None on failure."""
+    query_key = make_query_key(location, time)
+    cached_response = safety_cache.get(query_key)
+    if cached_response is not None:
+        if verbose:
+            print(f"Previously checked: '{location}' at {time}. No change in status.\n")
+        return cached_response
+    
+    return inflight_queries.do(query_key, _request_safety_status, location, time, query_key)
 
-    try:
-        response = requests.post(API_URL, headers=headers, json=data)
-        response.raise_for_status()
-        result = response.json()["choices"][0]["message"]["content"]
+def _request_safety_status(location, time, query_key):
+    """Call the LLM for a query that missed the cache, then cache and log the answer"""
+    # A call that finished just before this one took the flight slot (or another
+    # worker process) may already have stored the answer
+    cached_response = safety_cache.get(query_key)
+    if cached_response is not None:
+        return cached_response
 
-        # Add Google Maps link
-        maps_link = get_google_maps_link(location)
-        final_response = f"{result}\nMaps: {maps_link}"
+    headers, data = build_safety_request(location, time, risk=get_local_risk(location, time))
 
-        # Clean the response before passing it to TTS
-        cleaned_response = clean_response_for_tts(final_response)
+    response = get_http_client().post(API_URL, headers=headers, json=data,
+                                      timeout=API_TIMEOUT, deadline=2 * API_TIMEOUT)
+    response.raise_for_status()
+    result = response.json()["choices"][0]["message"]["content"]
 
-        # Store result for future reference and log it
-        previous_queries[query_key] = cleaned_response
-        log_query(location, time, cleaned_response)
-        return cleaned_response
+    # Add Google Maps link
+    maps_link = get_google_maps_link(location)
+    final_response = f"{result}\nMaps: {maps_link}"
 
+    # Clean the response before passing it to TTS
+    cleaned_response = clean_response_for_tts(final_response)
+
+    # Store result for future reference and log it
+    safety_cache.set(query_key, cleaned_response)
+    log_query(location, time, cleaned_response)
+    return cleaned_response
+
+def get_safety_status(location, time):
+    try:
+        return fetch_safety_status(location, time, verbose=True)
     except requests.exceptions.HTTPError as e:
         print(f" HTTP Error: {e}\n")
     except Exception as e:
         print(f" Failed to get a response. Error: {e}\n")
     return None
 
+async def iter_safety_status_many(queries, concurrency=BATCH_CONCURRENCY):
+    """Assess many (location, time) queries concurrently, yielding results as they finish.
+
+    Identical queries (same canonical key) inside the batch share one
+    assessment. A failing query yields a result with ``ok`` False and the
+    error message; it never affects the others. A query given as an
+    exception (an unreadable input row) yields its error at once. Each
+    result is a dict with index, location, time, key, ok, response, error
+    and deduplicated.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    groups = {}
+    for index, query in enumerate(queries):
+        if isinstance(query, Exception):
+            yield {"index": index, "location": None, "time": None, "key": None, "ok": False,
+                   "response": None, "error": str(query), "deduplicated": False}
+            continue
+        location, time_of_travel = query
+        key = make_query_key(location, time_of_travel)
+        groups.setdefault(key, []).append((index, location, time_of_travel))
+
+    async def assess(key, members):
+        _, location, time_of_travel = members[0]
+        async with semaphore:
+            try:
+                response = await asyncio.to_thread(fetch_safety_status, location, time_of_travel)
+                return key, members, response, None
+            except Exception as e:
+                return key, members, None, f"{type(e).__name__}: {e}"
+
+    tasks = [asyncio.ensure_future(assess(key, members)) for key, members in groups.items()]
+    for finished in asyncio.as_completed(tasks):
+        key, members, response, error = await finished
+        for position, (index, location, time_of_travel) in enumerate(members):
+            yield {
+                "index": index,
+                "location": location,
+                "time": time_of_travel,
+                "key": key,
+                "ok": error is None,
+                "response": response,
+                "error": error,
+                "deduplicated": position > 0,
+            }
+
+async def get_safety_status_many(queries, concurrency=BATCH_CONCURRENCY):
+    """Assess a batch of (location, time) queries; results come back in input order."""
+    results = [result async for result in iter_safety_status_many(queries, concurrency)]
+    return sorted(results, key=lambda result: result["index"])
+
+def stream_safety_status(location, time):
+    """Yield the safety assessment as it is generated.
+
+    Cached answers are yielded in one piece. Otherwise the completion is
+    streamed and the full, cleaned response is cached and logged once the
+    stream ends, exactly like get_safety_status.
+    """
+    query_key = make_query_key(location, time)
+    cached_response = safety_cache.get(query_key)
+    if cached_response is not None:
+        print(f"Previously checked: '{location}' at {time}. No change in status.\n")
+        yield cached_response
+        return
+
+    headers, data = build_safety_request(location, time, stream=True, risk=get_local_risk(location, time))
+    response = get_http_client().post(API_URL, headers=headers, json=data, stream=True,
+                                      timeout=API_TIMEOUT, deadline=2 * API_TIMEOUT)
+    try:
+        response.raise_for_status()
+        parts = []
+        for text in iter_sse_text(response):
+            parts.append(text)
+            yield text
+
+        maps_link = get_google_maps_link(location)
+        yield f"\nMaps: {maps_link}"
+
+        cleaned_response = clean_response_for_tts(f"{''.join(parts)}\nMaps: {maps_link}")
+        safety_cache.set(query_key, cleaned_response)
+        log_query(location, time, cleaned_response)
+    finally:
+        response.close()
+
+def get_cache_stats():
+    """Hit/miss/eviction counters for the safety response cache"""
+    return safety_cache.stats()
+
+def get_coalescing_stats():
+    """How many safety lookups shared an in-flight LLM call"""
+    return inflight_queries.stats()
+
 def recognize_speech():
     """Convert spoken words into text using Speech Recognition."""
     try:
@@ -130,8 +293,96 @@ def recognize_speech():
         print(f"Speech Recognition Error: {e}")
         return None
 
+def _batch_query(record, row):
+    """(location, time) of one batch record, or a ValueError describing why it is unusable"""
+    if not isinstance(record, dict):
+        return ValueError(f"row {row}: expected an object with 'location' and 'time'")
+    location = str(record.get("location") or "").strip()
+    time_of_travel = str(record.get("time") or "").strip()
+    if not location or not time_of_travel:
+        return ValueError(f"row {row}: both 'location' and 'time' are required")
+    return location, time_of_travel
+
+def _parse_jsonl_row(line, row):
+    try:
+        return _batch_query(json.loads(line), row)
+    except json.JSONDecodeError as e:
+        return ValueError(f"row {row}: invalid JSON ({e.msg} at column {e.colno})")
+
+def _read_csv_queries(lines, first_line):
+    """Batch queries of a CSV whose header is ``first_line`` of the file"""
+    reader = csv.DictReader(lines)
+    queries = []
+    for record in reader:
+        # Rows of only commas or spaces are as empty as blank lines
+        values = [v for value in record.values() for v in (value if isinstance(value, list) else [value])]
+        if not any(v and v.strip() for v in values):
+            continue
+        # line_num is where the record ends, so quoted multi-line fields are counted
+        queries.append(_batch_query(record, reader.line_num + first_line - 1))
+    return queries
+
+def read_batch_queries(path):
+    """Read (location, time) pairs from a CSV with location,time columns or a JSONL file ('-' for stdin).
+
+    A row that cannot be used (bad JSON, missing fields) is returned in
+    its place as a ValueError, so it becomes one failed result instead of
+    aborting the batch. Rows are numbered by their line in the file.
+    """
+    handle = sys.stdin if path == "-" else open(path, "r", encoding="utf-8", newline="")
+    try:
+        # Blank lines before the first record say nothing about the format
+        first_line = 1
+        first = handle.readline()
+        while first and not first.strip():
+            first_line += 1
+            first = handle.readline()
+        if not first:
+            return []
+        lines = itertools.chain([first], handle)
+        if first.lstrip().startswith("{"):
+            return [_parse_jsonl_row(line, row)
+                    for row, line in enumerate(lines, first_line) if line.strip()]
+        return _read_csv_queries(lines, first_line)
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+
+def run_batch(input_path, output_path=None, concurrency=BATCH_CONCURRENCY):
+    """Non-interactive mode: assess every query in a file and stream JSONL results"""
+    queries = read_batch_queries(input_path)
+    out = open(output_path, "w", encoding="utf-8") if output_path else sys.stdout
+    started = time.time()
+    counts = {"ok": 0, "failed": 0, "deduplicated": 0}
+
+    async def _run():
+        async for result in iter_safety_status_many(queries, concurrency):
+            counts["ok" if result["ok"] else "failed"] += 1
+            counts["deduplicated"] += result["deduplicated"]
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+
+    try:
+        asyncio.run(_run())
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Assessed {len(queries)} queries in {time.time() - started:.1f}s: "
+          f"{counts['ok']} ok, {counts['failed']} failed, {counts['deduplicated']} deduplicated",
+          file=sys.stderr)
+    return 0 if counts["failed"] == 0 else 1
+
 # Main loop for user input
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Travel safety assistant")
+    parser.add_argument("--batch", metavar="FILE", help="assess queries from a CSV/JSONL file ('-' for stdin) and print JSONL results")
+    parser.add_argument("--output", metavar="FILE", help="write batch results here instead of stdout")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="maximum LLM calls in flight")
+    args = parser.parse_args(argv)
+    if args.batch:
+        return run_batch(args.batch, args.output, args.concurrency)
+
     show_welcome_message()
     while True:
         print("\n🎙️ Press 'Enter' to speak, type location manually, or type 'exit' to quit.")
@@ -171,4 +422,4 @@ def main():
             print("⚠️ Could not determine the safety status. Please try again later.\n")
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# server.py
+import os
+import hmac
+import math
+import logging
+from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import Flask, jsonify, request
+from flask_cors import CORS
+from dotenv import load_dotenv
+
+from safety import fetch_safety_status, get_cache_stats, get_coalescing_stats, get_local_risk
+from module.querykey import make_query_key
+from module.sos import get_sos_system, activate_sos, deactivate_sos, get_dispatch_stats
+from module.notification import get_sos_system as get_notification_system, get_email_stats
+from module.httpclient import get_http_client
+from module.text import get_tts_cache_stats
+from module.outbox import get_outbox_stats
+from module.geocode import get_geocode_stats
+from module.location import get_location_tracker
+from module.speech import get_speech_pool_stats
+from module.risk import get_risk_engine, get_risk_stats, parse_hour_of_week, check_coordinates, LABELS
+from module.routes import score_routes, ROUTE_SPEED_KMH
+
+# Load environment variables
+load_dotenv()
+
+# Setup logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "16"))
+# Most points one /api/risk request may score
+RISK_BATCH_MAX_POINTS = int(os.getenv("RISK_BATCH_MAX_POINTS", "10000"))
+# Most candidate routes one /api/route request may compare
+ROUTE_MAX_CANDIDATES = int(os.getenv("ROUTE_MAX_CANDIDATES", "10"))
+# Fastest travel speed /api/route accepts; anything above is not a road trip
+ROUTE_MAX_SPEED_KMH = 200.0
+REQUEST_TIMEOUT = float(os.getenv("SERVER_REQUEST_TIMEOUT", "60"))
+# Comma-separated origins allowed to call the API from a browser; unset allows none
+CORS_ORIGINS = [o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()]
+# Shared secret required in the X-SOS-Token header of every SOS route; unset disables them
+SOS_API_TOKEN = os.getenv("SOS_API_TOKEN", "")
+
+# Backend work runs here so a burst of requests cannot start unbounded LLM/SOS calls
+executor = ThreadPoolExecutor(max_workers=SERVER_WORKERS, thread_name_prefix="safety-worker")
+
+
+def _run(func, *args):
+    """Run func on the worker pool and wait for it, bounded by REQUEST_TIMEOUT"""
+    return executor.submit(func, *args).result(timeout=REQUEST_TIMEOUT)
+
+
+def _error(message, status):
+    return jsonify({"success": False, "error": message}), status
+
+
+def _require_sos_token(view):
+    """Reject requests without the shared SOS token: these routes send SMS, calls and email"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not SOS_API_TOKEN:
+            return _error("SOS routes are disabled: SOS_API_TOKEN is not set", 503)
+        token = request.headers.get("X-SOS-Token", "")
+        if not hmac.compare_digest(token.encode(), SOS_API_TOKEN.encode()):
+            return _error("Missing or invalid X-SOS-Token", 401)
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def create_app():
+    app = Flask(__name__)
+    if CORS_ORIGINS:
+        CORS(app, origins=CORS_ORIGINS, allow_headers=["Content-Type", "X-SOS-Token"])
+    
+    # Register the SMS/call/email handlers so notifications left in the outbox resume
+    get_sos_system()
+    get_notification_system()
+
+    @app.get("/api/health")
+    def health():
+        return jsonify({"status": "ok"})
+
+    @app.post("/api/safety")
+    def safety_check():
+        body = request.get_json(silent=True) or {}
+        location = str(body.get("location", "")).strip()
+        time_of_travel = str(body.get("time", "")).strip()
+        if not location or not time_of_travel:
+            return _error("Both 'location' and 'time' are required", 400)
+
+        try:
+            response = _run(fetch_safety_status, location, time_of_travel)
+        except FutureTimeout:
+            return _error("Safety check timed out", 504)
+        except Exception as e:
+            logger.error(f"Safety check failed for '{location}' at {time_of_travel}: {e}")
+            return _error("Could not determine safety status", 502)
+        try:
+            risk = _run(get_local_risk, location, time_of_travel)
+        except FutureTimeout:
+            logger.warning(f"Local risk scoring timed out for '{location}' at {time_of_travel}")
+            risk = None
+
+        return jsonify({
+            "success": True,
+            "location": location,
+            "time": time_of_travel,
+            "key": make_query_key(location, time_of_travel),
+            "response": response,
+            "risk": risk,
+        })
+
+    @app.post("/api/risk")
+    def risk_batch():
+        """Score many points against local incident data: {"points": [{"lat", "lon", "time"}, ...]}"""
+        engine = get_risk_engine()
+        if engine is None:
+            return _error("Local risk scoring is not configured (RISK_INCIDENTS_PATH)", 503)
+        points = (request.get_json(silent=True) or {}).get("points")
+        if not isinstance(points, list) or not points:
+            return _error("'points' must be a non-empty list", 400)
+        if len(points) > RISK_BATCH_MAX_POINTS:
+            return _error(f"At most {RISK_BATCH_MAX_POINTS} points per request", 413)
+
+        try:
+            lats = [float(p["lat"]) for p in points]
+            lons = [float(p["lon"]) for p in points]
+            hours = [parse_hour_of_week(str(p.get("time", "now"))) for p in points]
+        except (TypeError, KeyError, ValueError):
+            return _error("Every point needs numeric 'lat' and 'lon'", 400)
+        try:
+            check_coordinates(lats, lons)
+        except ValueError as e:
+            return _error(f"Invalid point: {e}", 400)
+        if None in hours:
+            return _error(f"Could not read the time of point {hours.index(None)}", 400)
+
+        try:
+            result = _run(engine.score_many, lats, lons, hours)
+        except FutureTimeout:
+            return _error("Risk scoring timed out", 504)
+        return jsonify({
+            "success": True,
+            "results": [{"label": LABELS[label], "score": round(float(score), 4), "percentile": round(float(pct), 1)}
+                        for label, score, pct in zip(result["label"], result["score"], result["percentile"])],
+        })
+
+    @app.post("/api/sos")
+    @_require_sos_token
+    def sos_activate():
+        try:
+            activated = _run(activate_sos)
+        except FutureTimeout:
+            # Dispatch keeps running on the worker; the alert is already out
+            return jsonify({"success": True, "status": "dispatching"}), 202
+        except Exception as e:
+            logger.error(f"SOS activation failed: {e}")
+            return _error(str(e), 500)
+        return jsonify({"success": True, "status": "activated" if activated else "already_active"})
+
+    @app.post("/api/sos/deactivate")
+    @_require_sos_token
+    def sos_deactivate():
+        """Stop the alarm and cancel unsent notifications; {"alert_id"} picks the email alert"""
+        alert_id = (request.get_json(silent=True) or {}).get("alert_id")
+
+        def deactivate():
+            deactivate_sos()
+            return get_notification_system().cancel_alert(alert_id)
+
+        try:
+            dropped = _run(deactivate)
+        except FutureTimeout:
+            # Deactivation and cancelling keep running on the worker
+            return jsonify({"success": True, "status": "deactivating"}), 202
+        return jsonify({"success": True, "status": "deactivated", "emails_cancelled": dropped})
+
+    @app.post("/api/sos/location")
+    @_require_sos_token
+    def sos_with_location():
+        body = request.get_json(silent=True) or {}
+        try:
+            lat = float(body["lat"])
+            lon = float(body["lon"])
+        except (KeyError, TypeError, ValueError):
+            return _error("Numeric 'lat' and 'lon' are required", 400)
+
+        try:
+            result = _run(get_notification_system().send_sos_alert_from_mobile,
+                          lat, lon, body.get("extra_info"), body.get("alert_id"))
+        except FutureTimeout:
+            return _error("SOS dispatch timed out", 504)
+        if result.get("retry_after"):
+            return jsonify(result), 429, {"Retry-After": str(result["retry_after"])}
+        return jsonify(result), (200 if result.get("success") else 502)
+
+    @app.post("/api/route")
+    def route_safety():
+        """Compare candidate routes: {"routes": [polyline or [[lat, lon], ...], ...], "time", "speed_kmh"}"""
+        if get_risk_engine() is None:
+            return _error("Local risk scoring is not configured (RISK_INCIDENTS_PATH)", 503)
+        body = request.get_json(silent=True) or {}
+        routes = body.get("routes") or ([body["route"]] if body.get("route") else None)
+        if not isinstance(routes, list) or not routes:
+            return _error("'routes' must be a non-empty list of polylines or waypoint lists", 400)
+        if len(routes) > ROUTE_MAX_CANDIDATES:
+            return _error(f"At most {ROUTE_MAX_CANDIDATES} routes per request", 413)
+        departure = parse_hour_of_week(str(body.get("time", "now")))
+        if departure is None:
+            return _error("Could not read the departure 'time'", 400)
+
+        try:
+            speed_kmh = float(body.get("speed_kmh", ROUTE_SPEED_KMH))
+        except (TypeError, ValueError):
+            return _error("'speed_kmh' must be a number", 400)
+        if not math.isfinite(speed_kmh) or not 0 < speed_kmh <= ROUTE_MAX_SPEED_KMH:
+            return _error(f"'speed_kmh' must be above 0 and at most {ROUTE_MAX_SPEED_KMH:g}", 400)
+
+        try:
+            result = _run(score_routes, routes, departure, None, speed_kmh)
+        except FutureTimeout:
+            return _error("Route scoring timed out", 504)
+        except (TypeError, ValueError, IndexError) as e:
+            return _error(f"Invalid route: {e}", 400)
+
+        return jsonify({"success": True, "time": body.get("time", "now"), **result})
+
+    @app.get("/api/stats")
+    def stats():
+        return jsonify({
+            "cache": get_cache_stats(),
+            "coalescing": get_coalescing_stats(),
+            "http": get_http_client().stats(),
+            "tts_cache": get_tts_cache_stats(),
+            "speech_sessions": get_speech_pool_stats(),
+            "sos_dispatch": get_dispatch_stats(),
+            "sos_outbox": get_outbox_stats(),
+            "sos_email": get_email_stats(),
+            "geocode": get_geocode_stats(),
+            "location": get_location_tracker().stats(),
+            "risk": get_risk_stats(),
+        })
+
+    return app
+
+
+app = create_app()
+
+
+def serve(host=None, port=None):
+    """Run the API with Flask's threaded server (use a WSGI server such as gunicorn for production)"""
+    host = host or os.getenv("SERVER_HOST", "127.0.0.1")
+    port = int(port or os.getenv("SERVER_PORT", "5000"))
+    print(f"🌐 Safety API listening on http://{host}:{port}")
+    app.run(host=host, port=port, threaded=True)
+
+
+if __name__ == "__main__":
+    serve()